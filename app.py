@@ -1,13 +1,26 @@
-from flask import Flask, request, jsonify, render_template_string
+from flask import Flask, request, jsonify, render_template_string, Response, stream_with_context, session
 from flask_cors import CORS
 import threading
+import queue
+import json
+import base64
+import uuid
 import signal
 import sys
 import time
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
 from config import Config
-from utils.audio_handler import AudioHandler
-from utils.openrouter_api import OpenRouterAPI
-from utils.text_to_speech import TextToSpeech
+from utils.conversation_store import ConversationStore
+from utils.cancellation import TurnManager
+from utils.admission import AdmissionController, AdmissionRejected
+
+try:
+    from flask_sock import Sock, ConnectionClosed
+    SOCK_AVAILABLE = True
+except ImportError:
+    print("Warning: flask-sock not available. Browser microphone streaming will be disabled.")
+    SOCK_AVAILABLE = False
 
 # Initialize Flask app
 app = Flask(__name__)
@@ -15,10 +28,24 @@ CORS(app)
 
 # Global variables
 config = Config()
+app.secret_key = config.SECRET_KEY
+# Oversized audio messages close the socket before they are buffered
+app.config['SOCK_SERVER_OPTIONS'] = {'max_message_size': config.REMOTE_AUDIO_MAX_FRAME_BYTES}
+sock = Sock(app) if SOCK_AVAILABLE else None
 audio_handler = None
 openrouter_api = None
 tts = None
-conversation_history = []
+conversation_store = ConversationStore()
+# Per-session cancellation of the turn in flight, for barge-in
+turn_manager = TurnManager()
+# Bounded concurrency and queues per pipeline stage, shared by both server modes
+admission = AdmissionController()
+
+# Readiness of each component: 'pending', 'ready' or 'failed'
+component_status = {'audio_handler': 'pending', 'openrouter_api': 'pending', 'tts': 'pending'}
+
+# Session used for the single local user in console mode
+CONSOLE_SESSION_ID = 'console'
 
 # HTML template for the web interface
 HTML_TEMPLATE = """
@@ -280,6 +307,50 @@ HTML_TEMPLATE = """
     <script>
         let isRecording = false;
         let isProcessing = false;
+        let transcriptionEvents = null;
+        let audioContext = null;
+        let speechQueue = Promise.resolve();
+        let speechEndTime = 0;
+        let speechSources = [];
+        let speechGeneration = 0;
+
+        // 'server' records with the server's microphone, 'browser' streams this browser's microphone
+        const audioInputMode = {{ audio_input_mode|tojson }};
+        // Browser audio waiting for the server to acknowledge earlier audio (about 13 s)
+        const MAX_MIC_BACKLOG_FRAMES = 100;
+        let micSocket = null;
+        let micStream = null;
+        let micContext = null;
+        let micBacklog = [];
+        let micSentBytes = 0;
+        let micAckedBytes = 0;
+        let micWindowBytes = 0;
+
+        // Converts microphone samples to 16-bit PCM messages of 2048 samples
+        const PCM_WORKLET_URL = URL.createObjectURL(new Blob([`
+            class PcmCapture extends AudioWorkletProcessor {
+                constructor() {
+                    super();
+                    this.samples = new Int16Array(2048);
+                    this.length = 0;
+                }
+                process(inputs) {
+                    const input = inputs[0][0];
+                    if (input) {
+                        for (let i = 0; i < input.length; i++) {
+                            const sample = Math.max(-1, Math.min(1, input[i]));
+                            this.samples[this.length++] = sample < 0 ? sample * 0x8000 : sample * 0x7fff;
+                            if (this.length === this.samples.length) {
+                                this.port.postMessage(this.samples.buffer.slice(0));
+                                this.length = 0;
+                            }
+                        }
+                    }
+                    return true;
+                }
+            }
+            registerProcessor('pcm-capture', PcmCapture);
+        `], { type: 'application/javascript' }));
 
         const startRecordingBtn = document.getElementById('startRecording');
         const stopRecordingBtn = document.getElementById('stopRecording');
@@ -309,9 +380,231 @@ HTML_TEMPLATE = """
             chatContainer.scrollTop = chatContainer.scrollHeight;
         }
 
+        function playSpeech(data) {
+            // Play sentences synthesized by the server back to back, in order
+            audioContext = audioContext || new AudioContext();
+            const bytes = Uint8Array.from(atob(data.audio), (c) => c.charCodeAt(0));
+            const generation = speechGeneration;
+            speechQueue = speechQueue.then(async () => {
+                const buffer = await audioContext.decodeAudioData(bytes.buffer);
+                if (generation !== speechGeneration) return;  // Stopped while decoding
+                const source = audioContext.createBufferSource();
+                source.buffer = buffer;
+                source.connect(audioContext.destination);
+                const startTime = Math.max(audioContext.currentTime, speechEndTime);
+                source.start(startTime);
+                speechEndTime = startTime + buffer.duration;
+                speechSources.push(source);
+                source.onended = () => { speechSources = speechSources.filter((s) => s !== source); };
+            }).catch((error) => console.error('Error playing speech:', error));
+        }
+
+        function stopClientSpeech() {
+            speechGeneration++;
+            speechSources.forEach((source) => source.stop());
+            speechSources = [];
+            speechEndTime = 0;
+        }
+
+        async function readEventStream(response, handlers) {
+            // Parse Server-Sent Events from a fetch() response body
+            const reader = response.body.getReader();
+            const decoder = new TextDecoder();
+            let buffer = '';
+            
+            while (true) {
+                const { value, done } = await reader.read();
+                if (done) break;
+                buffer += decoder.decode(value, { stream: true });
+                
+                let boundary;
+                while ((boundary = buffer.indexOf('\n\n')) !== -1) {
+                    const rawEvent = buffer.slice(0, boundary);
+                    buffer = buffer.slice(boundary + 2);
+                    
+                    let eventName = 'message';
+                    let eventData = '';
+                    for (const line of rawEvent.split('\n')) {
+                        if (line.startsWith('event: ')) eventName = line.slice(7);
+                        else if (line.startsWith('data: ')) eventData += line.slice(6);
+                    }
+                    if (handlers[eventName]) handlers[eventName](JSON.parse(eventData));
+                }
+            }
+        }
+
+        async function streamResponse(response, onTranscript) {
+            // Render a streamed turn token by token
+            if (!response.headers.get('Content-Type').startsWith('text/event-stream')) {
+                const data = await response.json();
+                if (response.status === 429) {
+                    // Turned away under load; keep what was said so it can be sent again
+                    if (data.transcribed_text) textInput.value = data.transcribed_text;
+                    alert(data.error + ' (in ' + data.retry_after + ' s)');
+                    return;
+                }
+                alert('Failed to get AI response: ' + (data.error || 'Unknown error'));
+                return;
+            }
+            
+            let aiMessage = null;
+            await readEventStream(response, {
+                transcript: (data) => onTranscript && onTranscript(data.transcribed_text),
+                token: (data) => {
+                    if (!aiMessage) {
+                        showStatus('🔊 Speaking response...', 'speaking');
+                        aiMessage = document.createElement('div');
+                        aiMessage.className = 'message ai-message';
+                        chatContainer.appendChild(aiMessage);
+                    }
+                    aiMessage.textContent += data.token;
+                    chatContainer.scrollTop = chatContainer.scrollHeight;
+                },
+                audio: (data) => playSpeech(data),
+                done: () => setTimeout(() => { hideStatus(); }, 3000),
+                cancelled: () => {
+                    stopClientSpeech();
+                    if (!isRecording) hideStatus();
+                },
+                error: (data) => alert('Failed to get AI response: ' + (data.error || 'Unknown error'))
+            });
+        }
+
+        function watchPartialTranscripts() {
+            // Show what has been understood so far while the user is still speaking
+            transcriptionEvents = new EventSource('/transcription_stream');
+            transcriptionEvents.addEventListener('partial', (event) => {
+                const text = JSON.parse(event.data).text;
+                if (isRecording && text) showStatus('🎤 ' + text, 'recording');
+            });
+            transcriptionEvents.addEventListener('done', () => stopWatchingPartialTranscripts());
+            transcriptionEvents.onerror = () => stopWatchingPartialTranscripts();
+        }
+
+        function stopWatchingPartialTranscripts() {
+            if (transcriptionEvents) {
+                transcriptionEvents.close();
+                transcriptionEvents = null;
+            }
+        }
+
+        function sendMicAudio(ignoreWindow = false) {
+            // Send queued audio as long as the server keeps up
+            while (micBacklog.length && (ignoreWindow || micSentBytes - micAckedBytes < micWindowBytes)) {
+                const frame = micBacklog.shift();
+                micSocket.send(frame);
+                micSentBytes += frame.byteLength;
+            }
+        }
+
+        async function startMicCapture() {
+            micStream = await navigator.mediaDevices.getUserMedia({
+                audio: { channelCount: 1, echoCancellation: true, noiseSuppression: true }
+            });
+            // Capture at the microphone's own rate; Firefox refuses to connect a
+            // microphone to a context running at a different rate
+            micContext = new AudioContext();
+            micSocket.send(JSON.stringify({ type: 'format', sample_rate: micContext.sampleRate }));
+            await micContext.audioWorklet.addModule(PCM_WORKLET_URL);
+            const capture = new AudioWorkletNode(micContext, 'pcm-capture');
+            capture.port.onmessage = (event) => {
+                micBacklog.push(event.data);
+                // Drop the oldest audio rather than buffer without limit
+                if (micBacklog.length > MAX_MIC_BACKLOG_FRAMES) micBacklog.shift();
+                sendMicAudio();
+            };
+            micContext.createMediaStreamSource(micStream).connect(capture);
+        }
+
+        function stopMicCapture() {
+            if (micStream) micStream.getTracks().forEach((track) => track.stop());
+            if (micContext) micContext.close();
+            micStream = null;
+            micContext = null;
+        }
+
+        function startBrowserRecording() {
+            const scheme = location.protocol === 'https:' ? 'wss' : 'ws';
+            micSocket = new WebSocket(`${scheme}://${location.host}/audio_stream`);
+            micBacklog = [];
+            micSentBytes = 0;
+            micAckedBytes = 0;
+            
+            micSocket.onmessage = async (event) => {
+                const message = JSON.parse(event.data);
+                if (message.type === 'ready') {
+                    micWindowBytes = message.window_bytes;
+                    try {
+                        await startMicCapture();
+                    } catch (error) {
+                        console.error('Error opening microphone:', error);
+                        alert('Could not access the microphone');
+                        micSocket.close();
+                    }
+                } else if (message.type === 'ack') {
+                    micAckedBytes = message.bytes;
+                    sendMicAudio();
+                } else if (message.type === 'partial') {
+                    if (isRecording && message.text) showStatus('🎤 ' + message.text, 'recording');
+                } else if (message.type === 'stopped') {
+                    // Stopped by the user or on silence
+                    stopMicCapture();
+                    setRecordingState(false);
+                    setProcessingState(true);
+                } else if (message.type === 'transcript') {
+                    micSocket.close();
+                    await sendTranscript(message.text);
+                } else if (message.type === 'error') {
+                    alert('Recording failed: ' + message.error);
+                    micSocket.close();
+                }
+            };
+            micSocket.onclose = () => {
+                stopMicCapture();
+                micSocket = null;
+                if (isRecording) {
+                    setRecordingState(false);
+                    hideStatus();
+                }
+            };
+        }
+
+        function stopBrowserRecording() {
+            stopMicCapture();
+            if (micSocket && micSocket.readyState === WebSocket.OPEN) {
+                // The rest of the recording is sent before the stop message
+                sendMicAudio(true);
+                micSocket.send(JSON.stringify({ type: 'stop' }));
+            }
+            setRecordingState(false);
+            setProcessingState(true);
+        }
+
+        async function sendTranscript(text) {
+            // Answer a recording transcribed from the browser microphone
+            try {
+                if (!text) {
+                    alert('Could not transcribe audio');
+                    return;
+                }
+                addMessage(text, true);
+                const response = await fetch('/send_text', {
+                    method: 'POST',
+                    headers: { 'Content-Type': 'application/json' },
+                    body: JSON.stringify({ text: text, stream: true })
+                });
+                await streamResponse(response);
+            } catch (error) {
+                console.error('Error sending transcript:', error);
+                alert('Error processing recording');
+            } finally {
+                setProcessingState(false);
+            }
+        }
+
         function setRecordingState(recording) {
             isRecording = recording;
-            startRecordingBtn.disabled = recording || isProcessing;
+            startRecordingBtn.disabled = recording;
             stopRecordingBtn.disabled = !recording;
             recordingIndicator.style.display = recording ? 'block' : 'none';
             
@@ -322,7 +615,8 @@ HTML_TEMPLATE = """
 
         function setProcessingState(processing) {
             isProcessing = processing;
-            startRecordingBtn.disabled = processing || isRecording;
+            // Recording stays available while the bot answers, so the user can barge in
+            startRecordingBtn.disabled = isRecording;
             sendTextBtn.disabled = processing;
             
             if (processing) {
@@ -331,6 +625,12 @@ HTML_TEMPLATE = """
         }
 
         startRecordingBtn.addEventListener('click', async () => {
+            if (audioInputMode === 'browser') {
+                setRecordingState(true);
+                startBrowserRecording();
+                return;
+            }
+            
             try {
                 setRecordingState(true);
                 const response = await fetch('/start_recording', { method: 'POST' });
@@ -340,6 +640,8 @@ HTML_TEMPLATE = """
                     alert('Failed to start recording: ' + data.error);
                     setRecordingState(false);
                     hideStatus();
+                } else {
+                    watchPartialTranscripts();
                 }
             } catch (error) {
                 console.error('Error starting recording:', error);
@@ -350,28 +652,23 @@ HTML_TEMPLATE = """
         });
 
         stopRecordingBtn.addEventListener('click', async () => {
+            if (audioInputMode === 'browser') {
+                stopBrowserRecording();
+                return;
+            }
+            
             try {
                 setRecordingState(false);
                 setProcessingState(true);
+                stopWatchingPartialTranscripts();
                 
-                const response = await fetch('/stop_recording', { method: 'POST' });
-                const data = await response.json();
+                const response = await fetch('/stop_recording', {
+                    method: 'POST',
+                    headers: { 'Content-Type': 'application/json' },
+                    body: JSON.stringify({ stream: true })
+                });
                 
-                if (data.success && data.transcribed_text) {
-                    addMessage(data.transcribed_text, true);
-                    
-                    if (data.ai_response) {
-                        showStatus('🔊 Speaking response...', 'speaking');
-                        addMessage(data.ai_response, false);
-                        
-                        // Wait for speech to complete
-                        setTimeout(() => {
-                            hideStatus();
-                        }, 3000);
-                    }
-                } else {
-                    alert('Failed to process recording: ' + (data.error || 'Unknown error'));
-                }
+                await streamResponse(response, (transcribedText) => addMessage(transcribedText, true));
             } catch (error) {
                 console.error('Error stopping recording:', error);
                 alert('Error processing recording');
@@ -392,22 +689,10 @@ HTML_TEMPLATE = """
                 const response = await fetch('/send_text', {
                     method: 'POST',
                     headers: { 'Content-Type': 'application/json' },
-                    body: JSON.stringify({ text: text })
+                    body: JSON.stringify({ text: text, stream: true })
                 });
                 
-                const data = await response.json();
-                
-                if (data.success && data.ai_response) {
-                    showStatus('🔊 Speaking response...', 'speaking');
-                    addMessage(data.ai_response, false);
-                    
-                    // Wait for speech to complete
-                    setTimeout(() => {
-                        hideStatus();
-                    }, 3000);
-                } else {
-                    alert('Failed to get AI response: ' + (data.error || 'Unknown error'));
-                }
+                await streamResponse(response);
             } catch (error) {
                 console.error('Error sending text:', error);
                 alert('Error sending message');
@@ -418,6 +703,7 @@ HTML_TEMPLATE = """
 
         stopSpeakingBtn.addEventListener('click', async () => {
             try {
+                stopClientSpeech();
                 await fetch('/stop_speaking', { method: 'POST' });
                 hideStatus();
             } catch (error) {
@@ -456,48 +742,164 @@ HTML_TEMPLATE = """
 </html>
 """
 
-def initialize_components():
-    """Initialize all application components."""
-    global audio_handler, openrouter_api, tts
+def create_audio_handler():
+    """Create the audio handler; its heavy imports are deferred until now."""
+    from utils.audio_handler import AudioHandler
+    return AudioHandler()
+
+def create_openrouter_api():
+    """Create the OpenRouter API client."""
+    from utils.openrouter_api import OpenRouterAPI
+    return OpenRouterAPI()
+
+def create_tts():
+    """Create the text-to-speech engine."""
+    from utils.text_to_speech import TextToSpeech
+    from utils.openrouter_api import FALLBACK_MESSAGES
+    text_to_speech = TextToSpeech()
+    # Render the phrases we repeat most so they play straight from the cache
+    text_to_speech.prewarm(list(FALLBACK_MESSAGES) + config.TTS_PREWARM_PHRASES)
+    return text_to_speech
+
+# Component factories, in the order they used to be initialized
+COMPONENT_FACTORIES = [
+    ('audio_handler', create_audio_handler),
+    ('openrouter_api', create_openrouter_api),
+    ('tts', create_tts)
+]
+
+def initialize_component(name, factory):
+    """Create one component and publish it once it is ready."""
+    try:
+        print(f"Initializing {name}...")
+        globals()[name] = factory()
+        component_status[name] = 'ready'
+        print(f"✓ {name} ready")
+        return True
+    except Exception as e:
+        component_status[name] = 'failed'
+        print(f"✗ Error initializing {name}: {e}")
+        return False
+
+def test_openrouter_connection():
+    """Warm up the model catalog and check that OpenRouter can be reached."""
+    print("Testing OpenRouter API connection...")
+    openrouter_api.model_catalog.start_background_refresh()
+    if openrouter_api.test_connection():
+        print("✓ OpenRouter API connection OK")
+    else:
+        print("⚠ Warning: OpenRouter API connection test failed")
+
+def initialize_components(wait=True):
+    """
+    Initialize all application components.
+    
+    With PARALLEL_STARTUP the components are created concurrently; with
+    wait=False this returns immediately and readiness is reported on /status.
     
+    Returns:
+        bool: False if configuration is invalid or, when waiting, a component failed
+    """
     try:
         print("Initializing Voice Chatbot...")
         
         # Validate configuration
         config.validate_config()
-        
-        # Initialize components
-        print("Initializing audio handler...")
-        audio_handler = AudioHandler()
-        
-        print("Initializing OpenRouter API...")
-        openrouter_api = OpenRouterAPI()
-        
-        print("Initializing Text-to-Speech...")
-        tts = TextToSpeech()
-        
-        # Test connections
-        print("Testing OpenRouter API connection...")
-        if openrouter_api.test_connection():
-            print("✓ All components initialized successfully!")
-        else:
-            print("⚠ Warning: OpenRouter API connection test failed")
-        
-        return True
-        
     except Exception as e:
         print(f"✗ Error initializing components: {e}")
         return False
+    
+    if not config.PARALLEL_STARTUP:
+        # Sequential, blocking startup
+        if not all(initialize_component(name, factory) for name, factory in COMPONENT_FACTORIES):
+            return False
+        test_openrouter_connection()
+        print("✓ All components initialized successfully!")
+        return True
+    
+    executor = ThreadPoolExecutor(max_workers=len(COMPONENT_FACTORIES), thread_name_prefix='init')
+    futures = [executor.submit(initialize_component, name, factory) for name, factory in COMPONENT_FACTORIES]
+    
+    def finish():
+        # The connection test needs only the API client, not the other components
+        if futures[1].result():
+            test_openrouter_connection()
+        if all(future.result() for future in futures):
+            print("✓ All components initialized successfully!")
+            return True
+        print(f"✗ Failed to initialize: {', '.join(failed_components())}; requests that need it will fail")
+        return False
+    
+    executor.shutdown(wait=False)
+    if not wait:
+        threading.Thread(target=finish, daemon=True).start()
+        return True
+    return finish()
+
+def components_ready(*names):
+    """Check whether the named components (default: all) are ready."""
+    return all(component_status[name] == 'ready' for name in names or component_status)
+
+def failed_components(*names):
+    """Get the named components (default: all) that failed to initialize."""
+    return [name for name in names or component_status if component_status[name] == 'failed']
+
+def not_ready_error(failed):
+    """Error message for components that failed to initialize."""
+    return f"Voice chatbot could not start {', '.join(failed)}"
+
+def not_ready_response(*names):
+    """
+    Build an error response if any of the named components isn't ready.
+    
+    A component that is still starting up gets a 503 to retry; one that
+    failed to initialize gets a 500, since retrying won't help.
+    """
+    if components_ready(*names):
+        return None
+    failed = failed_components(*names)
+    if failed:
+        response = jsonify({
+            'success': False,
+            'error': not_ready_error(failed),
+            'components': component_status
+        })
+        response.status_code = 500
+        return response
+    response = jsonify({
+        'success': False,
+        'error': 'Voice chatbot is still starting up',
+        'components': component_status
+    })
+    response.status_code = 503
+    response.headers['Retry-After'] = '1'
+    return response
+
+def overloaded_response(rejected, **extra):
+    """Build a 429 response for a request a saturated stage turned away."""
+    response = jsonify({
+        'success': False,
+        'error': 'The voice chatbot is busy, please try again shortly',
+        'stage': rejected.stage,
+        'retry_after': rejected.retry_after,
+        **extra
+    })
+    response.status_code = 429
+    response.headers['Retry-After'] = str(rejected.retry_after)
+    return response
 
 def cleanup_components():
     """Clean up all components on shutdown."""
-    global audio_handler, tts
+    global audio_handler, openrouter_api, tts
     
     print("Cleaning up components...")
     
     if audio_handler:
         audio_handler.cleanup()
     
+    if openrouter_api:
+        openrouter_api.close()
+    
     if tts:
         tts.cleanup()
     
@@ -509,16 +911,237 @@ def signal_handler(sig, frame):
     cleanup_components()
     sys.exit(0)
 
+def get_session_id():
+    """Get the conversation session ID of the current browser, creating one if needed."""
+    if 'session_id' not in session:
+        session['session_id'] = uuid.uuid4().hex
+    return session['session_id']
+
+def wants_stream(data):
+    """Check whether the client asked for a streamed (SSE) turn."""
+    if data and data.get('stream'):
+        return True
+    return request.accept_mimetypes.best == 'text/event-stream'
+
+def sse_event(event, data):
+    """Format a Server-Sent Event."""
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+def get_audio_output(data):
+    """Get where the speech of a turn is played: 'server' or 'client'."""
+    audio_output = (data or {}).get('audio_output')
+    return audio_output if audio_output in ('server', 'client') else config.TTS_OUTPUT_MODE
+
+def turn_components(data, stream):
+    """Get the components a turn on a recording needs; tts only if it produces speech here."""
+    names = ['audio_handler', 'openrouter_api']
+    # Streamed turns synthesize the speech of client playback too
+    if stream or get_audio_output(data) == 'server':
+        names.append('tts')
+    return names
+
+def get_session_voice(session_data=None):
+    """Get the voice settings of a browser session, by default the current one."""
+    if session_data is None:
+        session_data = session
+    try:
+        return tts.make_voice_settings(**session_data.get('voice_settings', {}))
+    except (ValueError, TypeError):
+        # e.g. a voice that is no longer installed
+        return tts.get_voice_settings()
+
+def synthesize_for_client(text_generator, voice_settings, cancel_token, emit):
+    """Synthesize streamed text sentence by sentence and emit each sentence as an 'audio' SSE event."""
+    from utils.text_to_speech import encode_wav
+    try:
+        for index, (sentence, audio) in enumerate(tts.stream_speech(text_generator, voice_settings, cancel_token)):
+            emit(sse_event('audio', {
+                'index': index,
+                'text': sentence,
+                'format': 'wav',
+                'audio': base64.b64encode(encode_wav(audio)).decode('ascii')
+            }))
+    except Exception as e:
+        print(f"Error synthesizing speech for client: {e}")
+    finally:
+        emit(None)
+
+def transcribe_recording(audio):
+    """Transcribe a recording returned by audio_handler.stop_recording, then release it."""
+    # Most of the transcript is usually ready from streaming transcription
+    try:
+        return audio_handler.finish_transcription(audio)
+    finally:
+        audio_handler.release_audio(audio)
+
+def build_status(session_id, server='wsgi'):
+    """Collect the application status reported on /status by the given server mode."""
+    return {
+        'recording': audio_handler.is_recording if audio_handler else False,
+        'remote_recordings': audio_handler.remote_recordings if audio_handler else 0,
+        'speaking': tts.is_busy() if tts else False,
+        'conversation_length': conversation_store.get_length(session_id),
+        'conversations': conversation_store.get_stats(),
+        'components_initialized': components_ready(),
+        'components': component_status,
+        'transport': openrouter_api.get_transport_stats() if openrouter_api else None,
+        'response_cache': openrouter_api.get_cache_stats() if openrouter_api else None,
+        'single_flight': openrouter_api.get_single_flight_stats() if openrouter_api else None,
+        'stt': audio_handler.get_stt_stats() if audio_handler else None,
+        'noise_floor': audio_handler.get_noise_stats() if audio_handler else None,
+        'tts_cache': tts.get_cache_stats() if tts else None,
+        'audio_output': config.TTS_OUTPUT_MODE,
+        'barge_in': turn_manager.get_stats(),
+        'admission': admission.get_stats(),
+        'server': server
+    }
+
+def admit_turn(audio_output):
+    """
+    Reserve the stages a streamed turn needs: the LLM, and speech synthesis
+    when the audio goes to the client.
+    
+    Returns:
+        list: Tickets to release when the turn is over, the LLM's first
+    
+    Raises:
+        AdmissionRejected: If one of the stages is saturated
+    """
+    tickets = [admission.admit('llm')]
+    if audio_output == 'client':
+        try:
+            tickets.append(admission.admit('tts'))
+        except AdmissionRejected:
+            tickets[0].release()
+            raise
+    return tickets
+
+def stream_turn(session_id, user_text, transcribed=False, audio_output='server'):
+    """
+    Stream an AI response over SSE while speaking sentences as they complete.
+    
+    With audio_output='client' the sentences aren't played here but sent in
+    'audio' events, synthesized with the session's voice settings.
+    
+    Raises:
+        AdmissionRejected: Before anything is sent, if the turn can't be admitted
+    """
+    # Admitted first, so a rejected request doesn't cancel the turn in flight
+    tickets = admit_turn(audio_output)
+    cancel_token = turn_manager.begin_turn(session_id)
+    voice_settings = get_session_voice() if audio_output == 'client' else None
+    
+    def generate():
+        # Feed tokens to the TTS sentence splitter from a separate thread so
+        # speech starts on the first complete sentence
+        speech_tokens = queue.Queue()
+        # 'audio' events of sentences synthesized for the client, then None
+        audio_events = queue.Queue()
+        audio_done = audio_output != 'client'
+        if audio_output == 'client':
+            speech_thread = threading.Thread(
+                target=synthesize_for_client,
+                args=(iter(speech_tokens.get, None), voice_settings, cancel_token, audio_events.put),
+                daemon=True
+            )
+        else:
+            speech_thread = threading.Thread(
+                target=tts.speak_streaming,
+                args=(iter(speech_tokens.get, None), cancel_token),
+                daemon=True
+            )
+        speech_thread.start()
+        
+        def pending_audio(block):
+            nonlocal audio_done
+            while not audio_done:
+                try:
+                    event = audio_events.get(block=block)
+                except queue.Empty:
+                    return
+                if event is None:
+                    audio_done = True
+                else:
+                    yield event
+        
+        response_parts = []
+        finished = False
+        try:
+            if transcribed:
+                yield sse_event('transcript', {'transcribed_text': user_text})
+            
+            for token in openrouter_api.generate_streaming_response(
+                user_text,
+                conversation_history=conversation_store.get_history(session_id),
+                cancel_token=cancel_token
+            ):
+                response_parts.append(token)
+                speech_tokens.put(token)
+                yield sse_event('token', {'token': token})
+                # Sentences synthesized for the client in the meantime
+                yield from pending_audio(block=False)
+            tickets[0].release()
+            
+            ai_response = ''.join(response_parts)
+            
+            # Update conversation history; a cut-off answer is kept as far as it got
+            if ai_response or not cancel_token.is_cancelled:
+                conversation_store.append_exchange(session_id, user_text, ai_response)
+            
+            speech_tokens.put(None)
+            yield from pending_audio(block=True)
+            for ticket in tickets:
+                ticket.release()
+            
+            if cancel_token.is_cancelled:
+                yield sse_event('cancelled', {'reason': cancel_token.reason, 'ai_response': ai_response})
+            else:
+                yield sse_event('done', {'success': True, 'ai_response': ai_response})
+            finished = True
+            
+        except Exception as e:
+            yield sse_event('error', {'success': False, 'error': str(e)})
+        finally:
+            # Flush the remaining text to TTS, also when the client disconnects
+            speech_tokens.put(None)
+            if audio_output == 'client' and not finished:
+                # Nobody is left to play the rest of the speech
+                cancel_token.cancel('disconnected')
+            for ticket in tickets:
+                ticket.release()
+    
+    response = Response(
+        stream_with_context(generate()),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+    # The server closes the response even if the client left before the stream started
+    for ticket in tickets:
+        response.call_on_close(ticket.release)
+    return response
+
 @app.route('/')
 def index():
     """Serve the main web interface."""
-    return render_template_string(HTML_TEMPLATE)
+    # The WebSocket of a browser microphone can't set the session cookie itself
+    get_session_id()
+    audio_input_mode = config.AUDIO_INPUT_MODE if SOCK_AVAILABLE else 'server'
+    return render_template_string(HTML_TEMPLATE, audio_input_mode=audio_input_mode)
 
 @app.route('/start_recording', methods=['POST'])
 def start_recording():
     """Start audio recording."""
+    not_ready = not_ready_response('audio_handler')
+    if not_ready:
+        return not_ready
+    
     try:
-        if audio_handler.start_recording():
+        on_speech_onset = None
+        if config.BARGE_IN_ENABLED:
+            # Talking over the bot cuts its current answer short
+            on_speech_onset = partial(turn_manager.barge_in, get_session_id())
+        
+        if audio_handler.start_recording(on_speech_onset):
             return jsonify({'success': True, 'message': 'Recording started'})
         else:
             return jsonify({'success': False, 'error': 'Already recording'})
@@ -528,34 +1151,53 @@ def start_recording():
 @app.route('/stop_recording', methods=['POST'])
 def stop_recording():
     """Stop recording and process the audio."""
-    global conversation_history
+    data = request.get_json(silent=True) or {}
+    not_ready = not_ready_response(*turn_components(data, wants_stream(data)))
+    if not_ready:
+        return not_ready
+    
     try:
-        # Stop recording and get audio file
-        audio_file = audio_handler.stop_recording()
+        session_id = get_session_id()
         
-        if not audio_file:
+        # The microphone is stopped even if the server is too busy to transcribe
+        audio = audio_handler.stop_recording()
+        if not audio:
             return jsonify({'success': False, 'error': 'No audio recorded'})
         
-        # Transcribe audio
-        transcribed_text = audio_handler.transcribe_audio(audio_file)
+        try:
+            stt_ticket = admission.admit('stt')
+        except AdmissionRejected:
+            audio_handler.release_audio(audio)
+            raise
+        with stt_ticket:
+            transcribed_text = transcribe_recording(audio)
         
         if not transcribed_text:
             return jsonify({'success': False, 'error': 'Could not transcribe audio'})
         
-        # Get AI response
-        ai_response = openrouter_api.generate_response(transcribed_text, conversation_history=conversation_history)
+        try:
+            if wants_stream(data):
+                return stream_turn(session_id, transcribed_text, transcribed=True, audio_output=get_audio_output(data))
+            llm_ticket = admission.admit('llm')
+        except AdmissionRejected as e:
+            # The recording is used up; hand back its transcript so it can be sent as text
+            return overloaded_response(e, transcribed_text=transcribed_text)
         
-        # Update conversation history
-        conversation_history.append({"role": "user", "content": transcribed_text})
-        conversation_history.append({"role": "assistant", "content": ai_response})
+        with llm_ticket:
+            cancel_token = turn_manager.begin_turn(session_id)
+            
+            # Get AI response
+            ai_response = openrouter_api.generate_response(
+                transcribed_text,
+                conversation_history=conversation_store.get_history(session_id)
+            )
         
-        # Keep conversation history manageable (last 10 exchanges)
-        if len(conversation_history) > 20:
-            conversation_history = conversation_history[-20:]
+        # Update conversation history
+        conversation_store.append_exchange(session_id, transcribed_text, ai_response)
         
-        # Speak the response
-        if ai_response:
-            tts.speak(ai_response)
+        # Speak the response; clients playing speech themselves fetch it from /synthesize
+        if ai_response and get_audio_output(data) == 'server':
+            tts.speak(ai_response, cancel_token=cancel_token)
         
         return jsonify({
             'success': True,
@@ -563,58 +1205,249 @@ def stop_recording():
             'ai_response': ai_response
         })
         
+    except AdmissionRejected as e:
+        return overloaded_response(e)
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)})
 
+@app.route('/transcription_stream')
+def transcription_stream():
+    """Push partial transcripts of the current recording over SSE."""
+    not_ready = not_ready_response('audio_handler')
+    if not_ready:
+        return not_ready
+    
+    def generate():
+        for text in audio_handler.iter_partial_transcripts():
+            yield sse_event('partial', {'text': text})
+        yield sse_event('done', {'success': True})
+    
+    return Response(
+        stream_with_context(generate()),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+
+def audio_stream(ws, session_id=None):
+    """
+    Receive a recording from the browser microphone over a WebSocket.
+    
+    The browser sends mono 16-bit PCM in binary messages and {"type": "stop"}
+    when the user stops. The audio is taken to be at AUDIO_SAMPLE_RATE unless
+    {"type": "format", "sample_rate": ...} first announces the rate of the
+    browser's audio context, in which case it is resampled on the way in.
+    Every message is acknowledged with the total number of bytes received,
+    and the browser keeps at most REMOTE_AUDIO_WINDOW_BYTES unacknowledged.
+    Partial transcripts are pushed while recording, the final transcript
+    once the recording has stopped.
+    
+    Args:
+        ws: flask-sock WebSocket, or anything with its send() and receive(timeout)
+        session_id (str): Session to barge in on; defaults to the current request's
+    """
+    if not components_ready('audio_handler'):
+        failed = failed_components('audio_handler')
+        if failed:
+            ws.send(json.dumps({'type': 'error', 'error': not_ready_error(failed)}))
+        else:
+            ws.send(json.dumps({'type': 'error', 'error': 'Voice chatbot is still starting up', 'retry_after': 1}))
+        return
+    
+    on_speech_onset = None
+    if config.BARGE_IN_ENABLED:
+        # Talking over the bot cuts its current answer short
+        on_speech_onset = partial(turn_manager.barge_in, session_id or get_session_id())
+    
+    recording = audio_handler.open_remote_recording(on_speech_onset)
+    if recording is None:
+        ws.send(json.dumps({'type': 'error', 'error': 'Too many concurrent recordings', 'retry_after': 1}))
+        return
+    
+    try:
+        ws.send(json.dumps({
+            'type': 'ready',
+            'sample_rate': config.AUDIO_SAMPLE_RATE,
+            'window_bytes': config.REMOTE_AUDIO_WINDOW_BYTES
+        }))
+        
+        # Messages are processed before the next one is read, so a slow
+        # pipeline holds back the acknowledgements and with them the browser
+        processed = 0
+        partial_text = ''
+        reason = None
+        resampler = None
+        while reason is None:
+            message = ws.receive(timeout=config.REMOTE_AUDIO_RECEIVE_TIMEOUT)
+            if message is None:
+                reason = 'timeout'
+            elif isinstance(message, str):
+                try:
+                    control = json.loads(message)
+                except ValueError:
+                    control = {}
+                if control.get('type') == 'stop':
+                    reason = 'stopped'
+                elif control.get('type') == 'format':
+                    sample_rate = control.get('sample_rate')
+                    if not isinstance(sample_rate, int) or not 8000 <= sample_rate <= 192000:
+                        ws.send(json.dumps({'type': 'error', 'error': f"Unsupported sample rate: {sample_rate}"}))
+                        return
+                    if sample_rate != config.AUDIO_SAMPLE_RATE:
+                        from utils.audio_handler import StreamingResampler
+                        resampler = StreamingResampler(sample_rate, config.AUDIO_SAMPLE_RATE)
+            else:
+                processed += len(message)
+                if resampler:
+                    message = resampler.process(message)
+                if not recording.feed(message):
+                    reason = recording.stop_reason
+                ws.send(json.dumps({'type': 'ack', 'bytes': processed}))
+                
+                text = recording.get_partial_transcript()
+                if text != partial_text:
+                    partial_text = text
+                    ws.send(json.dumps({'type': 'partial', 'text': text}))
+        
+        recording.finish()
+        ws.send(json.dumps({'type': 'stopped', 'reason': reason}))
+        
+        text = None
+        if len(recording.capture):
+            try:
+                with admission.admit('stt'):
+                    text = audio_handler.finish_transcription(recording.get_audio_data(), recording)
+            except AdmissionRejected as e:
+                ws.send(json.dumps({
+                    'type': 'error',
+                    'error': 'The voice chatbot is busy, please try again shortly',
+                    'retry_after': e.retry_after
+                }))
+                return
+        ws.send(json.dumps({'type': 'transcript', 'text': text or ''}))
+        
+    except ConnectionClosed:
+        pass
+    finally:
+        recording.finish()
+        audio_handler.close_remote_recording()
+
+if sock:
+    sock.route('/audio_stream')(audio_stream)
+
 @app.route('/send_text', methods=['POST'])
 def send_text():
     """Process text input and generate AI response."""
-    global conversation_history
+    not_ready = not_ready_response('openrouter_api', 'tts')
+    if not_ready:
+        return not_ready
+    
     try:
         data = request.get_json()
+        session_id = get_session_id()
         text = data.get('text', '').strip()
         
         if not text:
             return jsonify({'success': False, 'error': 'No text provided'})
         
-        # Get AI response
-        ai_response = openrouter_api.generate_response(text, conversation_history=conversation_history)
+        if wants_stream(data):
+            return stream_turn(session_id, text, audio_output=get_audio_output(data))
         
-        # Update conversation history
-        conversation_history.append({"role": "user", "content": text})
-        conversation_history.append({"role": "assistant", "content": ai_response})
+        with admission.admit('llm'):
+            cancel_token = turn_manager.begin_turn(session_id)
+            
+            # Get AI response
+            ai_response = openrouter_api.generate_response(
+                text,
+                conversation_history=conversation_store.get_history(session_id)
+            )
         
-        # Keep conversation history manageable
-        if len(conversation_history) > 20:
-            conversation_history = conversation_history[-20:]
+        # Update conversation history
+        conversation_store.append_exchange(session_id, text, ai_response)
         
-        # Speak the response
-        if ai_response:
-            tts.speak(ai_response)
+        # Speak the response; clients playing speech themselves fetch it from /synthesize
+        if ai_response and get_audio_output(data) == 'server':
+            tts.speak(ai_response, cancel_token=cancel_token)
         
         return jsonify({
             'success': True,
             'ai_response': ai_response
         })
         
+    except AdmissionRejected as e:
+        return overloaded_response(e)
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)})
 
 @app.route('/stop_speaking', methods=['POST'])
 def stop_speaking():
     """Stop text-to-speech playback."""
+    not_ready = not_ready_response('tts')
+    if not_ready:
+        return not_ready
+    
     try:
+        # Also stops the response that is still being generated
+        turn_manager.cancel(get_session_id(), 'stopped')
         tts.stop_speaking()
         return jsonify({'success': True, 'message': 'Speech stopped'})
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)})
 
+@app.route('/synthesize', methods=['POST'])
+def synthesize():
+    """Synthesize text with the session's voice settings and return it as a WAV file."""
+    not_ready = not_ready_response('tts')
+    if not_ready:
+        return not_ready
+    
+    try:
+        from utils.text_to_speech import encode_wav
+        data = request.get_json(silent=True) or {}
+        text = data.get('text', '').strip()
+        
+        if not text:
+            return jsonify({'success': False, 'error': 'No text provided'})
+        
+        with admission.admit('tts'):
+            audio = tts.synthesize(text, get_session_voice())
+        if audio is None:
+            return jsonify({'success': False, 'error': 'Speech synthesis failed'})
+        return Response(encode_wav(audio), mimetype='audio/wav')
+    except AdmissionRejected as e:
+        return overloaded_response(e)
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)})
+
+@app.route('/voice_settings', methods=['GET', 'POST'])
+def voice_settings():
+    """Get or change the voice this session's speech is synthesized with."""
+    not_ready = not_ready_response('tts')
+    if not_ready:
+        return not_ready
+    
+    try:
+        if request.method == 'POST':
+            data = request.get_json(silent=True) or {}
+            overrides = dict(session.get('voice_settings', {}))
+            overrides.update({name: data[name] for name in ('voice', 'rate', 'volume') if name in data})
+            settings = tts.make_voice_settings(**overrides)
+            session['voice_settings'] = settings._asdict()
+        else:
+            settings = get_session_voice()
+        
+        return jsonify({
+            'success': True,
+            'settings': settings._asdict(),
+            'voices': [{'id': voice_id, 'name': name} for voice_id, name in tts.get_voices()]
+        })
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)})
+
 @app.route('/clear_history', methods=['POST'])
 def clear_history():
     """Clear conversation history."""
-    global conversation_history
     try:
-        conversation_history = []
+        conversation_store.clear(get_session_id())
         return jsonify({'success': True, 'message': 'History cleared'})
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)})
@@ -622,19 +1455,21 @@ def clear_history():
 @app.route('/status')
 def get_status():
     """Get current application status."""
-    return jsonify({
-        'recording': audio_handler.is_recording if audio_handler else False,
-        'speaking': tts.is_busy() if tts else False,
-        'conversation_length': len(conversation_history),
-        'components_initialized': all([audio_handler, openrouter_api, tts])
-    })
+    return jsonify(build_status(get_session_id()))
 
 @app.route('/models')
 def get_models():
     """Get available AI models."""
+    not_ready = not_ready_response('openrouter_api')
+    if not_ready:
+        return not_ready
+    
     try:
-        models = openrouter_api.get_available_models()
-        return jsonify({'success': True, 'models': models})
+        # Served from the pre-serialized catalog snapshot
+        models_json = openrouter_api.model_catalog.get_models_json()
+        if models_json is None:
+            return jsonify({'success': False, 'error': 'Model list unavailable'})
+        return Response(models_json, mimetype='application/json')
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)})
 
@@ -665,15 +1500,14 @@ def run_console_mode():
                     # Get AI response
                     ai_response = openrouter_api.generate_response(
                         transcribed_text, 
-                        conversation_history=conversation_history
+                        conversation_history=conversation_store.get_history(CONSOLE_SESSION_ID)
                     );
                     
                     if ai_response:
                         print(f"AI: {ai_response}")
                         
                         # Update conversation history
-                        conversation_history.append({"role": "user", "content": transcribed_text})
-                        conversation_history.append({"role": "assistant", "content": ai_response})
+                        conversation_store.append_exchange(CONSOLE_SESSION_ID, transcribed_text, ai_response)
                         
                         # Speak the response
                         tts.speak(ai_response, blocking=True);
@@ -686,15 +1520,14 @@ def run_console_mode():
                     # Get AI response
                     ai_response = openrouter_api.generate_response(
                         text, 
-                        conversation_history=conversation_history
+                        conversation_history=conversation_store.get_history(CONSOLE_SESSION_ID)
                     );
                     
                     if ai_response:
                         print(f"AI: {ai_response}")
                         
                         # Update conversation history
-                        conversation_history.append({"role": "user", "content": text})
-                        conversation_history.append({"role": "assistant", "content": ai_response})
+                        conversation_store.append_exchange(CONSOLE_SESSION_ID, text, ai_response)
                         
                         # Speak the response
                         tts.speak(ai_response, blocking=True);
@@ -706,31 +1539,54 @@ def run_console_mode():
     except Exception as e:
         print(f"Error in console mode: {e}")
 
-if __name__ == '__main__':
-    # Set up signal handlers for graceful shutdown
-    signal.signal(signal.SIGINT, signal_handler)
-    signal.signal(signal.SIGTERM, signal_handler)
-    
-    # Initialize components
-    if not initialize_components():
-        print("Failed to initialize components. Exiting.")
+def run_asgi_server():
+    """Serve the app with uvicorn; asgi.py initializes and cleans up the components on its own."""
+    try:
+        import uvicorn
+    except ImportError:
+        print("✗ SERVER_MODE=asgi requires uvicorn, starlette and a2wsgi")
         sys.exit(1)
     
+    # Loaded by import path: asgi.py imports this file as the app module, whose globals the Flask routes use
+    uvicorn.run(
+        'asgi:application',
+        host=config.SERVER_HOST,
+        port=config.SERVER_PORT,
+        log_level='debug' if config.DEBUG else 'info'
+    )
+
+if __name__ == '__main__':
     # Check if running in web mode or console mode
-    import sys
-    if len(sys.argv) > 1 and sys.argv[1] == 'console':
+    console_mode = len(sys.argv) > 1 and sys.argv[1] == 'console'
+    asgi_mode = not console_mode and config.SERVER_MODE == 'asgi'
+    
+    if not asgi_mode:
+        # Set up signal handlers for graceful shutdown; uvicorn installs its own
+        signal.signal(signal.SIGINT, signal_handler)
+        signal.signal(signal.SIGTERM, signal_handler)
+        
+        # Initialize components; the web server starts listening while they load
+        if not initialize_components(wait=console_mode):
+            print("Failed to initialize components. Exiting.")
+            sys.exit(1)
+    
+    if console_mode:
         run_console_mode()
     else:
-        print(f"\n🚀 Starting Voice Chatbot Web Server...")
-        print(f"📱 Open your browser and go to: http://localhost:5000")
+        print(f"\n🚀 Starting Voice Chatbot Web Server ({config.SERVER_MODE})...")
+        print(f"📱 Open your browser and go to: http://localhost:{config.SERVER_PORT}")
         print(f"🎤 You can speak or type messages to interact with the AI")
         print(f"⌨️  Or run 'python app.py console' for console mode")
         print(f"🛑 Press Ctrl+C to stop the server\n")
         
+        if asgi_mode:
+            run_asgi_server()
+            sys.exit(0)
+        
         try:
             app.run(
-                host='0.0.0.0',
-                port=5000,
+                host=config.SERVER_HOST,
+                port=config.SERVER_PORT,
                 debug=config.DEBUG,
                 threaded=True,
                 use_reloader=False  # Disable reloader to prevent component re-initialization issues
@@ -738,4 +1594,4 @@ if __name__ == '__main__':
         except KeyboardInterrupt:
             print("\nShutting down...")
         finally:
-            cleanup_components()
\ No newline at end of file
+            cleanup_components()
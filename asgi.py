@@ -0,0 +1,487 @@
+"""
+ASGI entry point: serves the conversation routes as coroutines on one event loop.
+
+    SERVER_MODE=asgi python app.py
+    uvicorn asgi:application --host 0.0.0.0 --port 5000
+
+/send_text, /stop_recording, /status and /models run natively here and call
+the LLM through AsyncOpenRouterAPI, so a turn waiting on the model holds no
+thread. Speech recognition and synthesis block, so they run on bounded
+thread pools. Every other route is still served by the Flask app in app.py,
+and the /audio_stream WebSocket runs the same handler as under flask-sock.
+"""
+
+import asyncio
+import queue
+import threading
+import uuid
+import weakref
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import aclosing, asynccontextmanager, contextmanager
+from functools import partial
+from a2wsgi import WSGIMiddleware
+from itsdangerous import BadSignature
+from starlette.applications import Starlette
+from starlette.responses import JSONResponse, Response, StreamingResponse
+from starlette.routing import Mount, Route, WebSocketRoute
+from starlette.websockets import WebSocketDisconnect
+from werkzeug.datastructures import MIMEAccept
+from werkzeug.http import parse_accept_header
+import app as flask_app
+from utils.admission import AdmissionRejected
+from utils.async_openrouter_api import AsyncOpenRouterAPI
+
+config = flask_app.config
+async_api = None
+# Blocking speech work; bounded so a burst of turns queues instead of spawning threads.
+# Client speech synthesis gets a thread per TTS admission slot.
+stt_executor = None
+tts_executor = None
+# One thread per open browser microphone, capped like the recordings themselves
+audio_executor = None
+
+SSE_HEADERS = {'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+
+def open_session(request):
+    """
+    Read the Flask session cookie, so browsers keep their session across both servers.
+    
+    Returns:
+        tuple: (session data, whether the cookie has to be set)
+    """
+    serializer = flask_app.app.session_interface.get_signing_serializer(flask_app.app)
+    cookie = request.cookies.get(flask_app.app.config['SESSION_COOKIE_NAME'])
+    data = {}
+    if cookie:
+        try:
+            data = serializer.loads(cookie, max_age=int(flask_app.app.permanent_session_lifetime.total_seconds()))
+        except BadSignature:
+            data = {}
+    
+    if 'session_id' in data:
+        return data, False
+    data['session_id'] = uuid.uuid4().hex
+    return data, True
+
+def save_session(response, data):
+    """Set the Flask session cookie on a response."""
+    flask_config = flask_app.app.config
+    serializer = flask_app.app.session_interface.get_signing_serializer(flask_app.app)
+    response.set_cookie(
+        flask_config['SESSION_COOKIE_NAME'],
+        serializer.dumps(data),
+        path=flask_config['SESSION_COOKIE_PATH'] or flask_config['APPLICATION_ROOT'],
+        domain=flask_config['SESSION_COOKIE_DOMAIN'],
+        secure=flask_config['SESSION_COOKIE_SECURE'],
+        httponly=flask_config['SESSION_COOKIE_HTTPONLY'],
+        samesite=flask_config['SESSION_COOKIE_SAMESITE']
+    )
+    return response
+
+def session_response(response, session_data, new_session):
+    """Attach the session cookie to a response if the session was just created."""
+    return save_session(response, session_data) if new_session else response
+
+def get_async_api():
+    """Create the asyncio client on first use, sharing the response cache of the blocking client."""
+    global async_api
+    if async_api is None:
+        async_api = AsyncOpenRouterAPI(response_cache=flask_app.openrouter_api.response_cache)
+    return async_api
+
+def not_ready_response(*names):
+    """Build an error response if any of the named components isn't ready; see app.not_ready_response."""
+    if flask_app.components_ready(*names):
+        return None
+    failed = flask_app.failed_components(*names)
+    if failed:
+        return JSONResponse({
+            'success': False,
+            'error': flask_app.not_ready_error(failed),
+            'components': flask_app.component_status
+        }, status_code=500)
+    return JSONResponse({
+        'success': False,
+        'error': 'Voice chatbot is still starting up',
+        'components': flask_app.component_status
+    }, status_code=503, headers={'Retry-After': '1'})
+
+def overloaded_response(rejected, **extra):
+    """Build a 429 response for a request a saturated stage turned away."""
+    return JSONResponse({
+        'success': False,
+        'error': 'The voice chatbot is busy, please try again shortly',
+        'stage': rejected.stage,
+        'retry_after': rejected.retry_after,
+        **extra
+    }, status_code=429, headers={'Retry-After': str(rejected.retry_after)})
+
+def wants_stream(request, data):
+    """Check whether the client asked for a streamed (SSE) turn."""
+    if data and data.get('stream'):
+        return True
+    return parse_accept_header(request.headers.get('accept'), MIMEAccept).best == 'text/event-stream'
+
+async def read_json(request):
+    """Parse a JSON request body, or return {} if there is none."""
+    try:
+        data = await request.json()
+    except ValueError:
+        return {}
+    return data if isinstance(data, dict) else {}
+
+@contextmanager
+def cancellation_event(cancel_token):
+    """Mirror a turn's CancellationToken, which other threads cancel, into an asyncio.Event."""
+    loop = asyncio.get_running_loop()
+    cancel_event = asyncio.Event()
+    set_event = partial(loop.call_soon_threadsafe, cancel_event.set)
+    cancel_token.add_callback(set_event)
+    try:
+        yield cancel_event
+    finally:
+        cancel_token.remove_callback(set_event)
+
+async def admit_turn(audio_output):
+    """Reserve the stages a streamed turn needs without blocking the event loop; see app.admit_turn."""
+    tickets = [await flask_app.admission.admit_async('llm')]
+    if audio_output == 'client':
+        try:
+            tickets.append(await flask_app.admission.admit_async('tts'))
+        except BaseException:
+            tickets[0].release()
+            raise
+    return tickets
+
+def stream_turn(session_id, user_text, tickets, transcribed=False, audio_output='server', voice_settings=None):
+    """
+    Stream an AI response over SSE while speaking sentences as they complete.
+    
+    Emits the same events as app.stream_turn. Tokens come from the event loop
+    and are fed through a queue to the speech thread: the TTS pool for client
+    playback, or a thread of its own for server playback as in app.py.
+    The admission tickets from admit_turn are released as the stages finish.
+    """
+    cancel_token = flask_app.turn_manager.begin_turn(session_id)
+    
+    async def generate():
+        loop = asyncio.get_running_loop()
+        speech_tokens = queue.Queue()
+        # 'audio' events of sentences synthesized for the client, then None
+        audio_events = asyncio.Queue()
+        audio_done = audio_output != 'client'
+        if audio_output == 'client':
+            loop.run_in_executor(
+                tts_executor,
+                flask_app.synthesize_for_client,
+                iter(speech_tokens.get, None),
+                voice_settings,
+                cancel_token,
+                partial(loop.call_soon_threadsafe, audio_events.put_nowait)
+            )
+        else:
+            # Server playback holds no TTS slot, so it doesn't take a pool thread either
+            threading.Thread(
+                target=flask_app.tts.speak_streaming,
+                args=(iter(speech_tokens.get, None), cancel_token),
+                daemon=True
+            ).start()
+        
+        async def pending_audio(block):
+            nonlocal audio_done
+            events = []
+            while not audio_done:
+                if block:
+                    event = await audio_events.get()
+                elif audio_events.empty():
+                    break
+                else:
+                    event = audio_events.get_nowait()
+                if event is None:
+                    audio_done = True
+                else:
+                    events.append(event)
+            return events
+        
+        response_parts = []
+        finished = False
+        try:
+            if transcribed:
+                yield flask_app.sse_event('transcript', {'transcribed_text': user_text})
+            
+            with cancellation_event(cancel_token) as cancel_event:
+                async with aclosing(get_async_api().generate_streaming_response(
+                    user_text,
+                    conversation_history=flask_app.conversation_store.get_history(session_id),
+                    cancel_event=cancel_event
+                )) as tokens:
+                    async for token in tokens:
+                        response_parts.append(token)
+                        speech_tokens.put(token)
+                        yield flask_app.sse_event('token', {'token': token})
+                        # Sentences synthesized for the client in the meantime
+                        for event in await pending_audio(block=False):
+                            yield event
+            tickets[0].release()
+            
+            ai_response = ''.join(response_parts)
+            
+            # Update conversation history; a cut-off answer is kept as far as it got
+            if ai_response or not cancel_token.is_cancelled:
+                flask_app.conversation_store.append_exchange(session_id, user_text, ai_response)
+            
+            speech_tokens.put(None)
+            for event in await pending_audio(block=True):
+                yield event
+            for ticket in tickets:
+                ticket.release()
+            
+            if cancel_token.is_cancelled:
+                yield flask_app.sse_event('cancelled', {'reason': cancel_token.reason, 'ai_response': ai_response})
+            else:
+                yield flask_app.sse_event('done', {'success': True, 'ai_response': ai_response})
+            finished = True
+        
+        except Exception as e:
+            yield flask_app.sse_event('error', {'success': False, 'error': str(e)})
+        finally:
+            # Flush the remaining text to TTS, also when the client disconnects
+            speech_tokens.put(None)
+            if audio_output == 'client' and not finished:
+                # Nobody is left to play the rest of the speech
+                cancel_token.cancel('disconnected')
+            for ticket in tickets:
+                ticket.release()
+    
+    body = generate()
+    # A stream that never starts, e.g. because the client left, is released once it is dropped
+    for ticket in tickets:
+        weakref.finalize(body, ticket.release)
+    return StreamingResponse(body, media_type='text/event-stream', headers=SSE_HEADERS)
+
+async def respond_to(request, session_data, new_session, data, user_text, transcribed=False):
+    """
+    Answer a user message, streamed or as one JSON response.
+    
+    Raises:
+        AdmissionRejected: If the turn can't be admitted
+    """
+    session_id = session_data['session_id']
+    audio_output = flask_app.get_audio_output(data)
+    
+    if wants_stream(request, data):
+        # Admitted first, so a rejected request doesn't cancel the turn in flight
+        tickets = await admit_turn(audio_output)
+        voice_settings = flask_app.get_session_voice(session_data) if audio_output == 'client' else None
+        response = stream_turn(session_id, user_text, tickets, transcribed, audio_output, voice_settings)
+        return session_response(response, session_data, new_session)
+    
+    with await flask_app.admission.admit_async('llm'):
+        cancel_token = flask_app.turn_manager.begin_turn(session_id)
+        
+        # Get AI response; barge-in or /stop_speaking abort the request
+        with cancellation_event(cancel_token) as cancel_event:
+            ai_response = await get_async_api().generate_response(
+                user_text,
+                conversation_history=flask_app.conversation_store.get_history(session_id),
+                cancel_event=cancel_event
+            )
+    if ai_response is None:
+        return session_response(
+            JSONResponse({'success': False, 'error': 'Response cancelled'}), session_data, new_session
+        )
+    
+    # Update conversation history
+    flask_app.conversation_store.append_exchange(session_id, user_text, ai_response)
+    
+    # Speak the response; queuing it for the speech thread doesn't block
+    if ai_response and audio_output == 'server':
+        flask_app.tts.speak(ai_response, cancel_token=cancel_token)
+    
+    result = {'success': True, 'ai_response': ai_response}
+    if transcribed:
+        result['transcribed_text'] = user_text
+    return session_response(JSONResponse(result), session_data, new_session)
+
+async def send_text(request):
+    """Process text input and generate AI response."""
+    not_ready = not_ready_response('openrouter_api', 'tts')
+    if not_ready:
+        return not_ready
+    
+    try:
+        data = await read_json(request)
+        session_data, new_session = open_session(request)
+        text = str(data.get('text', '')).strip()
+        
+        if not text:
+            return JSONResponse({'success': False, 'error': 'No text provided'})
+        
+        return await respond_to(request, session_data, new_session, data, text)
+    
+    except AdmissionRejected as e:
+        return overloaded_response(e)
+    except Exception as e:
+        return JSONResponse({'success': False, 'error': str(e)})
+
+async def stop_recording(request):
+    """Stop recording and process the audio."""
+    data = await read_json(request)
+    not_ready = not_ready_response(*flask_app.turn_components(data, wants_stream(request, data)))
+    if not_ready:
+        return not_ready
+    
+    try:
+        session_data, new_session = open_session(request)
+        
+        # The microphone is stopped even if the server is too busy to transcribe
+        loop = asyncio.get_running_loop()
+        audio_handler = flask_app.audio_handler
+        audio = await loop.run_in_executor(stt_executor, audio_handler.stop_recording)
+        if not audio:
+            return JSONResponse({'success': False, 'error': 'No audio recorded'})
+        
+        try:
+            stt_ticket = await flask_app.admission.admit_async('stt')
+        except BaseException:
+            audio_handler.release_audio(audio)
+            raise
+        with stt_ticket:
+            transcribed_text = await loop.run_in_executor(stt_executor, flask_app.transcribe_recording, audio)
+        
+        if not transcribed_text:
+            return JSONResponse({'success': False, 'error': 'Could not transcribe audio'})
+        
+        try:
+            return await respond_to(request, session_data, new_session, data, transcribed_text, transcribed=True)
+        except AdmissionRejected as e:
+            # The recording is used up; hand back its transcript so it can be sent as text
+            return overloaded_response(e, transcribed_text=transcribed_text)
+    
+    except AdmissionRejected as e:
+        return overloaded_response(e)
+    except Exception as e:
+        return JSONResponse({'success': False, 'error': str(e)})
+
+async def get_status(request):
+    """Get current application status."""
+    session_data, new_session = open_session(request)
+    return session_response(
+        JSONResponse(flask_app.build_status(session_data['session_id'], 'asgi')), session_data, new_session
+    )
+
+async def get_models(request):
+    """Get available AI models."""
+    not_ready = not_ready_response('openrouter_api')
+    if not_ready:
+        return not_ready
+    
+    try:
+        # Served from the pre-serialized catalog snapshot
+        models_json = flask_app.openrouter_api.model_catalog.get_models_json()
+        if models_json is None:
+            return JSONResponse({'success': False, 'error': 'Model list unavailable'})
+        return Response(models_json, media_type='application/json')
+    except Exception as e:
+        return JSONResponse({'success': False, 'error': str(e)})
+
+class BlockingWebSocket:
+    """Blocking send()/receive(timeout) over an ASGI WebSocket, for handlers written for flask-sock."""
+    
+    def __init__(self, websocket, loop):
+        self.websocket = websocket
+        self.loop = loop
+    
+    def _call(self, coro):
+        return asyncio.run_coroutine_threadsafe(coro, self.loop).result()
+    
+    def send(self, data):
+        try:
+            if isinstance(data, str):
+                self._call(self.websocket.send_text(data))
+            else:
+                self._call(self.websocket.send_bytes(data))
+        except (WebSocketDisconnect, RuntimeError, OSError):
+            raise flask_app.ConnectionClosed()
+    
+    def receive(self, timeout=None):
+        """Get the next text or binary message, or None after timeout seconds."""
+        try:
+            message = self._call(asyncio.wait_for(self.websocket.receive(), timeout))
+        except asyncio.TimeoutError:
+            return None
+        except (WebSocketDisconnect, RuntimeError, OSError):
+            raise flask_app.ConnectionClosed()
+        
+        if message['type'] == 'websocket.disconnect':
+            raise flask_app.ConnectionClosed()
+        if message.get('bytes') is not None:
+            return message['bytes']
+        return message.get('text')
+
+async def audio_stream(websocket):
+    """Receive a recording from the browser microphone; see app.audio_stream."""
+    session_data, _ = open_session(websocket)
+    await websocket.accept()
+    
+    loop = asyncio.get_running_loop()
+    try:
+        await loop.run_in_executor(
+            audio_executor, flask_app.audio_stream, BlockingWebSocket(websocket, loop), session_data['session_id']
+        )
+    finally:
+        try:
+            await websocket.close()
+        except RuntimeError:
+            # Already closed by the browser
+            pass
+
+def create_application(initialize=True):
+    """
+    Build the ASGI application.
+    
+    Args:
+        initialize (bool): Initialize the components on startup and clean them up on shutdown;
+            pass False when they are set up by the caller
+    """
+    
+    @asynccontextmanager
+    async def lifespan(_):
+        global stt_executor, tts_executor, audio_executor
+        
+        if initialize and not flask_app.initialize_components(wait=False):
+            raise RuntimeError("Failed to initialize components")
+        
+        stt_executor = ThreadPoolExecutor(max_workers=config.ASGI_STT_WORKERS, thread_name_prefix='asgi-stt')
+        tts_executor = ThreadPoolExecutor(
+            max_workers=flask_app.admission.stages['tts'].concurrency or config.ASGI_TTS_WORKERS,
+            thread_name_prefix='asgi-tts'
+        )
+        audio_executor = ThreadPoolExecutor(
+            max_workers=config.REMOTE_AUDIO_MAX_SESSIONS, thread_name_prefix='asgi-audio'
+        )
+        
+        try:
+            yield
+        finally:
+            if async_api:
+                await async_api.close()
+            for executor in (stt_executor, tts_executor, audio_executor):
+                executor.shutdown(wait=False, cancel_futures=True)
+            if initialize:
+                flask_app.cleanup_components()
+    
+    routes = [
+        Route('/send_text', send_text, methods=['POST']),
+        Route('/stop_recording', stop_recording, methods=['POST']),
+        Route('/status', get_status, methods=['GET']),
+        Route('/models', get_models, methods=['GET'])
+    ]
+    if flask_app.SOCK_AVAILABLE:
+        routes.append(WebSocketRoute('/audio_stream', audio_stream))
+    # Everything else is served by Flask on a bounded pool of threads
+    routes.append(Mount('/', app=WSGIMiddleware(flask_app.app, workers=config.ASGI_WSGI_WORKERS)))
+    
+    return Starlette(routes=routes, lifespan=lifespan)
+
+application = create_application()
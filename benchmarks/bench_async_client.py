@@ -0,0 +1,63 @@
+"""
+Run many concurrent turns through AsyncOpenRouterAPI against the local stand-in server.
+
+    python benchmarks/bench_async_client.py --turns 300 --latency 0.5
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('OPENROUTER_API_KEY', 'benchmark')
+
+from stub_openrouter import start_stub_server
+from utils.async_openrouter_api import AsyncOpenRouterAPI
+
+async def stream_turn(api, index):
+    parts = []
+    async for token in api.generate_streaming_response(f"question {index}"):
+        parts.append(token)
+    return ''.join(parts)
+
+async def cancelled_turn(api, cancel_after):
+    cancel_event = asyncio.Event()
+    asyncio.get_running_loop().call_later(cancel_after, cancel_event.set)
+    start = time.perf_counter()
+    async for _ in api.generate_streaming_response("long answer", cancel_event=cancel_event):
+        pass
+    return time.perf_counter() - start
+
+async def main(args):
+    server, base_url = start_stub_server(
+        latency=args.latency, tokens=args.tokens, token_delay=args.token_delay
+    )
+
+    async with AsyncOpenRouterAPI() as api:
+        api.base_url = base_url
+
+        start = time.perf_counter()
+        results = await asyncio.gather(*(api.generate_response(f"question {i}") for i in range(args.turns)))
+        elapsed = time.perf_counter() - start
+        print(f"blocking:  {len(results)} concurrent turns in {elapsed:.2f}s")
+
+        start = time.perf_counter()
+        results = await asyncio.gather(*(stream_turn(api, i) for i in range(args.turns)))
+        elapsed = time.perf_counter() - start
+        print(f"streaming: {len(results)} concurrent turns in {elapsed:.2f}s")
+
+        elapsed = await cancelled_turn(api, args.cancel_after)
+        print(f"cancelled stream returned {elapsed - args.cancel_after:.4f}s after cancel")
+
+    server.shutdown()
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--turns', type=int, default=200)
+    parser.add_argument('--latency', type=float, default=0.5)
+    parser.add_argument('--tokens', type=int, default=20)
+    parser.add_argument('--token-delay', type=float, default=0.01)
+    parser.add_argument('--cancel-after', type=float, default=0.6)
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,68 @@
+"""
+Benchmark the CPU cost of preparing captured audio for the recognizer:
+downmixing to mono and downsampling to the recognizer's native rate.
+
+    python benchmarks/bench_resample.py --seconds 30 --channels 2
+"""
+
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+import speech_recognition as sr
+from utils.audio_handler import PolyphaseResampler, downmix_to_mono, resample_audio_data, SAMPLE_WIDTH
+
+def synthesize(seconds, sample_rate, channels, seed=0):
+    """Voiced harmonics plus noise, interleaved across channels."""
+    rng = np.random.default_rng(seed)
+    t = np.arange(int(seconds * sample_rate)) / sample_rate
+    speech = sum(np.sin(2 * np.pi * f * t) / (i + 1) for i, f in enumerate((140, 280, 420, 560, 700)))
+    signal = 6000 * speech + rng.normal(0, 300, len(t))
+    pcm = np.clip(signal, -32768, 32767).astype(np.int16)
+    return np.repeat(pcm, channels).tobytes()
+
+def timed(fn, repeat):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--seconds', type=float, default=30)
+    parser.add_argument('--sample-rate', type=int, default=44100)
+    parser.add_argument('--target-rate', type=int, default=16000)
+    parser.add_argument('--channels', type=int, default=1)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    pcm = synthesize(args.seconds, args.sample_rate, args.channels)
+
+    elapsed, mono = timed(lambda: downmix_to_mono(pcm, args.channels), args.repeat)
+    print(f"downmix ({args.channels} ch)    {elapsed / args.seconds * 1000:7.3f} ms per audio second")
+
+    audio = sr.AudioData(mono.tobytes(), args.sample_rate, SAMPLE_WIDTH)
+    elapsed, _ = timed(lambda: PolyphaseResampler(args.sample_rate, args.target_rate), args.repeat)
+    print(f"filter design         {elapsed * 1000:7.3f} ms once per rate pair")
+
+    elapsed, resampled = timed(lambda: resample_audio_data(audio, args.target_rate), args.repeat)
+    print(f"polyphase resample    {elapsed / args.seconds * 1000:7.3f} ms per audio second")
+
+    try:
+        elapsed, _ = timed(lambda: audio.get_raw_data(convert_rate=args.target_rate), args.repeat)
+        print(f"audioop ratecv        {elapsed / args.seconds * 1000:7.3f} ms per audio second (no anti-alias filter)")
+    except Exception as e:
+        print(f"audioop ratecv        unavailable: {e}")
+
+    print(f"payload               {len(audio.frame_data) / args.seconds / 1024:7.1f} KiB/s -> "
+          f"{len(resampled.frame_data) / args.seconds / 1024:.1f} KiB/s "
+          f"({len(audio.frame_data) / len(resampled.frame_data):.2f}x smaller)")
+
+if __name__ == '__main__':
+    main()
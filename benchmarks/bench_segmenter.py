@@ -0,0 +1,118 @@
+"""
+Benchmark splitting long streamed responses into speakable chunks: the
+original speak_streaming splitter against SentenceSegmenter.
+
+    python benchmarks/bench_segmenter.py --sizes 10000 100000
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.sentence_segmenter import SentenceSegmenter
+
+SENTENCES = [
+    "Sure, I can help with that.",
+    "The recipe needs 3.5 cups of flour, e.g. all-purpose or bread flour.",
+    "Dr. Smith recommends resting the dough for 45 minutes.",
+    "Is that too long?",
+    "Not at all!",
+    "Bake it at 220 degrees, then let it cool on a rack before slicing it into even pieces.",
+    "Mr. and Mrs. Jones liked it a lot."
+]
+# Periods that must not end a chunk
+FALSE_SPLIT_MARKERS = ('3.', 'e.g.', 'Dr.', 'Mr.', 'Mrs.')
+
+def make_response(size, seed=0, punctuation=True):
+    """Build a response of about size characters, streamed as LLM-sized tokens."""
+    rng = random.Random(seed)
+    parts = []
+    length = 0
+    while length < size:
+        sentence = rng.choice(SENTENCES)
+        if not punctuation:
+            sentence = sentence.replace('.', '').replace('!', '').replace('?', '').replace(',', '')
+        parts.append(sentence)
+        length += len(sentence) + 1
+    text = ' '.join(parts)
+
+    tokens = []
+    position = 0
+    while position < len(text):
+        step = rng.randint(2, 6)
+        tokens.append(text[position:position + step])
+        position += step
+    return tokens
+
+def legacy_segment(tokens):
+    """The original speak_streaming splitting, collecting chunks instead of speaking them."""
+    chunks = []
+    first_chunk_at = None
+    consumed = 0
+    accumulated_text = ""
+    sentence_endings = ['.', '!', '?', '\n']
+    for chunk in tokens:
+        accumulated_text += chunk
+        consumed += len(chunk)
+        for ending in sentence_endings:
+            if ending in accumulated_text:
+                sentences = accumulated_text.split(ending)
+                for sentence in sentences[:-1]:
+                    if sentence.strip():
+                        chunks.append(sentence.strip() + ending)
+                        if first_chunk_at is None:
+                            first_chunk_at = consumed
+                accumulated_text = sentences[-1]
+                break
+    if accumulated_text.strip():
+        chunks.append(accumulated_text.strip())
+    return chunks, first_chunk_at or consumed
+
+def segmenter_segment(tokens):
+    segmenter = SentenceSegmenter()
+    chunks = []
+    first_chunk_at = None
+    consumed = 0
+    for chunk in tokens:
+        consumed += len(chunk)
+        ready = segmenter.feed(chunk)
+        if ready and first_chunk_at is None:
+            first_chunk_at = consumed
+        chunks.extend(ready)
+    chunks.extend(segmenter.flush())
+    return chunks, first_chunk_at or consumed
+
+def run(label, segment, tokens):
+    start = time.perf_counter()
+    chunks, first_chunk_at = segment(tokens)
+    elapsed = time.perf_counter() - start
+    false_splits = sum(1 for chunk in chunks if chunk.endswith(FALSE_SPLIT_MARKERS))
+    average = sum(len(chunk) for chunk in chunks) / max(1, len(chunks))
+    print(f"  {label:<10} {elapsed * 1000:9.2f} ms  {elapsed / len(tokens) * 1e6:6.2f} us/token  "
+          f"{len(chunks):6d} chunks (avg {average:5.1f} chars)  first chunk after {first_chunk_at:4d} chars  "
+          f"{false_splits:5d} false splits")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--sizes', type=int, nargs='+', default=[2000, 20000, 200000])
+    args = parser.parse_args()
+
+    for size in args.sizes:
+        tokens = make_response(size)
+        print(f"{size} chars, {len(tokens)} tokens")
+        run('legacy', legacy_segment, tokens)
+        run('segmenter', segmenter_segment, tokens)
+
+    # Without sentence endings the legacy splitter rescans an ever-growing buffer
+    size = args.sizes[-1] // 10
+    tokens = make_response(size, punctuation=False)
+    print(f"{size} chars without punctuation, {len(tokens)} tokens")
+    run('legacy', legacy_segment, tokens)
+    run('segmenter', segmenter_segment, tokens)
+
+if __name__ == '__main__':
+    main()
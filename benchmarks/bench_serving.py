@@ -0,0 +1,178 @@
+"""
+Compare the two serving modes under concurrent conversation turns: the
+threaded Werkzeug server (SERVER_MODE=wsgi) and uvicorn running asgi.py
+(SERVER_MODE=asgi), both answering from the local stand-in LLM server.
+
+Each turn is a POST to /send_text from a new browser session while /status
+is polled alongside to measure how responsive the server stays.
+
+    python benchmarks/bench_serving.py --concurrency 50 200 --latency 0.5
+    python benchmarks/bench_serving.py --stream
+"""
+
+import argparse
+import asyncio
+import contextlib
+import io
+import logging
+import os
+import socket
+import sys
+import threading
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from stub_openrouter import start_stub_server
+
+class SilentTTS:
+    """Stands in for the speech engine so that only the serving path is measured."""
+
+    def speak(self, text, blocking=False, cancel_token=None):
+        pass
+
+    def speak_streaming(self, text_generator, cancel_token=None):
+        for _ in text_generator:
+            pass
+
+    def is_busy(self):
+        return False
+
+    def get_cache_stats(self):
+        return None
+
+    def cleanup(self):
+        pass
+
+def setup_components(app):
+    """Create only the components a text turn needs, pointed at the stand-in server."""
+    from utils.openrouter_api import OpenRouterAPI
+    app.openrouter_api = OpenRouterAPI()
+    app.tts = SilentTTS()
+    app.component_status.update(openrouter_api='ready', tts='ready', audio_handler='failed')
+
+def start_wsgi_server(app):
+    from werkzeug.serving import make_server
+    logging.getLogger('werkzeug').setLevel(logging.ERROR)
+    server = make_server('127.0.0.1', 0, app.app, threaded=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server.shutdown, f"http://127.0.0.1:{server.server_port}"
+
+def start_asgi_server():
+    import uvicorn
+    import asgi
+    listener = socket.socket()
+    listener.bind(('127.0.0.1', 0))
+    server = uvicorn.Server(uvicorn.Config(
+        asgi.create_application(initialize=False), log_level='warning', backlog=4096
+    ))
+    thread = threading.Thread(target=server.run, kwargs={'sockets': [listener]}, daemon=True)
+    thread.start()
+    while not server.started:
+        time.sleep(0.01)
+
+    def shutdown():
+        server.should_exit = True
+        thread.join()
+    return shutdown, f"http://127.0.0.1:{listener.getsockname()[1]}"
+
+def percentile(values, fraction):
+    if not values:
+        return float('nan')
+    values = sorted(values)
+    return values[min(len(values) - 1, int(fraction * len(values)))]
+
+async def turn(session, base_url, index, stream):
+    import aiohttp
+    start = time.perf_counter()
+    try:
+        async with session.post(
+            f"{base_url}/send_text",
+            json={'text': f"question {index}", 'stream': stream},
+            timeout=aiohttp.ClientTimeout(total=120)
+        ) as response:
+            body = await response.read()
+            ok = response.status == 200 and (b'event: done' in body if stream else b'"success":true' in body)
+    except Exception:
+        ok = False
+    return ok, time.perf_counter() - start
+
+async def poll_status(session, base_url, stop, latencies):
+    while not stop.is_set():
+        start = time.perf_counter()
+        try:
+            async with session.get(f"{base_url}/status") as response:
+                await response.read()
+            latencies.append(time.perf_counter() - start)
+        except Exception:
+            pass
+        await asyncio.sleep(0.05)
+
+async def run_load(base_url, concurrency, stream):
+    import aiohttp
+    # No cookies are kept, so every turn starts a new session
+    connector = aiohttp.TCPConnector(limit=0)
+    async with aiohttp.ClientSession(connector=connector, cookie_jar=aiohttp.DummyCookieJar()) as session:
+        stop = asyncio.Event()
+        status_latencies = []
+        poller = asyncio.create_task(poll_status(session, base_url, stop, status_latencies))
+
+        start = time.perf_counter()
+        results = await asyncio.gather(*(turn(session, base_url, i, stream) for i in range(concurrency)))
+        elapsed = time.perf_counter() - start
+        stop.set()
+        await poller
+    return results, elapsed, status_latencies
+
+def report(mode, concurrency, results, elapsed, status_latencies):
+    latencies = [latency for ok, latency in results if ok]
+    errors = len(results) - len(latencies)
+    print(f"  {mode:<5} {concurrency:5d} turns  {elapsed:6.2f}s  {len(latencies) / elapsed:7.1f} turns/s  "
+          f"p50 {percentile(latencies, 0.5):6.3f}s  p99 {percentile(latencies, 0.99):6.3f}s  "
+          f"{errors:4d} errors  /status p50 {percentile(status_latencies, 0.5) * 1000:7.1f} ms "
+          f"p99 {percentile(status_latencies, 0.99) * 1000:7.1f} ms")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--concurrency', type=int, nargs='+', default=[20, 100, 200])
+    parser.add_argument('--latency', type=float, default=0.5)
+    parser.add_argument('--tokens', type=int, default=20)
+    parser.add_argument('--token-delay', type=float, default=0.01)
+    parser.add_argument('--stream', action='store_true', help='Stream the turns over SSE')
+    parser.add_argument('--modes', nargs='+', default=['wsgi', 'asgi'], choices=['wsgi', 'asgi'])
+    parser.add_argument('--admission', action='store_true',
+                        help='Keep admission control on; turns it rejects count as errors')
+    args = parser.parse_args()
+
+    stub, base_url = start_stub_server(latency=args.latency, tokens=args.tokens, token_delay=args.token_delay)
+    # Must be set before the app reads its configuration
+    os.environ.update(
+        OPENROUTER_API_KEY='benchmark',
+        OPENROUTER_BASE_URL=base_url,
+        RESPONSE_CACHE_ENABLED='False',
+        SINGLE_FLIGHT_ENABLED='False',
+        ADMISSION_ENABLED=str(args.admission),
+        DEBUG='False'
+    )
+    import app
+    setup_components(app)
+
+    starters = {'wsgi': lambda: start_wsgi_server(app), 'asgi': start_asgi_server}
+    print(f"{'streamed' if args.stream else 'blocking'} turns, {args.latency}s to first token, "
+          f"{args.tokens} tokens {args.token_delay}s apart")
+    for mode in args.modes:
+        shutdown, server_url = starters[mode]()
+        try:
+            for concurrency in args.concurrency:
+                # The app logs every request; keep the report readable
+                with contextlib.redirect_stdout(io.StringIO()):
+                    measurement = asyncio.run(run_load(server_url, concurrency, args.stream))
+                report(mode, concurrency, *measurement)
+        finally:
+            shutdown()
+
+    stub.shutdown()
+
+if __name__ == '__main__':
+    main()
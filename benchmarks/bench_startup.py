@@ -0,0 +1,91 @@
+"""
+Benchmark web server startup: how long until the server accepts requests and
+until every component is ready, with sequential and parallel initialization.
+
+Starts app.py against the local OpenRouter stand-in with an empty cache
+directory, so the model catalog is fetched from scratch. Uses port 5000.
+
+    python benchmarks/bench_startup.py --models-latency 0.5 --runs 3
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from stub_openrouter import start_stub_server
+
+STATUS_URL = 'http://127.0.0.1:5000/status'
+
+def get_status():
+    """Fetch /status, or None while the server isn't listening."""
+    try:
+        with urllib.request.urlopen(STATUS_URL, timeout=1) as response:
+            return json.loads(response.read())
+    except OSError:
+        return None
+
+def measure_import(statement):
+    """Time an import statement in a fresh interpreter."""
+    code = f"import time; start = time.perf_counter(); {statement}; print(time.perf_counter() - start)"
+    output = subprocess.run([sys.executable, '-c', code], cwd=ROOT, capture_output=True, text=True).stdout
+    return float(output.strip().splitlines()[-1])
+
+def measure_startup(base_url, parallel, timeout=60):
+    """Start the app and return (seconds until listening, seconds until ready)."""
+    env = dict(
+        os.environ,
+        OPENROUTER_API_KEY='benchmark',
+        OPENROUTER_BASE_URL=base_url,
+        PARALLEL_STARTUP='True' if parallel else 'False',
+        CACHE_DIR=tempfile.mkdtemp(prefix='voice-bot-bench-'),
+        DEBUG='False'
+    )
+    start = time.perf_counter()
+    process = subprocess.Popen(
+        [sys.executable, 'app.py'], cwd=ROOT, env=env,
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    listening = ready = None
+    try:
+        while time.perf_counter() - start < timeout:
+            status = get_status()
+            if status is not None:
+                if listening is None:
+                    listening = time.perf_counter() - start
+                if status.get('components_initialized'):
+                    ready = time.perf_counter() - start
+                    break
+            time.sleep(0.01)
+    finally:
+        process.terminate()
+        process.wait()
+    return listening, ready
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--models-latency', type=float, default=0.5, help='Seconds before /models answers')
+    parser.add_argument('--runs', type=int, default=3)
+    args = parser.parse_args()
+
+    print(f"import utils                   {measure_import('import utils') * 1000:7.1f} ms")
+    print(f"import utils + all components  "
+          f"{measure_import('import utils.audio_handler, utils.openrouter_api, utils.text_to_speech') * 1000:7.1f} ms")
+
+    server, base_url = start_stub_server(models_latency=args.models_latency)
+    for label, parallel in (('sequential', False), ('parallel', True)):
+        results = [measure_startup(base_url, parallel) for _ in range(args.runs)]
+        listening = min(result[0] for result in results)
+        ready = min(result[1] for result in results)
+        print(f"{label:<11} listening after {listening * 1000:7.1f} ms  all components ready after {ready * 1000:7.1f} ms")
+    server.shutdown()
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,73 @@
+"""
+Compare hedged speech recognition with the primary-only path using local
+stand-in recognizers with heavy-tailed latency.
+
+    python benchmarks/bench_stt_hedging.py --requests 200
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import speech_recognition as sr
+from utils.stt_backends import CallableBackend, HedgedRecognizer
+
+def make_recognizer(name, median, tail_probability, tail_latency, error_probability, seed):
+    """Build a stand-in recognizer that usually answers near the median and sometimes stalls."""
+    rng = random.Random(seed)
+
+    def recognize(audio):
+        if rng.random() < error_probability:
+            time.sleep(median / 2)
+            raise sr.RequestError(f"{name} unavailable")
+        latency = tail_latency if rng.random() < tail_probability else rng.lognormvariate(0, 0.25) * median
+        time.sleep(latency)
+        return f"hello from {name}"
+
+    return CallableBackend(name, recognize)
+
+def percentile(values, percent):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * percent / 100))]
+
+def run(label, recognizer, requests, audio):
+    latencies = []
+    for _ in range(requests):
+        start = time.perf_counter()
+        recognizer.recognize(audio)
+        latencies.append(time.perf_counter() - start)
+    print(f"{label:<10} p50 {percentile(latencies, 50) * 1000:7.1f} ms  "
+          f"p95 {percentile(latencies, 95) * 1000:7.1f} ms  "
+          f"p99 {percentile(latencies, 99) * 1000:7.1f} ms  max {max(latencies) * 1000:7.1f} ms")
+    return recognizer
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--requests', type=int, default=200)
+    parser.add_argument('--median', type=float, default=0.05, help='Primary median latency (s)')
+    parser.add_argument('--tail-probability', type=float, default=0.05)
+    parser.add_argument('--tail-latency', type=float, default=1.0, help='Primary stall latency (s)')
+    parser.add_argument('--percentile', type=float, default=90)
+    args = parser.parse_args()
+
+    audio = sr.AudioData(b'\0' * 3200, 16000, 2)
+
+    def backends():
+        return [
+            make_recognizer('primary', args.median, args.tail_probability, args.tail_latency, 0.01, 1),
+            make_recognizer('secondary', args.median * 1.5, 0, 0, 0, 2)
+        ]
+
+    # Primary only, failing over to the secondary on errors (the old behaviour)
+    run('primary', HedgedRecognizer(backends(), initial_delay=60, min_delay=60), args.requests, audio)
+    hedged = run('hedged', HedgedRecognizer(backends(), hedge_percentile=args.percentile, min_delay=0),
+                 args.requests, audio)
+    for name, stats in hedged.get_stats().items():
+        print(f"  {name:<10} {stats}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,51 @@
+"""
+Compare per-call requests.post against the pooled OpenRouterAPI transport.
+
+    python benchmarks/bench_transport.py --requests 200
+    python benchmarks/bench_transport.py --certfile cert.pem --keyfile key.pem  # include TLS handshakes
+
+The certificate must be valid for "localhost"; the benchmark trusts it directly.
+"""
+
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('OPENROUTER_API_KEY', 'benchmark')
+
+import requests
+from stub_openrouter import start_stub_server
+from utils.openrouter_api import OpenRouterAPI
+
+def run(label, call, count):
+    start = time.perf_counter()
+    for _ in range(count):
+        call()
+    elapsed = time.perf_counter() - start
+    print(f"{label:<22} {count} calls in {elapsed:.3f}s ({elapsed / count * 1000:.2f} ms/call)")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--requests', type=int, default=200)
+    parser.add_argument('--certfile')
+    parser.add_argument('--keyfile')
+    args = parser.parse_args()
+
+    server, base_url = start_stub_server(certfile=args.certfile, keyfile=args.keyfile)
+    verify = args.certfile or True  # Trust the stand-in server's self-signed certificate
+
+    api = OpenRouterAPI()
+    api.base_url = base_url
+    api.session.verify = verify
+    api.session.trust_env = False  # Otherwise REQUESTS_CA_BUNDLE overrides session.verify
+
+    run('requests.get (fresh)', lambda: requests.get(f"{base_url}/models", headers=api.headers, verify=verify), args.requests)
+    run('pooled session', lambda: api.get_available_models(), args.requests)
+    print(f"Transport stats: {api.get_transport_stats()}")
+
+    server.shutdown()
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,67 @@
+"""
+Benchmark the VAD engines on synthetic PCM.
+
+    python benchmarks/bench_vad.py --seconds 60
+"""
+
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+from utils.vad import EnergyVAD, WebRTCVAD, WEBRTCVAD_AVAILABLE
+
+def synthesize(seconds, sample_rate, seed=0):
+    """Alternate one-second bursts of voiced harmonics with low background noise."""
+    rng = np.random.default_rng(seed)
+    t = np.arange(int(seconds * sample_rate)) / sample_rate
+    speech = sum(np.sin(2 * np.pi * f * t) / (i + 1) for i, f in enumerate((140, 280, 420, 560, 700)))
+    envelope = (np.floor(t) % 2 == 0).astype(np.float64)
+    signal = 6000 * speech * envelope + rng.normal(0, 60, len(t))
+    pcm = np.clip(signal, -32768, 32767).astype(np.int16)
+    return pcm, envelope
+
+def legacy_is_speech(chunk, threshold):
+    """The original detector: squares int16 samples, which wraps around."""
+    audio_chunk = np.frombuffer(chunk, dtype=np.int16)
+    with np.errstate(invalid='ignore'):
+        volume = np.sqrt(np.mean(audio_chunk**2))
+    return volume >= threshold
+
+def run(label, detect, pcm, truth, chunk_size, sample_rate):
+    chunks = [pcm[i:i + chunk_size].tobytes() for i in range(0, len(pcm) - chunk_size + 1, chunk_size)]
+    expected = [truth[i * chunk_size + chunk_size // 2] > 0 for i in range(len(chunks))]
+
+    start = time.perf_counter()
+    decisions = [detect(chunk) for chunk in chunks]
+    elapsed = time.perf_counter() - start
+
+    accuracy = np.mean(np.array(decisions) == np.array(expected))
+    audio_seconds = len(chunks) * chunk_size / sample_rate
+    print(f"{label:<12} {elapsed / len(chunks) * 1e6:8.1f} us/chunk  "
+          f"{elapsed / audio_seconds * 1000:6.2f} ms per audio second  accuracy {accuracy:.1%}")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--seconds', type=float, default=30)
+    parser.add_argument('--sample-rate', type=int, default=44100)
+    parser.add_argument('--chunk-size', type=int, default=1024)
+    parser.add_argument('--threshold', type=float, default=500)
+    args = parser.parse_args()
+
+    pcm, truth = synthesize(args.seconds, args.sample_rate)
+
+    run('legacy', lambda c: legacy_is_speech(c, args.threshold), pcm, truth, args.chunk_size, args.sample_rate)
+    energy = EnergyVAD(args.sample_rate, threshold=args.threshold)
+    run('energy', energy.is_speech, pcm, truth, args.chunk_size, args.sample_rate)
+    if WEBRTCVAD_AVAILABLE:
+        webrtc = WebRTCVAD(args.sample_rate)
+        run('webrtc', webrtc.is_speech, pcm, truth, args.chunk_size, args.sample_rate)
+    else:
+        print("webrtc       skipped (webrtcvad not installed)")
+
+if __name__ == '__main__':
+    main()
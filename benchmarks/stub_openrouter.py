@@ -0,0 +1,141 @@
+"""
+Local stand-in for the OpenRouter API used by the benchmarks.
+Serves /models and /chat/completions (blocking and streaming) with configurable latency.
+"""
+
+import argparse
+import hashlib
+import json
+import ssl
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+MODELS = {
+    "data": [
+        {"id": f"stub/model-{i}", "name": f"Stub Model {i}", "context_length": 8192}
+        for i in range(300)
+    ]
+}
+MODELS_ETAG = '"' + hashlib.sha256(json.dumps(MODELS).encode('utf-8')).hexdigest()[:16] + '"'
+
+class StubHandler(BaseHTTPRequestHandler):
+    """Request handler that mimics the OpenRouter endpoints."""
+
+    protocol_version = 'HTTP/1.1'  # Keep-alive, like the real service
+    disable_nagle_algorithm = True
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send_json(self, data, status=200, headers=None):
+        body = json.dumps(data).encode('utf-8')
+        self.send_response(status)
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        if self.path.endswith('/models'):
+            time.sleep(self.server.models_latency)
+            if self.headers.get('If-None-Match') == MODELS_ETAG:
+                self.send_response(304)
+                self.send_header('ETag', MODELS_ETAG)
+                self.send_header('Content-Length', '0')
+                self.end_headers()
+                return
+            self._send_json(MODELS, headers={'ETag': MODELS_ETAG})
+        else:
+            self._send_json({'error': 'not found'}, status=404)
+
+    def do_POST(self):
+        length = int(self.headers.get('Content-Length', 0))
+        payload = json.loads(self.rfile.read(length) or b'{}')
+
+        if not self.path.endswith('/chat/completions'):
+            self._send_json({'error': 'not found'}, status=404)
+            return
+
+        time.sleep(self.server.latency)
+        tokens = [f"token{i} " for i in range(self.server.tokens)]
+
+        if not payload.get('stream'):
+            self._send_json({
+                'choices': [{'message': {'role': 'assistant', 'content': ''.join(tokens)}}]
+            })
+            return
+
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/event-stream')
+        self.send_header('Transfer-Encoding', 'chunked')
+        self.end_headers()
+        try:
+            for token in tokens:
+                chunk = {'choices': [{'delta': {'content': token}}]}
+                self._write_chunk(f"data: {json.dumps(chunk)}\n\n".encode('utf-8'))
+                time.sleep(self.server.token_delay)
+            self._write_chunk(b"data: [DONE]\n\n")
+            self.wfile.write(b"0\r\n\r\n")
+        except (BrokenPipeError, ConnectionResetError):
+            self.close_connection = True
+
+    def _write_chunk(self, data):
+        self.wfile.write(f"{len(data):x}\r\n".encode('ascii') + data + b"\r\n")
+        self.wfile.flush()
+
+class StubServer(ThreadingHTTPServer):
+    """Threaded server with a listen backlog large enough for concurrency benchmarks."""
+
+    daemon_threads = True
+    request_queue_size = 1024
+
+    def handle_error(self, request, client_address):
+        # Clients that go away mid-response, e.g. a benchmark stopping the app, aren't errors
+        if isinstance(sys.exc_info()[1], ConnectionError):
+            return
+        super().handle_error(request, client_address)
+
+def start_stub_server(port=0, latency=0.0, tokens=20, token_delay=0.0, certfile=None, keyfile=None,
+                      models_latency=0.0):
+    """Start the stand-in server on a background thread and return (server, base_url)."""
+    server = StubServer(('127.0.0.1', port), StubHandler)
+    server.latency = latency
+    server.models_latency = models_latency
+    server.tokens = tokens
+    server.token_delay = token_delay
+
+    scheme = 'http'
+    if certfile:
+        context = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+        context.load_cert_chain(certfile, keyfile)
+        server.socket = context.wrap_socket(server.socket, server_side=True)
+        scheme = 'https'
+
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"{scheme}://localhost:{server.server_address[1]}/api/v1"
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--latency', type=float, default=0.5, help='Seconds before the first token')
+    parser.add_argument('--tokens', type=int, default=40)
+    parser.add_argument('--token-delay', type=float, default=0.02)
+    parser.add_argument('--models-latency', type=float, default=0.0, help='Seconds before /models answers')
+    parser.add_argument('--certfile')
+    parser.add_argument('--keyfile')
+    args = parser.parse_args()
+
+    server, base_url = start_stub_server(
+        args.port, args.latency, args.tokens, args.token_delay, args.certfile, args.keyfile,
+        args.models_latency
+    )
+    print(f"Stub OpenRouter API listening on {base_url}")
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        server.shutdown()
@@ -1,4 +1,5 @@
 import os
+import tempfile
 from dotenv import load_dotenv
 
 # Load environment variables
@@ -9,7 +10,18 @@ class Config:
     
     # API Configuration
     OPENROUTER_API_KEY = os.getenv('OPENROUTER_API_KEY')
-    OPENROUTER_BASE_URL = "https://openrouter.ai/api/v1"
+    OPENROUTER_BASE_URL = os.getenv('OPENROUTER_BASE_URL', "https://openrouter.ai/api/v1")
+    
+    # HTTP Transport Configuration
+    HTTP_POOL_CONNECTIONS = int(os.getenv('HTTP_POOL_CONNECTIONS', 4))
+    HTTP_POOL_MAXSIZE = int(os.getenv('HTTP_POOL_MAXSIZE', 16))
+    HTTP_POOL_BLOCK = os.getenv('HTTP_POOL_BLOCK', 'False').lower() == 'true'
+    HTTP_KEEP_ALIVE = os.getenv('HTTP_KEEP_ALIVE', 'True').lower() == 'true'
+    HTTP_MAX_RETRIES = int(os.getenv('HTTP_MAX_RETRIES', 2))
+    HTTP_RETRY_BACKOFF = float(os.getenv('HTTP_RETRY_BACKOFF', 0.3))
+    ASYNC_HTTP_LIMIT = int(os.getenv('ASYNC_HTTP_LIMIT', 500))
+    ASYNC_HTTP_LIMIT_PER_HOST = int(os.getenv('ASYNC_HTTP_LIMIT_PER_HOST', 200))
+    ASYNC_HTTP_KEEPALIVE_TIMEOUT = float(os.getenv('ASYNC_HTTP_KEEPALIVE_TIMEOUT', 30))
     
     # Audio Configuration
     AUDIO_SAMPLE_RATE = int(os.getenv('AUDIO_SAMPLE_RATE', 44100))
@@ -21,24 +33,165 @@ class Config:
     MAX_RECORDING_DURATION = int(os.getenv('MAX_RECORDING_DURATION', 30))
     SILENCE_THRESHOLD = int(os.getenv('SILENCE_THRESHOLD', 500))
     SILENCE_DURATION = int(os.getenv('SILENCE_DURATION', 2))
+    # Non-speech head and tail are trimmed off before recognition, keeping some padding
+    TRIM_SILENCE = os.getenv('TRIM_SILENCE', 'True').lower() == 'true'
+    TRIM_PADDING = float(os.getenv('TRIM_PADDING', 0.3))
+    
+    # Recordings are transcribed from memory; spooling to disk is optional
+    AUDIO_SPOOL_TO_DISK = os.getenv('AUDIO_SPOOL_TO_DISK', 'False').lower() == 'true'
+    AUDIO_SPOOL_DIR = os.getenv('AUDIO_SPOOL_DIR', os.path.join(tempfile.gettempdir(), 'voice-bot-spool'))
+    AUDIO_SPOOL_MAX_FILES = int(os.getenv('AUDIO_SPOOL_MAX_FILES', 20))
+    AUDIO_SPOOL_MAX_AGE = int(os.getenv('AUDIO_SPOOL_MAX_AGE', 600))
+    
+    # Voice Activity Detection Configuration
+    VAD_ENGINE = os.getenv('VAD_ENGINE', 'energy')  # 'energy' or 'webrtc'
+    VAD_AGGRESSIVENESS = int(os.getenv('VAD_AGGRESSIVENESS', 2))  # webrtc only, 0-3
+    
+    # Speech-to-Text Backend Configuration
+    STT_BACKENDS = os.getenv('STT_BACKENDS', 'google,sphinx')  # priority order
+    STT_HEDGE_PERCENTILE = float(os.getenv('STT_HEDGE_PERCENTILE', 95))
+    STT_HEDGE_INITIAL_DELAY = float(os.getenv('STT_HEDGE_INITIAL_DELAY', 3))
+    STT_HEDGE_MIN_DELAY = float(os.getenv('STT_HEDGE_MIN_DELAY', 0.3))
+    STT_TIMEOUT = float(os.getenv('STT_TIMEOUT', 15))
+    STT_LATENCY_WINDOW = int(os.getenv('STT_LATENCY_WINDOW', 100))
+    # Audio is resampled to this rate before recognition; 0 keeps the capture rate
+    STT_SAMPLE_RATE = int(os.getenv('STT_SAMPLE_RATE', 16000))
+    # Per-backend overrides, e.g. "google=16000,sphinx=16000"
+    STT_SAMPLE_RATES = {
+        backend.strip(): int(rate)
+        for backend, rate in (
+            item.split('=', 1) for item in os.getenv('STT_SAMPLE_RATES', '').split(',') if '=' in item
+        )
+    }
+    STT_RESAMPLER_TAPS = int(os.getenv('STT_RESAMPLER_TAPS', 48))  # filter taps per polyphase branch
+    
+    # Streaming Transcription Configuration
+    # Segments cut at pauses are transcribed in the background while recording continues
+    STREAMING_STT_ENABLED = os.getenv('STREAMING_STT_ENABLED', 'True').lower() == 'true'
+    STREAMING_STT_WORKERS = int(os.getenv('STREAMING_STT_WORKERS', 2))
+    STREAMING_SEGMENT_PAUSE = float(os.getenv('STREAMING_SEGMENT_PAUSE', 0.4))
+    STREAMING_SEGMENT_MAX_DURATION = float(os.getenv('STREAMING_SEGMENT_MAX_DURATION', 15))
+    STREAMING_FINISH_TIMEOUT = float(os.getenv('STREAMING_FINISH_TIMEOUT', 10))
+    
+    # Conversation Configuration
+    CONVERSATION_MAX_MESSAGES = int(os.getenv('CONVERSATION_MAX_MESSAGES', 200))
+    CONVERSATION_MAX_SESSIONS = int(os.getenv('CONVERSATION_MAX_SESSIONS', 1000))
+    CONVERSATION_MAX_TOTAL_CHARS = int(os.getenv('CONVERSATION_MAX_TOTAL_CHARS', 20000000))
+    CONVERSATION_IDLE_TIMEOUT = int(os.getenv('CONVERSATION_IDLE_TIMEOUT', 3600))
     
     # TTS Configuration
     TTS_ENGINE = os.getenv('TTS_ENGINE', 'pyttsx3')
     TTS_RATE = int(os.getenv('TTS_RATE', 200))
     TTS_VOLUME = float(os.getenv('TTS_VOLUME', 0.9))
+    # 'server' plays speech on this machine's sound device; 'client' sends it to the browser
+    TTS_OUTPUT_MODE = os.getenv('TTS_OUTPUT_MODE', 'server').lower()
+    # Sentences synthesized ahead of the one playing
+    TTS_PREFETCH_SENTENCES = int(os.getenv('TTS_PREFETCH_SENTENCES', 2))
+    # Streamed responses are spoken in chunks: a short first one, then larger ones
+    TTS_FIRST_CHUNK_MIN_CHARS = int(os.getenv('TTS_FIRST_CHUNK_MIN_CHARS', 15))
+    TTS_FIRST_CHUNK_MAX_CHARS = int(os.getenv('TTS_FIRST_CHUNK_MAX_CHARS', 80))
+    TTS_CHUNK_MIN_CHARS = int(os.getenv('TTS_CHUNK_MIN_CHARS', 60))
+    TTS_CHUNK_MAX_CHARS = int(os.getenv('TTS_CHUNK_MAX_CHARS', 250))
+    
+    # Barge-in: speech while the bot is answering stops playback and the LLM stream
+    BARGE_IN_ENABLED = os.getenv('BARGE_IN_ENABLED', 'True').lower() == 'true'
+    BARGE_IN_MIN_SPEECH = float(os.getenv('BARGE_IN_MIN_SPEECH', 0.2))  # seconds of speech that count as onset
     
     # Application Configuration
+    # Components load concurrently in the background; readiness is reported on /status
+    PARALLEL_STARTUP = os.getenv('PARALLEL_STARTUP', 'True').lower() == 'true'
     DEBUG = os.getenv('DEBUG', 'True').lower() == 'true'
     SECRET_KEY = os.getenv('SECRET_KEY', 'your-secret-key-here')
     
+    # Web Server Configuration
+    # 'wsgi' runs the Werkzeug server with a thread per request, 'asgi' runs uvicorn with
+    # the conversation routes as coroutines on one event loop
+    SERVER_MODE = os.getenv('SERVER_MODE', 'wsgi').lower()
+    SERVER_HOST = os.getenv('SERVER_HOST', '0.0.0.0')
+    SERVER_PORT = int(os.getenv('SERVER_PORT', 5000))
+    # Bounded thread pools of the asgi mode for the work that can't run on the event loop
+    ASGI_STT_WORKERS = int(os.getenv('ASGI_STT_WORKERS', 4))
+    ASGI_TTS_WORKERS = int(os.getenv('ASGI_TTS_WORKERS', 8))  # client speech synthesis without admission control
+    ASGI_WSGI_WORKERS = int(os.getenv('ASGI_WSGI_WORKERS', 16))  # routes still served by Flask
+    
+    # Admission Control Configuration
+    # Each stage runs at most *_CONCURRENCY requests and queues *_QUEUE more; beyond that
+    # requests are turned away with 429 and Retry-After instead of slowing everyone down
+    ADMISSION_ENABLED = os.getenv('ADMISSION_ENABLED', 'True').lower() == 'true'
+    ADMISSION_QUEUE_TIMEOUT = float(os.getenv('ADMISSION_QUEUE_TIMEOUT', 10))  # seconds a queued request waits
+    ADMISSION_STT_CONCURRENCY = int(os.getenv('ADMISSION_STT_CONCURRENCY', 4))
+    ADMISSION_STT_QUEUE = int(os.getenv('ADMISSION_STT_QUEUE', 8))
+    ADMISSION_LLM_CONCURRENCY = int(os.getenv('ADMISSION_LLM_CONCURRENCY', 64))
+    ADMISSION_LLM_QUEUE = int(os.getenv('ADMISSION_LLM_QUEUE', 64))
+    ADMISSION_TTS_CONCURRENCY = int(os.getenv('ADMISSION_TTS_CONCURRENCY', 8))
+    ADMISSION_TTS_QUEUE = int(os.getenv('ADMISSION_TTS_QUEUE', 16))
+    
     # Model Configuration
     DEFAULT_MODEL = "anthropic/claude-3.5-sonnet"
+    LLM_MAX_TOKENS = int(os.getenv('LLM_MAX_TOKENS', 1000))
+    
+    # Response Cache Configuration
+    RESPONSE_CACHE_ENABLED = os.getenv('RESPONSE_CACHE_ENABLED', 'False').lower() == 'true'
+    RESPONSE_CACHE_MAX_ENTRIES = int(os.getenv('RESPONSE_CACHE_MAX_ENTRIES', 1000))
+    RESPONSE_CACHE_TTL = int(os.getenv('RESPONSE_CACHE_TTL', 3600))
+    RESPONSE_CACHE_PATH = os.getenv('RESPONSE_CACHE_PATH', '')  # SQLite file; empty keeps the cache in memory
+    
+    # Coalesce concurrent identical LLM requests into one upstream call
+    SINGLE_FLIGHT_ENABLED = os.getenv('SINGLE_FLIGHT_ENABLED', 'True').lower() == 'true'
+    
+    # Model Catalog Configuration
+    CACHE_DIR = os.getenv('CACHE_DIR', os.path.join(os.path.dirname(os.path.abspath(__file__)), '.cache'))
+    MODEL_CATALOG_PATH = os.getenv('MODEL_CATALOG_PATH', os.path.join(CACHE_DIR, 'models.json'))
+    MODEL_CATALOG_TTL = int(os.getenv('MODEL_CATALOG_TTL', 3600))
+    
+    # Noise Floor Configuration
+    # The measured background level is persisted and keeps adapting from non-speech audio
+    NOISE_FLOOR_PATH = os.getenv('NOISE_FLOOR_PATH', os.path.join(CACHE_DIR, 'noise_floor.json'))
+    NOISE_FLOOR_MULTIPLIER = float(os.getenv('NOISE_FLOOR_MULTIPLIER', 3.0))  # silence threshold = floor * multiplier
+    NOISE_FLOOR_ADAPT_RATE = float(os.getenv('NOISE_FLOOR_ADAPT_RATE', 0.05))
+    # Seconds of steady noise above the threshold before the floor steps up, and the largest step
+    NOISE_FLOOR_RISE_WINDOW = float(os.getenv('NOISE_FLOOR_RISE_WINDOW', 3.0))
+    NOISE_FLOOR_MAX_RISE = float(os.getenv('NOISE_FLOOR_MAX_RISE', 1.5))
+    NOISE_FLOOR_SAVE_INTERVAL = int(os.getenv('NOISE_FLOOR_SAVE_INTERVAL', 60))
+    SILENCE_THRESHOLD_MIN = int(os.getenv('SILENCE_THRESHOLD_MIN', 100))
+    
+    # Browser Microphone Configuration
+    # Browsers stream mono PCM over the /audio_stream WebSocket, resampled to AUDIO_SAMPLE_RATE
+    AUDIO_INPUT_MODE = os.getenv('AUDIO_INPUT_MODE', 'server').lower()  # 'server' microphone or 'browser'
+    REMOTE_AUDIO_MAX_SESSIONS = int(os.getenv('REMOTE_AUDIO_MAX_SESSIONS', 50))
+    REMOTE_AUDIO_MAX_FRAME_BYTES = int(os.getenv('REMOTE_AUDIO_MAX_FRAME_BYTES', 64 * 1024))
+    # Unacknowledged bytes a browser may have in flight before it has to wait
+    REMOTE_AUDIO_WINDOW_BYTES = int(os.getenv('REMOTE_AUDIO_WINDOW_BYTES', 256 * 1024))
+    REMOTE_AUDIO_RECEIVE_TIMEOUT = float(os.getenv('REMOTE_AUDIO_RECEIVE_TIMEOUT', 10))
+    
+    # TTS Cache Configuration
+    TTS_CACHE_ENABLED = os.getenv('TTS_CACHE_ENABLED', 'True').lower() == 'true'
+    TTS_CACHE_DIR = os.getenv('TTS_CACHE_DIR', os.path.join(CACHE_DIR, 'tts'))
+    TTS_CACHE_MAX_BYTES = int(os.getenv('TTS_CACHE_MAX_BYTES', 50 * 1024 * 1024))
+    # Extra phrases rendered at startup besides the fallback messages, separated by "|"
+    TTS_PREWARM_PHRASES = [phrase.strip() for phrase in os.getenv('TTS_PREWARM_PHRASES', '').split('|') if phrase.strip()]
+    
+    # Context Window Configuration (prompt + completion tokens per request)
+    CONTEXT_TOKEN_BUDGET = int(os.getenv('CONTEXT_TOKEN_BUDGET', 8000))
+    # Per-model overrides, e.g. "openai/gpt-4o-mini=16000,anthropic/claude-3.5-sonnet=24000"
+    MODEL_TOKEN_BUDGETS = {
+        model.strip(): int(budget)
+        for model, budget in (
+            item.split('=', 1) for item in os.getenv('MODEL_TOKEN_BUDGETS', '').split(',') if '=' in item
+        )
+    }
     
     @classmethod
     def validate_config(cls):
         """Validate that all required configuration is present."""
         if not cls.OPENROUTER_API_KEY:
             raise ValueError("OPENROUTER_API_KEY is required")
+        if cls.TTS_OUTPUT_MODE not in ('server', 'client'):
+            raise ValueError("TTS_OUTPUT_MODE must be 'server' or 'client'")
+        if cls.AUDIO_INPUT_MODE not in ('server', 'browser'):
+            raise ValueError("AUDIO_INPUT_MODE must be 'server' or 'browser'")
+        if cls.SERVER_MODE not in ('wsgi', 'asgi'):
+            raise ValueError("SERVER_MODE must be 'wsgi' or 'asgi'")
         
         print("Configuration loaded successfully!")
         return True
\ No newline at end of file
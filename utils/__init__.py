@@ -1,10 +1,24 @@
 """
 Utils package for voice chatbot application.
-Contains modules for audio handling, OpenRouter API integration, and text-to-speech.
+Contains modules for audio handling, OpenRouter API integration, text-to-speech and conversation state.
 """
 
-from .audio_handler import AudioHandler
-from .openrouter_api import OpenRouterAPI
-from .text_to_speech import TextToSpeech
+import importlib
 
-__all__ = ['AudioHandler', 'OpenRouterAPI', 'TextToSpeech']
\ No newline at end of file
+# Exported classes are imported on first use, so importing one module doesn't
+# pull in the heavy dependencies (numpy, speech_recognition, pyttsx3) of the others
+_EXPORTS = {
+    'AudioHandler': '.audio_handler',
+    'OpenRouterAPI': '.openrouter_api',
+    'TextToSpeech': '.text_to_speech',
+    'ConversationStore': '.conversation_store'
+}
+
+def __getattr__(name):
+    if name not in _EXPORTS:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(_EXPORTS[name], __name__), name)
+    globals()[name] = value
+    return value
+
+__all__ = ['AudioHandler', 'OpenRouterAPI', 'TextToSpeech', 'ConversationStore']
\ No newline at end of file
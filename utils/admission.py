@@ -0,0 +1,239 @@
+import asyncio
+import math
+import threading
+import time
+from collections import deque
+from config import Config
+
+class AdmissionRejected(Exception):
+    """Raised when a stage is saturated: every slot is busy and its queue is full or the wait timed out."""
+    
+    def __init__(self, stage, retry_after):
+        super().__init__(f"The {stage} stage is overloaded")
+        self.stage = stage
+        self.retry_after = retry_after
+
+class _Waiter:
+    """A thread queued for a slot."""
+    
+    def __init__(self):
+        self.event = threading.Event()
+        self.granted = False
+    
+    def wake(self):
+        self.event.set()
+
+class _AsyncWaiter:
+    """A coroutine queued for a slot; it may be woken from any thread."""
+    
+    def __init__(self, loop):
+        self.loop = loop
+        self.future = loop.create_future()
+        self.granted = False
+    
+    def wake(self):
+        self.loop.call_soon_threadsafe(self._set)
+    
+    def _set(self):
+        if not self.future.done():
+            self.future.set_result(None)
+
+class Ticket:
+    """A slot held in a stage. Releasing it more than once is harmless."""
+    
+    def __init__(self, stage):
+        self.stage = stage
+        self.start = time.perf_counter()
+        self.released = False
+    
+    def release(self):
+        self.stage._free_slot(self)
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, exc_type, exc, tb):
+        self.release()
+
+class AdmissionStage:
+    """
+    Bounds the requests working in one stage and the requests waiting for it.
+    
+    Up to concurrency requests hold a slot, up to queue_size more wait in
+    FIFO order for at most queue_timeout seconds, and everything beyond that
+    is turned away at once. Threads and coroutines share the same slots.
+    """
+    
+    def __init__(self, name, concurrency=None, queue_size=0, queue_timeout=None):
+        """
+        Args:
+            name (str): Stage name reported in rejections and stats
+            concurrency (int): Slots; None admits everything, only counting it
+            queue_size (int): Requests that may wait for a slot
+            queue_timeout (float): Seconds a request waits before it is rejected
+        """
+        self.config = Config()
+        self.name = name
+        self.concurrency = concurrency
+        self.queue_size = queue_size
+        self.queue_timeout = queue_timeout if queue_timeout is not None else self.config.ADMISSION_QUEUE_TIMEOUT
+        
+        self.lock = threading.Lock()
+        self.active = 0
+        self.waiters = deque()
+        self.admitted = 0
+        self.rejected = 0
+        self.timed_out = 0
+        self.cancelled = 0
+        self.peak_queued = 0
+        # Seconds each of the last requests held its slot, for Retry-After
+        self.durations = deque(maxlen=100)
+    
+    def _enter(self, waiter):
+        """
+        Take a free slot or join the queue.
+        
+        Returns:
+            bool: True if admitted, False if rejected, None if queued
+        """
+        with self.lock:
+            if self.concurrency is None or (self.active < self.concurrency and not self.waiters):
+                self.active += 1
+                self.admitted += 1
+                return True
+            if len(self.waiters) >= self.queue_size:
+                self.rejected += 1
+                return False
+            self.waiters.append(waiter)
+            self.peak_queued = max(self.peak_queued, len(self.waiters))
+            return None
+    
+    def _leave_queue(self, waiter, cancelled=False):
+        """
+        Stop waiting. Returns True if the waiter was handed a slot in the meantime.
+        
+        Waiters cancelled because their client went away are counted apart
+        from rejections; one that had been handed a slot must still free it.
+        """
+        with self.lock:
+            if cancelled:
+                self.cancelled += 1
+            elif waiter.granted:
+                self.admitted += 1
+            else:
+                self.rejected += 1
+                self.timed_out += 1
+            
+            if waiter.granted:
+                return True
+            self.waiters.remove(waiter)
+            return False
+    
+    def _free_slot(self, ticket=None):
+        """Hand a slot to the next waiter, or give it back."""
+        with self.lock:
+            if ticket:
+                if ticket.released:
+                    return
+                ticket.released = True
+                self.durations.append(time.perf_counter() - ticket.start)
+            
+            waiter = None
+            if self.waiters:
+                waiter = self.waiters.popleft()
+                waiter.granted = True
+            else:
+                self.active -= 1
+        if waiter:
+            waiter.wake()
+    
+    def _reject(self):
+        return AdmissionRejected(self.name, self.get_retry_after())
+    
+    def admit(self):
+        """
+        Get a slot, waiting in the queue if need be.
+        
+        Returns:
+            Ticket: The slot, to be released when the work is done
+        
+        Raises:
+            AdmissionRejected: If the stage is saturated
+        """
+        waiter = _Waiter()
+        admitted = self._enter(waiter)
+        if admitted is None:
+            waiter.event.wait(self.queue_timeout)
+            admitted = self._leave_queue(waiter)
+        if not admitted:
+            raise self._reject()
+        return Ticket(self)
+    
+    async def admit_async(self):
+        """Coroutine version of admit() that waits without blocking the event loop."""
+        waiter = _AsyncWaiter(asyncio.get_running_loop())
+        admitted = self._enter(waiter)
+        if admitted is None:
+            try:
+                await asyncio.wait_for(asyncio.shield(waiter.future), self.queue_timeout)
+            except asyncio.TimeoutError:
+                pass
+            except asyncio.CancelledError:
+                # The request went away while queued; pass on a slot it may have been handed
+                if self._leave_queue(waiter, cancelled=True):
+                    self._free_slot()
+                raise
+            admitted = self._leave_queue(waiter)
+        if not admitted:
+            raise self._reject()
+        return Ticket(self)
+    
+    def get_retry_after(self):
+        """Estimate the seconds until a slot frees up, for the Retry-After header."""
+        with self.lock:
+            average = sum(self.durations) / len(self.durations) if self.durations else 1.0
+            return max(1, math.ceil(average * (len(self.waiters) + 1) / (self.concurrency or 1)))
+    
+    def get_stats(self):
+        """Get slot usage and queue depth."""
+        with self.lock:
+            return {
+                'active': self.active,
+                'queued': len(self.waiters),
+                'concurrency': self.concurrency,
+                'queue_size': self.queue_size,
+                'peak_queued': self.peak_queued,
+                'admitted': self.admitted,
+                'rejected': self.rejected,
+                'timed_out': self.timed_out,
+                'cancelled': self.cancelled,
+                'avg_duration_ms': round(sum(self.durations) / len(self.durations) * 1000, 1) if self.durations else None
+            }
+
+class AdmissionController:
+    """Admission control for the speech recognition, LLM and speech synthesis stages of a turn."""
+    
+    def __init__(self):
+        self.config = Config()
+        enabled = self.config.ADMISSION_ENABLED
+        limits = {
+            'stt': (self.config.ADMISSION_STT_CONCURRENCY, self.config.ADMISSION_STT_QUEUE),
+            'llm': (self.config.ADMISSION_LLM_CONCURRENCY, self.config.ADMISSION_LLM_QUEUE),
+            'tts': (self.config.ADMISSION_TTS_CONCURRENCY, self.config.ADMISSION_TTS_QUEUE)
+        }
+        self.stages = {
+            name: AdmissionStage(name, concurrency if enabled else None, queue_size)
+            for name, (concurrency, queue_size) in limits.items()
+        }
+    
+    def admit(self, stage):
+        """Get a slot in a stage; see AdmissionStage.admit."""
+        return self.stages[stage].admit()
+    
+    async def admit_async(self, stage):
+        """Get a slot in a stage without blocking the event loop."""
+        return await self.stages[stage].admit_async()
+    
+    def get_stats(self):
+        """Get slot usage and queue depth per stage."""
+        return {name: stage.get_stats() for name, stage in self.stages.items()}
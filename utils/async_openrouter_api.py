@@ -0,0 +1,244 @@
+import asyncio
+import json
+import aiohttp
+from config import Config
+from .context_window import ContextWindow
+from .response_cache import make_cache_key
+from .openrouter_api import (
+    build_headers,
+    build_payload,
+    extract_message,
+    parse_stream_line,
+    NO_RESPONSE_MESSAGE,
+    CONNECTION_ERROR_MESSAGE,
+    INVALID_RESPONSE_MESSAGE,
+    UNEXPECTED_ERROR_MESSAGE,
+    FALLBACK_MESSAGES
+)
+
+class AsyncOpenRouterAPI:
+    """Asyncio counterpart of OpenRouterAPI for serving many concurrent turns on one event loop."""
+    
+    def __init__(self, response_cache=None):
+        """
+        Args:
+            response_cache (ResponseCache): Cache of completed responses, e.g. shared with OpenRouterAPI
+        """
+        self.config = Config()
+        self.base_url = self.config.OPENROUTER_BASE_URL
+        self.api_key = self.config.OPENROUTER_API_KEY
+        self.headers = build_headers(self.api_key)
+        self.session = None
+        self.context_window = ContextWindow()
+        self.response_cache = response_cache
+        
+        if not self.api_key:
+            raise ValueError("OpenRouter API key is required")
+    
+    async def __aenter__(self):
+        await self._get_session()
+        return self
+    
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.close()
+    
+    async def _get_session(self):
+        """Create the client session lazily, inside the running event loop."""
+        if self.session is None or self.session.closed:
+            connector = aiohttp.TCPConnector(
+                limit=self.config.ASYNC_HTTP_LIMIT,
+                limit_per_host=self.config.ASYNC_HTTP_LIMIT_PER_HOST,
+                keepalive_timeout=self.config.ASYNC_HTTP_KEEPALIVE_TIMEOUT
+            )
+            self.session = aiohttp.ClientSession(headers=self.headers, connector=connector)
+        return self.session
+    
+    async def close(self):
+        """Close the client session and its pooled connections."""
+        if self.session and not self.session.closed:
+            await self.session.close()
+        self.session = None
+    
+    async def _get_cached_response(self, payload):
+        """Look up a cached response for a payload. Returns (cache_key, response)."""
+        if not self.response_cache:
+            return None, None
+        cache_key = make_cache_key(payload)
+        # The cache may go to SQLite under a lock shared with the WSGI threads
+        return cache_key, await asyncio.get_running_loop().run_in_executor(None, self.response_cache.get, cache_key)
+    
+    async def _cache_response(self, cache_key, ai_response):
+        """Cache a successful response. Fallback apologies are never cached."""
+        if cache_key and ai_response and ai_response not in FALLBACK_MESSAGES:
+            await asyncio.get_running_loop().run_in_executor(None, self.response_cache.set, cache_key, ai_response)
+    
+    async def _wait_or_cancel(self, coro, cancel_event):
+        """
+        Await a coroutine unless cancel_event is set first.
+        
+        Returns:
+            tuple: (cancelled, result)
+        """
+        if cancel_event is None:
+            return False, await coro
+        
+        task = asyncio.ensure_future(coro)
+        cancel_wait = asyncio.ensure_future(cancel_event.wait())
+        try:
+            await asyncio.wait({task, cancel_wait}, return_when=asyncio.FIRST_COMPLETED)
+            if task.done():
+                return False, task.result()
+            return True, None
+        finally:
+            cancel_wait.cancel()
+            if not task.done():
+                # Cancelling the task aborts the upstream connection, also when
+                # the caller itself was cancelled (e.g. the client disconnected)
+                task.cancel()
+                try:
+                    await task
+                except (asyncio.CancelledError, Exception):
+                    pass
+    
+    async def get_available_models(self):
+        """Get list of available models from OpenRouter."""
+        session = await self._get_session()
+        try:
+            async with session.get(
+                f"{self.base_url}/models",
+                timeout=aiohttp.ClientTimeout(total=10)
+            ) as response:
+                response.raise_for_status()
+                return await response.json()
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            print(f"Error fetching models: {e}")
+            return None
+    
+    async def _post_completion(self, payload):
+        """Send a blocking completion request and return the parsed JSON."""
+        session = await self._get_session()
+        async with session.post(
+            f"{self.base_url}/chat/completions",
+            json=payload,
+            timeout=aiohttp.ClientTimeout(total=30)
+        ) as response:
+            if response.status >= 400:
+                print(f"Response content: {await response.text()}")
+            response.raise_for_status()
+            return await response.json(content_type=None)
+    
+    async def generate_response(self, user_input, model=None, conversation_history=None, cancel_event=None):
+        """
+        Generate AI response using OpenRouter API.
+        
+        Args:
+            cancel_event (asyncio.Event): If set while waiting, the upstream request
+                is aborted and None is returned
+        """
+        if not model:
+            model = self.config.DEFAULT_MODEL
+        
+        payload = build_payload(user_input, model, conversation_history, context_window=self.context_window)
+        
+        cache_key, cached_response = await self._get_cached_response(payload)
+        if cached_response is not None:
+            print("AI Response served from cache")
+            return cached_response
+        
+        try:
+            print(f"Sending async request to OpenRouter API with model: {model}")
+            cancelled, response_data = await self._wait_or_cancel(
+                self._post_completion(payload), cancel_event
+            )
+            if cancelled:
+                print("OpenRouter request cancelled")
+                return None
+            
+            ai_response = extract_message(response_data)
+            
+            if ai_response is not None:
+                print(f"AI Response received: {ai_response[:100]}...")
+                await self._cache_response(cache_key, ai_response)
+                return ai_response
+            else:
+                print("No response choices found in API response")
+                return NO_RESPONSE_MESSAGE
+        
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            print(f"Error calling OpenRouter API: {e}")
+            return CONNECTION_ERROR_MESSAGE
+        except json.JSONDecodeError as e:
+            print(f"Error parsing JSON response: {e}")
+            return INVALID_RESPONSE_MESSAGE
+        except Exception as e:
+            print(f"Unexpected error: {e}")
+            return UNEXPECTED_ERROR_MESSAGE
+    
+    async def generate_streaming_response(self, user_input, model=None, conversation_history=None, cancel_event=None):
+        """
+        Generate streaming AI response using OpenRouter API.
+        
+        Closing the generator (or setting cancel_event) aborts the upstream stream.
+        """
+        if not model:
+            model = self.config.DEFAULT_MODEL
+        
+        payload = build_payload(
+            user_input, model, conversation_history, stream=True, context_window=self.context_window
+        )
+        
+        cache_key, cached_response = await self._get_cached_response(payload)
+        if cached_response is not None:
+            print("AI Response served from cache")
+            yield cached_response
+            return
+        
+        session = await self._get_session()
+        response = None
+        full_response = ""
+        
+        try:
+            print(f"Sending async streaming request to OpenRouter API with model: {model}")
+            cancelled, response = await self._wait_or_cancel(
+                session.post(
+                    f"{self.base_url}/chat/completions",
+                    json=payload,
+                    timeout=aiohttp.ClientTimeout(total=None, sock_connect=30, sock_read=30)
+                ),
+                cancel_event
+            )
+            if cancelled:
+                print("OpenRouter stream cancelled")
+                return
+            response.raise_for_status()
+            
+            while True:
+                cancelled, line = await self._wait_or_cancel(response.content.readline(), cancel_event)
+                if cancelled:
+                    print("OpenRouter stream cancelled")
+                    return
+                if not line:
+                    break
+                
+                line = line.strip()
+                if line:
+                    done, content = parse_stream_line(line.decode('utf-8'))
+                    if done:
+                        break
+                    if content:
+                        full_response += content
+                        yield content
+            
+            await self._cache_response(cache_key, full_response)
+        
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            print(f"Error calling OpenRouter API: {e}")
+            yield CONNECTION_ERROR_MESSAGE
+        except Exception as e:
+            print(f"Unexpected error: {e}")
+            yield UNEXPECTED_ERROR_MESSAGE
+        finally:
+            if response is not None:
+                # aiohttp only pools the connection if the body was fully read,
+                # so an abandoned stream is dropped instead of drained
+                response.release()
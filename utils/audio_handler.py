@@ -5,14 +5,132 @@ except ImportError:
     print("Warning: PyAudio not available. Voice recording will be disabled.")
     PYAUDIO_AVAILABLE = False
 
-import wave
+import math
+from functools import lru_cache
 import speech_recognition as sr
 import threading
-import time
 import numpy as np
-import tempfile
-import os
+from concurrent.futures import ThreadPoolExecutor
 from config import Config
+from .vad import create_vad
+from .capture_buffer import CaptureBuffer
+from .audio_spool import AudioSpool
+from .streaming_transcriber import StreamingTranscriber
+from .stt_backends import HedgedRecognizer, create_backends
+from .noise_floor import NoiseFloor
+from .recording import Recording, downmix_to_mono, SAMPLE_WIDTH
+
+# Output samples computed per block, to bound the memory of the gathered windows
+RESAMPLE_BLOCK_SIZE = 8192
+
+class PolyphaseResampler:
+    """Rational-ratio resampler using a windowed-sinc polyphase filter bank."""
+    
+    def __init__(self, from_rate, to_rate, taps_per_phase=None):
+        taps_per_phase = taps_per_phase or Config.STT_RESAMPLER_TAPS
+        divisor = math.gcd(from_rate, to_rate)
+        self.from_rate = from_rate
+        self.to_rate = to_rate
+        self.up = to_rate // divisor
+        self.down = from_rate // divisor
+        self.taps_per_phase = taps_per_phase
+        
+        # Low-pass at the lower of the two Nyquist rates, slightly inside it
+        length = self.up * taps_per_phase
+        cutoff = 0.5 / max(self.up, self.down) * 0.9
+        t = np.arange(length) - (length - 1) / 2
+        taps = 2 * cutoff * np.sinc(2 * cutoff * t) * np.kaiser(length, 8.0)
+        taps *= self.up / taps.sum()
+        
+        # Row p holds the taps applied at phase p, newest input sample first
+        self.phases = taps.reshape(taps_per_phase, self.up).T.astype(np.float32)
+        self.delay = (length - 1) // 2
+    
+    def output_length(self, input_length):
+        return -(-input_length * self.up // self.down)
+    
+    def process(self, samples):
+        """
+        Resample mono samples.
+        
+        Args:
+            samples (np.ndarray): Mono samples at from_rate
+        
+        Returns:
+            np.ndarray: float32 samples at to_rate
+        """
+        taps = self.taps_per_phase
+        padded = np.concatenate((
+            np.zeros(taps, dtype=np.float32),
+            np.asarray(samples, dtype=np.float32),
+            np.zeros(taps, dtype=np.float32)
+        ))
+        output = np.empty(self.output_length(len(samples)), dtype=np.float32)
+        offsets = np.arange(taps)
+        
+        for start in range(0, len(output), RESAMPLE_BLOCK_SIZE):
+            positions = np.arange(start, min(start + RESAMPLE_BLOCK_SIZE, len(output))) * self.down + self.delay
+            phase = positions % self.up
+            newest = positions // self.up + taps
+            windows = padded[newest[:, None] - offsets]
+            output[start:start + len(positions)] = np.einsum('ij,ij->i', windows, self.phases[phase])
+        
+        return output
+
+@lru_cache(maxsize=8)
+def get_resampler(from_rate, to_rate):
+    """Get a cached resampler; building the filter bank is the expensive part."""
+    return PolyphaseResampler(from_rate, to_rate)
+
+class StreamingResampler:
+    """
+    Resamples a stream of mono int16 PCM that arrives in pieces.
+    
+    The filter history is carried between pieces so their boundaries don't
+    click. Output lags the input by half the filter length.
+    """
+    
+    def __init__(self, from_rate, to_rate):
+        self.resampler = get_resampler(from_rate, to_rate)
+        taps = self.resampler.taps_per_phase
+        # Input samples preceding the next piece, zeros before the stream starts
+        self.history = np.zeros(taps, dtype=np.float32)
+        self.consumed = 0
+        self.produced = 0
+    
+    def process(self, pcm):
+        """Resample the next piece of PCM. Returns int16 PCM bytes."""
+        resampler = self.resampler
+        taps = resampler.taps_per_phase
+        samples = np.frombuffer(pcm, dtype=np.int16).astype(np.float32)
+        window = np.concatenate((self.history, samples))
+        start = self.consumed
+        self.consumed += len(samples)
+        self.history = window[-taps:]
+        
+        # Every output whose newest input sample has arrived
+        end = (self.consumed * resampler.up - 1 - resampler.delay) // resampler.down + 1
+        if end <= self.produced:
+            return b''
+        positions = np.arange(self.produced, end) * resampler.down + resampler.delay
+        self.produced = end
+        newest = positions // resampler.up - start + taps
+        windows = window[newest[:, None] - np.arange(taps)]
+        output = np.einsum('ij,ij->i', windows, resampler.phases[positions % resampler.up])
+        return np.clip(np.rint(output), -32768, 32767).astype(np.int16).tobytes()
+
+def resample_audio_data(audio, sample_rate):
+    """
+    Downsample mono 16-bit sr.AudioData to a recognizer's native rate.
+    
+    Audio already at or below the target rate is returned unchanged.
+    """
+    if not sample_rate or sample_rate >= audio.sample_rate or audio.sample_width != SAMPLE_WIDTH:
+        return audio
+    samples = np.frombuffer(audio.frame_data, dtype=np.int16)
+    resampled = get_resampler(audio.sample_rate, sample_rate).process(samples)
+    pcm = np.clip(np.rint(resampled), -32768, 32767).astype(np.int16)
+    return sr.AudioData(pcm.tobytes(), sample_rate, SAMPLE_WIDTH)
 
 class AudioHandler:
     """Handles audio recording and speech-to-text conversion."""
@@ -20,18 +138,50 @@ class AudioHandler:
     def __init__(self):
         self.config = Config()
         self.recognizer = sr.Recognizer()
+        self.stt = HedgedRecognizer(create_backends(self.recognizer), prepare_audio=resample_audio_data)
         self.is_recording = False
-        self.audio_data = []
         self.recording_thread = None
+        self.vad = create_vad()
+        self.noise_floor = NoiseFloor()
+        self._apply_noise_floor()
+        
+        # Recordings are written in place into memory allocated once up front
+        self.capture = CaptureBuffer(
+            self.config.MAX_RECORDING_DURATION,
+            self.config.AUDIO_SAMPLE_RATE,
+            self.config.AUDIO_CHANNELS,
+            SAMPLE_WIDTH
+        )
+        self.spool = AudioSpool() if self.config.AUDIO_SPOOL_TO_DISK else None
+        # Capture pipeline of the current or last microphone recording
+        self.recording = None
+        
+        # Browser microphones streaming in, each with their own capture pipeline
+        self.remote_recordings = 0
+        self.remote_lock = threading.Lock()
+        
+        # Segments of live recordings are transcribed on this pool
+        self.stt_executor = None
+        if self.config.STREAMING_STT_ENABLED:
+            self.stt_executor = ThreadPoolExecutor(
+                max_workers=self.config.STREAMING_STT_WORKERS,
+                thread_name_prefix='stt'
+            )
         
+        self.audio = None
+        self.microphone = None
         if PYAUDIO_AVAILABLE:
-            self.audio = pyaudio.PyAudio()
-            self.microphone = sr.Microphone()
-            # Adjust for ambient noise
-            self._adjust_for_noise()
+            # A headless server has no input device; browser microphones work without one
+            try:
+                self.audio = pyaudio.PyAudio()
+                self.microphone = sr.Microphone()
+                # Measure ambient noise only when there is no persisted noise floor
+                if not self.noise_floor.calibrated:
+                    self._adjust_for_noise()
+            except Exception as e:
+                self.microphone = None
+                print(f"Warning: No usable microphone ({e}). Server recording will be disabled.")
         else:
-            self.audio = None
-            self.microphone = None
             print("Audio recording disabled - PyAudio not available")
     
     def _adjust_for_noise(self):
@@ -39,21 +189,89 @@ class AudioHandler:
         print("Adjusting for ambient noise... Please wait.")
         with self.microphone as source:
             self.recognizer.adjust_for_ambient_noise(source, duration=1)
+        self.noise_floor.calibrate(self.recognizer.energy_threshold / self.recognizer.dynamic_energy_ratio)
+        self._apply_noise_floor()
         print("Noise adjustment complete.")
     
-    def start_recording(self):
-        """Start recording audio in a separate thread."""
+    def _apply_noise_floor(self):
+        """Derive the silence detector and recognizer thresholds from the noise floor."""
+        self.vad.set_threshold(self.noise_floor.get_silence_threshold())
+        self.recognizer.energy_threshold = self.noise_floor.level * self.recognizer.dynamic_energy_ratio
+    
+    def create_recording(self, capture, vad, noise_floor, on_speech_onset=None):
+        """Set up the capture pipeline of a new recording, transcribed on the shared STT pool."""
+        transcriber = None
+        if self.stt_executor:
+            transcriber = StreamingTranscriber(self._perform_recognition, self.stt_executor)
+        return Recording(capture, vad, noise_floor, transcriber, on_speech_onset)
+    
+    def start_recording(self, on_speech_onset=None):
+        """
+        Start recording audio in a separate thread.
+        
+        Args:
+            on_speech_onset: Called once BARGE_IN_MIN_SPEECH seconds of speech have been captured
+        
+        Returns:
+            bool: False if already recording
+        
+        Raises:
+            RuntimeError: If the server has no microphone
+        """
+        if self.microphone is None:
+            raise RuntimeError("No microphone available on the server")
         if self.is_recording:
             return False
         
         self.is_recording = True
-        self.audio_data = []
-        self.recording_thread = threading.Thread(target=self._record_audio)
+        self.recording = self.create_recording(self.capture, self.vad, self.noise_floor, on_speech_onset)
+        self.recording_thread = threading.Thread(target=self._record_audio, args=(self.recording,))
         self.recording_thread.start()
         return True
     
+    def open_remote_recording(self, on_speech_onset=None):
+        """
+        Start a recording of audio streamed in from a browser microphone.
+        
+        The caller feeds mono int16 PCM at AUDIO_SAMPLE_RATE to the returned
+        Recording, then calls finish() and close_remote_recording().
+        
+        Returns:
+            Recording: The new recording, or None if REMOTE_AUDIO_MAX_SESSIONS are already open
+        """
+        with self.remote_lock:
+            if self.remote_recordings >= self.config.REMOTE_AUDIO_MAX_SESSIONS:
+                return None
+            self.remote_recordings += 1
+        
+        try:
+            capture = CaptureBuffer(
+                self.config.MAX_RECORDING_DURATION,
+                self.config.AUDIO_SAMPLE_RATE,
+                1,
+                SAMPLE_WIDTH
+            )
+            # Every browser has its own microphone and room, so its noise floor starts fresh
+            return self.create_recording(
+                capture, create_vad(channels=1), NoiseFloor(persistent=False), on_speech_onset
+            )
+        except Exception:
+            self.close_remote_recording()
+            raise
+    
+    def close_remote_recording(self):
+        """Free the slot of a recording opened with open_remote_recording."""
+        with self.remote_lock:
+            self.remote_recordings -= 1
+    
     def stop_recording(self):
-        """Stop recording audio."""
+        """
+        Stop recording audio.
+        
+        Returns:
+            The recording as sr.AudioData, or a spooled WAV file path when
+            AUDIO_SPOOL_TO_DISK is enabled. Pass it to release_audio when done.
+        """
         if not self.is_recording:
             return None
         
@@ -61,11 +279,13 @@ class AudioHandler:
         if self.recording_thread:
             self.recording_thread.join()
         
-        if self.audio_data:
+        if not len(self.capture):
+            return None
+        if self.spool:
             return self._save_audio_to_file()
-        return None
+        return self._get_audio_data()
     
-    def _record_audio(self):
+    def _record_audio(self, recording):
         """Internal method to record audio."""
         stream = self.audio.open(
             format=pyaudio.paInt16,
@@ -76,30 +296,11 @@ class AudioHandler:
         )
         
         print("Recording started...")
-        start_time = time.time()
-        silence_start = None
         
         try:
             while self.is_recording:
                 data = stream.read(self.config.AUDIO_CHUNK_SIZE)
-                self.audio_data.append(data)
-                
-                # Check for silence
-                audio_chunk = np.frombuffer(data, dtype=np.int16)
-                volume = np.sqrt(np.mean(audio_chunk**2))
-                
-                if volume < self.config.SILENCE_THRESHOLD:
-                    if silence_start is None:
-                        silence_start = time.time()
-                    elif time.time() - silence_start > self.config.SILENCE_DURATION:
-                        print("Silence detected, stopping recording...")
-                        break
-                else:
-                    silence_start = None
-                
-                # Check max duration
-                if time.time() - start_time > self.config.MAX_RECORDING_DURATION:
-                    print("Maximum recording duration reached.")
+                if not recording.feed(data):
                     break
         
         except Exception as e:
@@ -108,28 +309,48 @@ class AudioHandler:
         finally:
             stream.stop_stream()
             stream.close()
+            recording.finish()
+            self._apply_noise_floor()
             self.is_recording = False
             print("Recording stopped.")
     
+    def _get_audio_data(self, start=0, end=None):
+        """Build recognizer input straight from the capture buffer."""
+        return self.recording.get_audio_data(start, end)
+    
     def _save_audio_to_file(self):
-        """Save recorded audio data to a temporary file."""
-        temp_file = tempfile.NamedTemporaryFile(delete=False, suffix='.wav')
+        """Save recorded audio data to a spool file."""
+        path = self.spool.new_path()
         
         try:
-            with wave.open(temp_file.name, 'wb') as wf:
-                wf.setnchannels(self.config.AUDIO_CHANNELS)
-                wf.setsampwidth(self.audio.get_sample_size(pyaudio.paInt16))
-                wf.setframerate(self.config.AUDIO_SAMPLE_RATE)
-                wf.writeframes(b''.join(self.audio_data))
-            
-            return temp_file.name
+            self.recording.save_to_file(path)
+            return path
         except Exception as e:
             print(f"Error saving audio file: {e}")
+            self.spool.release(path)
             return None
     
+    def release_audio(self, audio):
+        """Release a recording returned by stop_recording, deleting its spool file if any."""
+        if isinstance(audio, str) and self.spool:
+            self.spool.release(audio)
+    
     def transcribe_audio(self, audio_file_path=None):
-        """Convert audio to text using speech recognition."""
-        if audio_file_path:
+        """
+        Convert audio to text using speech recognition.
+        
+        Args:
+            audio_file_path: sr.AudioData or WAV file path to transcribe;
+                records from the microphone when omitted
+        """
+        if isinstance(audio_file_path, sr.AudioData):
+            # Transcribe from memory
+            try:
+                return self._perform_recognition(audio_file_path)
+            except Exception as e:
+                print(f"Error transcribing audio: {e}")
+                return None
+        elif audio_file_path:
             # Transcribe from file
             try:
                 with sr.AudioFile(audio_file_path) as source:
@@ -152,26 +373,55 @@ class AudioHandler:
                 print(f"Error during real-time transcription: {e}")
                 return None
     
+    def get_partial_transcript(self):
+        """Get the transcript of the current recording so far."""
+        if not self.recording:
+            return ''
+        return self.recording.get_partial_transcript()
+    
+    def iter_partial_transcripts(self):
+        """
+        Yield the partial transcript of the current recording each time it changes.
+        
+        Returns once the recording has stopped and every segment is transcribed.
+        """
+        transcriber = self.recording.transcriber if self.recording else None
+        if transcriber:
+            yield from transcriber.updates()
+    
+    def finish_transcription(self, audio, recording=None):
+        """
+        Get the final transcript of a recording returned by stop_recording.
+        
+        Uses the segments transcribed while recording when available and
+        falls back to transcribing the whole recording.
+        
+        Args:
+            audio: The recording's audio
+            recording (Recording): Its capture pipeline; defaults to the last microphone recording
+        """
+        recording = recording or self.recording
+        transcriber = recording.transcriber if recording else None
+        if transcriber and transcriber.segments:
+            text = transcriber.finish(self.config.STREAMING_FINISH_TIMEOUT)
+            if transcriber.is_finished():
+                return text
+            print("Streaming transcription timed out, transcribing full recording...")
+        return self.transcribe_audio(audio)
+    
     def _perform_recognition(self, audio):
         """Perform speech recognition on audio data."""
-        try:
-            # Try Google Speech Recognition first
-            text = self.recognizer.recognize_google(audio)
-            print(f"Transcribed text: {text}")
-            return text
-        except sr.UnknownValueError:
-            print("Could not understand audio")
-            return None
-        except sr.RequestError as e:
-            print(f"Error with speech recognition service: {e}")
-            # Fallback to offline recognition if available
-            try:
-                text = self.recognizer.recognize_sphinx(audio)
-                print(f"Transcribed text (offline): {text}")
-                return text
-            except:
-                print("Offline recognition also failed")
-                return None
+        return self.stt.recognize(audio)
+    
+    def get_stt_stats(self):
+        """Get per-backend speech recognition latency statistics."""
+        return self.stt.get_stats()
+    
+    def get_noise_stats(self):
+        """Get the current noise floor and the thresholds derived from it."""
+        stats = self.noise_floor.get_stats()
+        stats['energy_threshold'] = round(self.recognizer.energy_threshold, 1)
+        return stats
     
     def record_and_transcribe(self):
         """Record audio and return transcribed text."""
@@ -184,27 +434,31 @@ class AudioHandler:
         # Wait for user to speak or recording to stop automatically
         input("Press Enter to stop recording manually, or wait for automatic stop...")
         
-        # Stop recording and get audio file
-        audio_file = self.stop_recording()
+        # Stop recording and get the recorded audio
+        audio = self.stop_recording()
         
-        if not audio_file:
+        if not audio:
             print("No audio recorded.")
             return None
         
         # Transcribe the audio
         try:
-            text = self.transcribe_audio(audio_file)
+            text = self.finish_transcription(audio)
             return text
         finally:
-            # Clean up temporary file
-            if audio_file and os.path.exists(audio_file):
-                os.unlink(audio_file)
+            # Clean up spooled file, if any
+            self.release_audio(audio)
     
     def cleanup(self):
         """Clean up audio resources."""
         if self.is_recording:
             self.stop_recording()
-        self.audio.terminate()
+        if self.stt_executor:
+            self.stt_executor.shutdown(wait=False)
+        self.stt.close()
+        self.noise_floor.save()
+        if self.audio:
+            self.audio.terminate()
     
     def __del__(self):
         """Destructor to ensure cleanup."""
@@ -0,0 +1,58 @@
+import os
+import tempfile
+import threading
+import time
+from config import Config
+
+# File name prefix that marks spool files as ours
+SPOOL_PREFIX = 'voicebot-'
+
+class AudioSpool:
+    """Directory of spooled recordings with a janitor that bounds its size and age."""
+    
+    def __init__(self, directory=None, max_files=None, max_age=None):
+        self.config = Config()
+        self.directory = directory or self.config.AUDIO_SPOOL_DIR
+        self.max_files = max_files or self.config.AUDIO_SPOOL_MAX_FILES
+        self.max_age = max_age or self.config.AUDIO_SPOOL_MAX_AGE
+        self.lock = threading.Lock()
+        
+        os.makedirs(self.directory, exist_ok=True)
+        # Drop expired or excess spool files from earlier runs
+        self.cleanup()
+    
+    def new_path(self):
+        """Reserve a new spool file and return its path."""
+        self.cleanup(reserve=1)
+        fd, path = tempfile.mkstemp(prefix=SPOOL_PREFIX, suffix='.wav', dir=self.directory)
+        os.close(fd)
+        return path
+    
+    def release(self, path):
+        """Delete a spool file once it has been consumed."""
+        try:
+            os.unlink(path)
+        except FileNotFoundError:
+            pass
+        except OSError as e:
+            print(f"Error deleting spooled audio {path}: {e}")
+    
+    def cleanup(self, reserve=0):
+        """Delete expired spool files and the oldest ones beyond max_files."""
+        with self.lock:
+            files = []
+            try:
+                for entry in os.scandir(self.directory):
+                    if entry.name.startswith(SPOOL_PREFIX) and entry.is_file():
+                        files.append((entry.stat().st_mtime, entry.path))
+            except OSError as e:
+                print(f"Error scanning audio spool: {e}")
+                return
+            
+            files.sort()
+            now = time.time()
+            excess = len(files) + reserve - self.max_files
+            
+            for index, (mtime, path) in enumerate(files):
+                if index < excess or now - mtime > self.max_age:
+                    self.release(path)
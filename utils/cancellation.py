@@ -0,0 +1,124 @@
+import threading
+import time
+from collections import OrderedDict, deque
+from config import Config
+
+class CancellationToken:
+    """Cancellation signal for one conversational turn, shared by every stage working on it."""
+    
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.event = threading.Event()
+        self.callbacks = []
+        self.reason = None
+    
+    @property
+    def is_cancelled(self):
+        return self.event.is_set()
+    
+    def cancel(self, reason='cancelled'):
+        """
+        Cancel the turn and run the registered callbacks on the calling thread.
+        
+        Returns:
+            bool: False if the token was already cancelled
+        """
+        with self.lock:
+            if self.event.is_set():
+                return False
+            self.reason = reason
+            self.event.set()
+            callbacks, self.callbacks = self.callbacks, []
+        
+        for callback in callbacks:
+            try:
+                callback()
+            except Exception as e:
+                print(f"Error in cancellation callback: {e}")
+        return True
+    
+    def add_callback(self, callback):
+        """Run callback on cancellation, or right away if the token is already cancelled."""
+        with self.lock:
+            if not self.event.is_set():
+                if callback not in self.callbacks:
+                    self.callbacks.append(callback)
+                return
+        callback()
+    
+    def remove_callback(self, callback):
+        """Unregister a callback once the work it would interrupt is done."""
+        with self.lock:
+            if callback in self.callbacks:
+                self.callbacks.remove(callback)
+    
+    def wait(self, timeout=None):
+        """Wait until the token is cancelled. Returns True if it was."""
+        return self.event.wait(timeout)
+
+class TurnManager:
+    """Hands out one cancellation token per session turn; barge-in cancels the turn in flight."""
+    
+    def __init__(self, max_sessions=None):
+        self.config = Config()
+        self.max_sessions = max_sessions or self.config.CONVERSATION_MAX_SESSIONS
+        
+        # session ID -> token of its latest turn, least recently started first
+        self.turns = OrderedDict()
+        self.lock = threading.Lock()
+        self.barge_ins = 0
+        # Seconds from barge-in until every stage had been told to stop
+        self.latencies = deque(maxlen=100)
+    
+    def begin_turn(self, session_id):
+        """
+        Start a new turn for a session, cancelling its previous turn if still running.
+        
+        Returns:
+            CancellationToken: Token to pass to every stage of the turn
+        """
+        token = CancellationToken()
+        with self.lock:
+            previous = self.turns.pop(session_id, None)
+            self.turns[session_id] = token
+            while len(self.turns) > self.max_sessions:
+                self.turns.popitem(last=False)
+        
+        if previous:
+            previous.cancel('superseded')
+        return token
+    
+    def cancel(self, session_id, reason='cancelled'):
+        """
+        Cancel the current turn of a session.
+        
+        Returns:
+            bool: True if a running turn was cancelled
+        """
+        with self.lock:
+            token = self.turns.get(session_id)
+        return token.cancel(reason) if token else False
+    
+    def barge_in(self, session_id):
+        """Cancel the current turn of a session because the user started speaking."""
+        start = time.perf_counter()
+        if not self.cancel(session_id, 'barge_in'):
+            return False
+        
+        latency = time.perf_counter() - start
+        with self.lock:
+            self.barge_ins += 1
+            self.latencies.append(latency)
+        print(f"✋ Barge-in: turn cancelled in {latency * 1000:.1f} ms")
+        return True
+    
+    def get_stats(self):
+        """Get barge-in statistics."""
+        with self.lock:
+            latencies = sorted(self.latencies)
+            return {
+                'barge_ins': self.barge_ins,
+                'last_latency_ms': round(self.latencies[-1] * 1000, 2) if self.latencies else None,
+                'max_latency_ms': round(latencies[-1] * 1000, 2) if latencies else None,
+                'sessions': len(self.turns)
+            }
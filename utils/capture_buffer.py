@@ -0,0 +1,56 @@
+import numpy as np
+
+class CaptureBuffer:
+    """Preallocated PCM buffer that recordings are written into in place."""
+    
+    def __init__(self, max_duration, sample_rate, channels=1, sample_width=2):
+        self.sample_rate = sample_rate
+        self.channels = channels
+        self.sample_width = sample_width
+        self.frame_size = channels * sample_width
+        
+        self.capacity = int(max_duration * sample_rate) * self.frame_size
+        self.buffer = bytearray(self.capacity)
+        self.view = memoryview(self.buffer)
+        self.length = 0
+    
+    def __len__(self):
+        return self.length
+    
+    @property
+    def duration(self):
+        """Duration of the captured audio in seconds."""
+        return self.length / (self.frame_size * self.sample_rate)
+    
+    @property
+    def is_full(self):
+        return self.length >= self.capacity
+    
+    def reset(self):
+        """Start a new recording, reusing the same memory."""
+        self.length = 0
+    
+    def write(self, data):
+        """
+        Copy a chunk of PCM into the buffer.
+        
+        Returns:
+            memoryview: The written region, or None if the buffer is full.
+                Chunks that don't fit entirely are truncated.
+        """
+        start = self.length
+        end = min(start + len(data), self.capacity)
+        if end <= start:
+            return None
+        self.view[start:end] = memoryview(data)[:end - start]
+        self.length = end
+        return self.view[start:end]
+    
+    def get_view(self, start=0, end=None):
+        """Get a zero-copy view of the captured bytes."""
+        end = self.length if end is None else min(end, self.length)
+        return self.view[start:end]
+    
+    def as_array(self, start=0, end=None):
+        """Get a zero-copy int16 array of the captured samples."""
+        return np.frombuffer(self.get_view(start, end), dtype=np.int16)
@@ -0,0 +1,70 @@
+from config import Config
+
+# Tokens added by the chat format around each message (role, separators)
+MESSAGE_OVERHEAD_TOKENS = 4
+
+class Message(dict):
+    """Chat message that caches its token count alongside the role/content keys."""
+    
+    __slots__ = ('tokens',)
+    
+    def __init__(self, role, content):
+        super().__init__(role=role, content=content)
+        self.tokens = None
+
+def estimate_tokens(text):
+    """Estimate the token count of a text (about four characters per token)."""
+    return (len(text) + 3) // 4
+
+class ContextWindow:
+    """Fits conversation history into a per-model token budget."""
+    
+    def __init__(self, default_budget=None, max_tokens=None, model_budgets=None):
+        self.config = Config()
+        self.default_budget = default_budget or self.config.CONTEXT_TOKEN_BUDGET
+        self.max_tokens = max_tokens or self.config.LLM_MAX_TOKENS
+        self.model_budgets = model_budgets or self.config.MODEL_TOKEN_BUDGETS
+    
+    def count_message(self, message):
+        """Count the tokens of a message, reusing the cached count when available."""
+        tokens = getattr(message, 'tokens', None)
+        if tokens is None:
+            tokens = estimate_tokens(message['content']) + MESSAGE_OVERHEAD_TOKENS
+            if isinstance(message, Message):
+                message.tokens = tokens
+        return tokens
+    
+    def get_budget(self, model):
+        """Get the prompt token budget for a model, leaving headroom for the completion."""
+        budget = self.model_budgets.get(model, self.default_budget)
+        return max(0, budget - self.max_tokens)
+    
+    def fit(self, conversation_history, user_input, model):
+        """
+        Select the most recent messages that fit in the model's budget.
+        
+        Args:
+            conversation_history (list): Messages, oldest first
+            user_input (str): The new user message, which is always sent
+            model (str): Model the prompt is for
+        
+        Returns:
+            list: The messages to send before the user input
+        """
+        if not conversation_history:
+            return []
+        
+        remaining = self.get_budget(model) - estimate_tokens(user_input) - MESSAGE_OVERHEAD_TOKENS
+        start = len(conversation_history)
+        while start > 0:
+            tokens = self.count_message(conversation_history[start - 1])
+            if tokens > remaining:
+                break
+            remaining -= tokens
+            start -= 1
+        
+        # Don't open the context with an orphaned assistant reply
+        while start < len(conversation_history) and conversation_history[start]['role'] == 'assistant':
+            start += 1
+        
+        return conversation_history[start:]
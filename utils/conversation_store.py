@@ -0,0 +1,126 @@
+import threading
+import time
+from collections import OrderedDict, deque
+from config import Config
+from .context_window import Message
+
+class ConversationSession:
+    """Conversation history of a single session, kept in a fixed-size ring buffer."""
+    
+    def __init__(self, max_messages):
+        self.messages = deque(maxlen=max_messages)
+        self.chars = 0
+        self.last_access = time.monotonic()
+    
+    def append(self, message):
+        """Append a message, dropping the oldest one when the buffer is full. Returns the change in size."""
+        removed = 0
+        if len(self.messages) == self.messages.maxlen:
+            removed = len(self.messages[0]['content'])
+        self.messages.append(message)
+        added = len(message['content'])
+        self.chars += added - removed
+        return added - removed
+    
+    def pop_oldest(self):
+        """Drop the oldest message. Returns the number of characters freed."""
+        freed = len(self.messages.popleft()['content'])
+        self.chars -= freed
+        return freed
+
+class ConversationStore:
+    """Thread-safe, session-keyed conversation history with LRU eviction of idle sessions."""
+    
+    def __init__(self, max_messages=None, max_sessions=None, max_total_chars=None, idle_timeout=None):
+        self.config = Config()
+        self.max_messages = max_messages or self.config.CONVERSATION_MAX_MESSAGES
+        self.max_sessions = max_sessions or self.config.CONVERSATION_MAX_SESSIONS
+        self.max_total_chars = max_total_chars or self.config.CONVERSATION_MAX_TOTAL_CHARS
+        self.idle_timeout = idle_timeout or self.config.CONVERSATION_IDLE_TIMEOUT
+        
+        # Ordered from least to most recently used
+        self.sessions = OrderedDict()
+        self.total_chars = 0
+        self.evicted_sessions = 0
+        self.lock = threading.Lock()
+    
+    def _get_session(self, session_id, create=True):
+        """Look up a session and mark it as most recently used. Caller holds the lock."""
+        session = self.sessions.get(session_id)
+        if session is None:
+            if not create:
+                return None
+            session = ConversationSession(self.max_messages)
+            self.sessions[session_id] = session
+        else:
+            self.sessions.move_to_end(session_id)
+        session.last_access = time.monotonic()
+        return session
+    
+    def _evict(self, keep_session_id=None):
+        """Evict idle sessions, then least recently used ones while over the limits. Caller holds the lock."""
+        now = time.monotonic()
+        while self.sessions:
+            session_id, session = next(iter(self.sessions.items()))
+            if session_id == keep_session_id:
+                break
+            
+            idle = now - session.last_access > self.idle_timeout
+            over_limit = (
+                len(self.sessions) > self.max_sessions or
+                self.total_chars > self.max_total_chars
+            )
+            if not (idle or over_limit):
+                break
+            
+            del self.sessions[session_id]
+            self.total_chars -= session.chars
+            self.evicted_sessions += 1
+        
+        # A single session larger than the memory cap gives up its oldest messages
+        session = self.sessions.get(keep_session_id)
+        while session and self.total_chars > self.max_total_chars and len(session.messages) > 1:
+            self.total_chars -= session.pop_oldest()
+    
+    def append(self, session_id, role, content):
+        """Append a message to a session's history."""
+        with self.lock:
+            session = self._get_session(session_id)
+            self.total_chars += session.append(Message(role, content))
+            self._evict(keep_session_id=session_id)
+    
+    def append_exchange(self, session_id, user_text, ai_response):
+        """Append a user message and the assistant reply to a session's history."""
+        with self.lock:
+            session = self._get_session(session_id)
+            self.total_chars += session.append(Message("user", user_text))
+            self.total_chars += session.append(Message("assistant", ai_response))
+            self._evict(keep_session_id=session_id)
+    
+    def get_history(self, session_id):
+        """Get a snapshot of a session's history as a list of messages."""
+        with self.lock:
+            session = self._get_session(session_id, create=False)
+            return list(session.messages) if session else []
+    
+    def get_length(self, session_id):
+        """Get the number of messages stored for a session."""
+        with self.lock:
+            session = self.sessions.get(session_id)
+            return len(session.messages) if session else 0
+    
+    def clear(self, session_id):
+        """Clear a session's history."""
+        with self.lock:
+            session = self.sessions.pop(session_id, None)
+            if session:
+                self.total_chars -= session.chars
+    
+    def get_stats(self):
+        """Get store-wide statistics."""
+        with self.lock:
+            return {
+                'sessions': len(self.sessions),
+                'total_chars': self.total_chars,
+                'evicted_sessions': self.evicted_sessions
+            }
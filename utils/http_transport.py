@@ -0,0 +1,129 @@
+import socket
+import threading
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from config import Config
+
+class CompletionRetry(Retry):
+    """
+    Retry policy that retries a POST only when the upstream refused it.
+    
+    A 502 or 504 from a gateway may come after the completion was generated
+    (and billed); 429 and 503 mean the request was turned away unprocessed.
+    """
+    
+    POST_STATUS_FORCELIST = frozenset([429, 503])
+    
+    def is_retry(self, method, status_code, has_retry_after=False):
+        if method and method.upper() == 'POST' and status_code not in self.POST_STATUS_FORCELIST:
+            return False
+        return super().is_retry(method, status_code, has_retry_after)
+
+class PooledTransport(HTTPAdapter):
+    """HTTP adapter with keep-alive connection pooling and usage statistics."""
+    
+    def __init__(self, pool_connections=None, pool_maxsize=None, pool_block=None, max_retries=None):
+        self.config = Config()
+        self._stats_lock = threading.Lock()
+        self._failed = 0
+        # Counts carried over from pools that the pool manager has evicted
+        self._retired_connections = 0
+        self._retired_requests = 0
+        
+        if max_retries is None:
+            max_retries = CompletionRetry(
+                total=self.config.HTTP_MAX_RETRIES,
+                connect=self.config.HTTP_MAX_RETRIES,
+                read=0,  # Never replay a completion that may already have been generated
+                status=self.config.HTTP_MAX_RETRIES,
+                backoff_factor=self.config.HTTP_RETRY_BACKOFF,
+                status_forcelist=(429, 502, 503, 504),
+                allowed_methods=frozenset(['GET', 'POST']),
+                respect_retry_after_header=True,
+                raise_on_status=False
+            )
+        
+        super().__init__(
+            pool_connections=pool_connections or self.config.HTTP_POOL_CONNECTIONS,
+            pool_maxsize=pool_maxsize or self.config.HTTP_POOL_MAXSIZE,
+            pool_block=self.config.HTTP_POOL_BLOCK if pool_block is None else pool_block,
+            max_retries=max_retries
+        )
+    
+    def init_poolmanager(self, *args, **kwargs):
+        """Create the pool manager and keep track of evicted host pools."""
+        super().init_poolmanager(*args, **kwargs)
+        pools = self.poolmanager.pools
+        dispose = pools.dispose_func
+        
+        def retire_pool(pool):
+            with self._stats_lock:
+                self._retired_connections += pool.num_connections
+                self._retired_requests += pool.num_requests
+            if dispose:
+                dispose(pool)
+        
+        pools.dispose_func = retire_pool
+    
+    def send(self, request, **kwargs):
+        """Send a request, counting transport-level failures."""
+        try:
+            return super().send(request, **kwargs)
+        except requests.exceptions.RequestException:
+            with self._stats_lock:
+                self._failed += 1
+            raise
+    
+    def get_stats(self):
+        """Get connection pool statistics."""
+        with self._stats_lock:
+            created = self._retired_connections
+            total_requests = self._retired_requests
+            failed = self._failed
+        
+        pools = self.poolmanager.pools
+        with pools.lock:
+            active_pools = list(pools._container.values())
+        for pool in active_pools:
+            created += pool.num_connections
+            total_requests += pool.num_requests
+        
+        return {
+            'connections_created': created,
+            'connections_reused': max(0, total_requests - created),
+            'connections_failed': failed,
+            'requests': total_requests,
+            'host_pools': len(active_pools)
+        }
+
+def create_session(headers=None):
+    """Create a requests session that sends everything through a PooledTransport."""
+    config = Config()
+    session = requests.Session()
+    transport = PooledTransport()
+    session.mount('https://', transport)
+    session.mount('http://', transport)
+    
+    if headers:
+        session.headers.update(headers)
+    if not config.HTTP_KEEP_ALIVE:
+        session.headers['Connection'] = 'close'
+    
+    return session, transport
+
+def abort_response(response):
+    """
+    Abort a streamed response from another thread.
+    
+    Closing the response would wait for the read blocked in the consuming
+    thread; shutting the socket down makes that read return right away.
+    """
+    connection = getattr(response.raw, 'connection', None)
+    sock = getattr(connection, 'sock', None)
+    if sock is None:
+        return
+    try:
+        sock.shutdown(socket.SHUT_RDWR)
+    except OSError:
+        pass
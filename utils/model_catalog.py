@@ -0,0 +1,158 @@
+import json
+import os
+import threading
+import time
+from config import Config
+
+# Seconds between attempts while the upstream catalog can't be reached
+RETRY_INTERVAL = 60
+
+class ModelCatalog:
+    """Indexed, locally persisted copy of the OpenRouter model list with TTL-based revalidation."""
+    
+    def __init__(self, fetch_models, snapshot_path=None, ttl=None):
+        """
+        Args:
+            fetch_models: Callable taking extra request headers and returning a
+                requests.Response for the /models endpoint
+            snapshot_path (str): JSON file the catalog is persisted to
+            ttl (int): Seconds before the catalog is revalidated upstream
+        """
+        self.config = Config()
+        self.fetch_models = fetch_models
+        self.snapshot_path = snapshot_path or self.config.MODEL_CATALOG_PATH
+        self.ttl = ttl or self.config.MODEL_CATALOG_TTL
+        
+        self.models = {}
+        self.models_data = None
+        self.models_json = None
+        self.etag = None
+        self.last_modified = None
+        self.fetched_at = 0
+        
+        self.lock = threading.Lock()
+        self.refresh_lock = threading.Lock()
+        self.refresh_thread = None
+        self.should_stop = threading.Event()
+        
+        self._load_snapshot()
+    
+    def _set_models(self, models_data):
+        """Swap in a new model list and rebuild the index."""
+        index = {model['id']: model for model in models_data.get('data', []) if 'id' in model}
+        models_json = json.dumps({'success': True, 'models': models_data})
+        with self.lock:
+            self.models_data = models_data
+            self.models = index
+            self.models_json = models_json
+    
+    def _load_snapshot(self):
+        """Load the on-disk snapshot, if there is one."""
+        try:
+            with open(self.snapshot_path, 'r', encoding='utf-8') as f:
+                snapshot = json.load(f)
+            self._set_models(snapshot['models'])
+            self.etag = snapshot.get('etag')
+            self.last_modified = snapshot.get('last_modified')
+            self.fetched_at = snapshot.get('fetched_at', 0)
+            print(f"✓ Loaded {len(self.models)} models from catalog snapshot")
+        except FileNotFoundError:
+            pass
+        except (OSError, ValueError, KeyError) as e:
+            print(f"Error loading model catalog snapshot: {e}")
+    
+    def _save_snapshot(self):
+        """Write the catalog to disk atomically."""
+        snapshot = {
+            'models': self.models_data,
+            'etag': self.etag,
+            'last_modified': self.last_modified,
+            'fetched_at': self.fetched_at
+        }
+        temp_path = f"{self.snapshot_path}.tmp"
+        try:
+            os.makedirs(os.path.dirname(os.path.abspath(self.snapshot_path)), exist_ok=True)
+            with open(temp_path, 'w', encoding='utf-8') as f:
+                json.dump(snapshot, f)
+            os.replace(temp_path, self.snapshot_path)
+        except OSError as e:
+            print(f"Error saving model catalog snapshot: {e}")
+    
+    def is_stale(self):
+        """Check whether the catalog is due for revalidation."""
+        return time.time() - self.fetched_at > self.ttl
+    
+    def refresh(self):
+        """
+        Revalidate the catalog upstream with a conditional request.
+        
+        Returns:
+            bool: True if the upstream catalog was reached
+        """
+        with self.refresh_lock:
+            headers = {}
+            if self.models_data is not None:
+                if self.etag:
+                    headers['If-None-Match'] = self.etag
+                if self.last_modified:
+                    headers['If-Modified-Since'] = self.last_modified
+            
+            try:
+                response = self.fetch_models(headers)
+                if response.status_code == 304:
+                    self.fetched_at = time.time()
+                    self._save_snapshot()
+                    return True
+                
+                response.raise_for_status()
+                self._set_models(response.json())
+                self.etag = response.headers.get('ETag')
+                self.last_modified = response.headers.get('Last-Modified')
+                self.fetched_at = time.time()
+                self._save_snapshot()
+                return True
+            except Exception as e:
+                print(f"Error refreshing model catalog: {e}")
+                return False
+    
+    def _ensure_loaded(self):
+        """Fetch the catalog if nothing is cached yet."""
+        if self.models_data is None:
+            self.refresh()
+    
+    def get_models(self):
+        """Get the model list in the OpenRouter /models response format."""
+        self._ensure_loaded()
+        return self.models_data
+    
+    def get_models_json(self):
+        """Get the pre-serialized /models route response body."""
+        self._ensure_loaded()
+        return self.models_json
+    
+    def get_model(self, model_id):
+        """Look up a model by ID."""
+        self._ensure_loaded()
+        return self.models.get(model_id)
+    
+    def start_background_refresh(self):
+        """Start a daemon thread that revalidates the catalog whenever it goes stale."""
+        if self.refresh_thread and self.refresh_thread.is_alive():
+            return
+        self.should_stop.clear()
+        self.refresh_thread = threading.Thread(target=self._refresh_worker, daemon=True)
+        self.refresh_thread.start()
+    
+    def _refresh_worker(self):
+        """Background worker that keeps the catalog fresh."""
+        while not self.should_stop.is_set():
+            if self.is_stale():
+                self.refresh()
+            wait = self.ttl - (time.time() - self.fetched_at)
+            if wait <= 0:
+                wait = min(RETRY_INTERVAL, self.ttl)
+            self.should_stop.wait(wait)
+    
+    def stop(self):
+        """Stop the background refresh thread."""
+        self.should_stop.set()
@@ -0,0 +1,133 @@
+import json
+import os
+import threading
+import time
+from config import Config
+
+# A run of loud chunks counts as steady noise if its quietest chunk is at
+# least this fraction of its average; speech varies far more than that
+STEADY_NOISE_RATIO = 0.5
+
+class NoiseFloor:
+    """Background noise level that is persisted across runs and adapts during capture."""
+    
+    def __init__(self, path=None, chunk_duration=None, persistent=True):
+        """
+        Args:
+            path (str): JSON file the noise floor is persisted to
+            chunk_duration (float): Seconds of audio per observed chunk
+            persistent (bool): Whether the noise floor is loaded from and saved to path
+        """
+        self.config = Config()
+        self.path = (path or self.config.NOISE_FLOOR_PATH) if persistent else None
+        chunk_duration = chunk_duration or self.config.AUDIO_CHUNK_SIZE / self.config.AUDIO_SAMPLE_RATE
+        self.adapt_rate = self.config.NOISE_FLOOR_ADAPT_RATE
+        self.multiplier = self.config.NOISE_FLOOR_MULTIPLIER
+        self.max_rise = self.config.NOISE_FLOOR_MAX_RISE
+        self.rise_chunks = max(1, round(self.config.NOISE_FLOOR_RISE_WINDOW / chunk_duration))
+        
+        # Until calibrated, the floor reproduces the configured SILENCE_THRESHOLD
+        self.level = self.config.SILENCE_THRESHOLD / self.multiplier
+        self.calibrated = False
+        self.saved_at = 0
+        self.lock = threading.Lock()
+        
+        # Current run of chunks too loud to adapt from
+        self.run_chunks = 0
+        self.run_sum = 0.0
+        self.run_min = float('inf')
+        
+        self._load()
+    
+    def _load(self):
+        """Load the persisted noise floor, if there is one."""
+        if not self.path:
+            return
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                self.level = float(json.load(f)['level'])
+            self.calibrated = True
+            print(f"✓ Loaded noise floor ({self.level:.0f} RMS)")
+        except FileNotFoundError:
+            pass
+        except (OSError, ValueError, KeyError, TypeError) as e:
+            print(f"Error loading noise floor: {e}")
+    
+    def save(self):
+        """Write the noise floor to disk atomically."""
+        if not self.path:
+            return
+        temp_path = f"{self.path}.tmp"
+        try:
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            with open(temp_path, 'w', encoding='utf-8') as f:
+                json.dump({'level': self.level, 'updated_at': time.time()}, f)
+            os.replace(temp_path, self.path)
+            self.saved_at = time.time()
+        except OSError as e:
+            print(f"Error saving noise floor: {e}")
+    
+    def maybe_save(self):
+        """Persist the noise floor if NOISE_FLOOR_SAVE_INTERVAL has passed."""
+        if time.time() - self.saved_at >= self.config.NOISE_FLOOR_SAVE_INTERVAL:
+            self.save()
+    
+    def calibrate(self, level):
+        """Set the noise floor from a one-off ambient noise measurement."""
+        with self.lock:
+            self.level = level
+            self.calibrated = True
+        self.save()
+    
+    def observe(self, rms, is_speech):
+        """
+        Update the noise floor from the level of one captured chunk.
+        
+        Quiet non-speech chunks move the floor gradually. If the room got so
+        much louder that no chunk is quiet anymore, a steady run of
+        NOISE_FLOOR_RISE_WINDOW seconds raises the floor by at most
+        NOISE_FLOOR_MAX_RISE times at once. Speech is too uneven to pass for
+        such a run, so it doesn't pull the floor up to speech level.
+        
+        Args:
+            rms (float): RMS of the chunk
+            is_speech (bool): VAD decision for the chunk
+        """
+        with self.lock:
+            # Quiet ends of words fall just under the threshold; only chunks
+            # closer to the floor than to the threshold count as background
+            if not is_speech and rms <= self.level * self.multiplier ** 0.5:
+                self.level += self.adapt_rate * (rms - self.level)
+                self._reset_run()
+                return
+            
+            self.run_chunks += 1
+            self.run_sum += rms
+            self.run_min = min(self.run_min, rms)
+            if self.run_chunks < self.rise_chunks:
+                return
+            if self.run_min >= STEADY_NOISE_RATIO * self.run_sum / self.run_chunks:
+                self.level = min(self.run_min, self.level * self.max_rise)
+            self._reset_run()
+    
+    def _reset_run(self):
+        self.run_chunks = 0
+        self.run_sum = 0.0
+        self.run_min = float('inf')
+    
+    def reset_run(self):
+        """Forget the current run of loud chunks, e.g. between recordings."""
+        with self.lock:
+            self._reset_run()
+    
+    def get_silence_threshold(self):
+        """RMS above which a chunk counts as speech."""
+        return max(self.config.SILENCE_THRESHOLD_MIN, self.level * self.multiplier)
+    
+    def get_stats(self):
+        """Get the current noise floor and derived threshold."""
+        return {
+            'level': round(self.level, 1),
+            'silence_threshold': round(self.get_silence_threshold(), 1),
+            'calibrated': self.calibrated
+        }
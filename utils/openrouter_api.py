@@ -1,6 +1,90 @@
 import requests
 import json
 from config import Config
+from .http_transport import create_session, abort_response
+from .context_window import ContextWindow
+from .response_cache import ResponseCache, make_cache_key
+from .model_catalog import ModelCatalog
+from .single_flight import SingleFlight
+
+# Fallback replies spoken to the user when the AI service fails
+NO_RESPONSE_MESSAGE = "I'm sorry, I couldn't generate a response."
+CONNECTION_ERROR_MESSAGE = "I'm sorry, I'm having trouble connecting to the AI service."
+INVALID_RESPONSE_MESSAGE = "I'm sorry, I received an invalid response from the AI service."
+UNEXPECTED_ERROR_MESSAGE = "I'm sorry, an unexpected error occurred."
+FALLBACK_MESSAGES = (
+    NO_RESPONSE_MESSAGE,
+    CONNECTION_ERROR_MESSAGE,
+    INVALID_RESPONSE_MESSAGE,
+    UNEXPECTED_ERROR_MESSAGE
+)
+
+def build_headers(api_key):
+    """Build the OpenRouter request headers."""
+    return {
+        "Authorization": f"Bearer {api_key}",
+        "Content-Type": "application/json",
+        "HTTP-Referer": "http://localhost:5000",
+        "X-Title": "Voice Chatbot"
+    }
+
+def build_payload(user_input, model, conversation_history=None, stream=False, context_window=None):
+    """Build the chat completion payload shared by the sync and async clients."""
+    # Prepare conversation messages
+    messages = []
+    
+    # Add as much conversation history as fits in the model's token budget
+    if conversation_history:
+        if context_window:
+            conversation_history = context_window.fit(conversation_history, user_input, model)
+        messages.extend(conversation_history)
+    
+    # Add current user input
+    messages.append({
+        "role": "user",
+        "content": user_input
+    })
+    
+    return {
+        "model": model,
+        "messages": messages,
+        "max_tokens": Config.LLM_MAX_TOKENS,
+        "temperature": 0.7,
+        "top_p": 0.9,
+        "frequency_penalty": 0.1,
+        "presence_penalty": 0.1,
+        "stream": stream
+    }
+
+def extract_message(response_data):
+    """Extract the assistant message from a completion response, or None."""
+    if 'choices' in response_data and len(response_data['choices']) > 0:
+        return response_data['choices'][0]['message']['content']
+    return None
+
+def parse_stream_line(line):
+    """
+    Parse one server-sent event line of a streaming completion.
+    
+    Returns:
+        tuple: (done, content) where content is the text delta or None
+    """
+    if not line.startswith('data: '):
+        return False, None
+    
+    line = line[6:]  # Remove 'data: ' prefix
+    if line.strip() == '[DONE]':
+        return True, None
+    
+    try:
+        chunk_data = json.loads(line)
+    except json.JSONDecodeError:
+        return False, None
+    
+    if 'choices' in chunk_data and len(chunk_data['choices']) > 0:
+        delta = chunk_data['choices'][0].get('delta', {})
+        return False, delta.get('content')
+    return False, None
 
 class OpenRouterAPI:
     """Handles API communication with OpenRouter for AI text generation."""
@@ -9,166 +93,194 @@ class OpenRouterAPI:
         self.config = Config()
         self.base_url = self.config.OPENROUTER_BASE_URL
         self.api_key = self.config.OPENROUTER_API_KEY
-        self.headers = {
-            "Authorization": f"Bearer {self.api_key}",
-            "Content-Type": "application/json",
-            "HTTP-Referer": "http://localhost:5000",
-            "X-Title": "Voice Chatbot"
-        }
+        self.headers = build_headers(self.api_key)
         
         if not self.api_key:
             raise ValueError("OpenRouter API key is required")
+        
+        # Reuse keep-alive connections across turns instead of a new handshake per call
+        self.session, self.transport = create_session(self.headers)
+        self.context_window = ContextWindow()
+        
+        # Opt-in cache of completed responses for repeated prompts
+        self.response_cache = ResponseCache() if self.config.RESPONSE_CACHE_ENABLED else None
+        
+        # Local, indexed copy of the model list instead of a /models download per call
+        self.model_catalog = ModelCatalog(self._fetch_models)
+        
+        # Concurrent identical requests share one upstream call
+        self.single_flight = SingleFlight() if self.config.SINGLE_FLIGHT_ENABLED else None
+    
+    def _get_cached_response(self, payload):
+        """Look up a cached response for a payload. Returns (cache_key, response)."""
+        if not self.response_cache:
+            return None, None
+        cache_key = make_cache_key(payload)
+        return cache_key, self.response_cache.get(cache_key)
+    
+    def _cache_response(self, cache_key, ai_response):
+        """Cache a successful response. Fallback apologies are never cached."""
+        if cache_key and ai_response and ai_response not in FALLBACK_MESSAGES:
+            self.response_cache.set(cache_key, ai_response)
+    
+    def _fetch_models(self, headers=None):
+        """Request the model list from OpenRouter."""
+        return self.session.get(
+            f"{self.base_url}/models",
+            headers=headers,
+            timeout=10
+        )
     
     def get_available_models(self):
-        """Get list of available models from OpenRouter."""
-        try:
-            response = requests.get(
-                f"{self.base_url}/models",
-                headers=self.headers,
-                timeout=10
-            )
-            response.raise_for_status()
-            return response.json()
-        except requests.exceptions.RequestException as e:
-            print(f"Error fetching models: {e}")
-            return None
+        """Get list of available models from the local model catalog."""
+        return self.model_catalog.get_models()
     
     def generate_response(self, user_input, model=None, conversation_history=None):
         """Generate AI response using OpenRouter API."""
         if not model:
             model = self.config.DEFAULT_MODEL
         
-        # Prepare conversation messages
-        messages = []
+        payload = build_payload(user_input, model, conversation_history, context_window=self.context_window)
         
-        # Add conversation history if provided
-        if conversation_history:
-            messages.extend(conversation_history)
-        
-        # Add current user input
-        messages.append({
-            "role": "user",
-            "content": user_input
-        })
-        
-        # Prepare request payload
-        payload = {
-            "model": model,
-            "messages": messages,
-            "max_tokens": 1000,
-            "temperature": 0.7,
-            "top_p": 0.9,
-            "frequency_penalty": 0.1,
-            "presence_penalty": 0.1,
-            "stream": False
-        }
+        cache_key, cached_response = self._get_cached_response(payload)
+        if cached_response is not None:
+            print("AI Response served from cache")
+            return cached_response
         
+        if not self.single_flight:
+            return self._request_completion(payload, cache_key)
+        return self.single_flight.do(
+            cache_key or make_cache_key(payload),
+            lambda: self._request_completion(payload, cache_key)
+        )
+    
+    def _request_completion(self, payload, cache_key=None):
+        """Send a blocking completion request upstream."""
+        model = payload['model']
         try:
             print(f"Sending request to OpenRouter API with model: {model}")
-            response = requests.post(
+            response = self.session.post(
                 f"{self.base_url}/chat/completions",
-                headers=self.headers,
                 json=payload,
                 timeout=30
             )
             response.raise_for_status()
             
-            response_data = response.json()
+            ai_response = extract_message(response.json())
             
-            if 'choices' in response_data and len(response_data['choices']) > 0:
-                ai_response = response_data['choices'][0]['message']['content']
+            if ai_response is not None:
                 print(f"AI Response received: {ai_response[:100]}...")
+                self._cache_response(cache_key, ai_response)
                 return ai_response
             else:
                 print("No response choices found in API response")
-                return "I'm sorry, I couldn't generate a response."
+                return NO_RESPONSE_MESSAGE
                 
         except requests.exceptions.RequestException as e:
             print(f"Error calling OpenRouter API: {e}")
             if hasattr(e.response, 'text'):
                 print(f"Response content: {e.response.text}")
-            return "I'm sorry, I'm having trouble connecting to the AI service."
+            return CONNECTION_ERROR_MESSAGE
         except json.JSONDecodeError as e:
             print(f"Error parsing JSON response: {e}")
-            return "I'm sorry, I received an invalid response from the AI service."
+            return INVALID_RESPONSE_MESSAGE
         except Exception as e:
             print(f"Unexpected error: {e}")
-            return "I'm sorry, an unexpected error occurred."
+            return UNEXPECTED_ERROR_MESSAGE
     
-    def generate_streaming_response(self, user_input, model=None, conversation_history=None):
-        """Generate streaming AI response using OpenRouter API."""
+    def generate_streaming_response(self, user_input, model=None, conversation_history=None, cancel_token=None):
+        """
+        Generate streaming AI response using OpenRouter API.
+        
+        Cancelling cancel_token ends the stream early and aborts the upstream request.
+        """
         if not model:
             model = self.config.DEFAULT_MODEL
         
-        # Prepare conversation messages
-        messages = []
+        payload = build_payload(
+            user_input, model, conversation_history, stream=True, context_window=self.context_window
+        )
         
-        # Add conversation history if provided
-        if conversation_history:
-            messages.extend(conversation_history)
-        
-        # Add current user input
-        messages.append({
-            "role": "user",
-            "content": user_input
-        })
-        
-        # Prepare request payload for streaming
-        payload = {
-            "model": model,
-            "messages": messages,
-            "max_tokens": 1000,
-            "temperature": 0.7,
-            "top_p": 0.9,
-            "frequency_penalty": 0.1,
-            "presence_penalty": 0.1,
-            "stream": True
-        }
+        cache_key, cached_response = self._get_cached_response(payload)
+        if cached_response is not None:
+            print("AI Response served from cache")
+            yield cached_response
+            return
         
+        if not self.single_flight:
+            yield from self._stream_completion(payload, cache_key, cancel_token)
+            return
+        # The shared upstream request is aborted only once every subscriber has cancelled
+        yield from self.single_flight.stream(
+            cache_key or make_cache_key(payload),
+            lambda upstream_token: self._stream_completion(payload, cache_key, upstream_token),
+            cancel_token
+        )
+    
+    def _stream_completion(self, payload, cache_key=None, cancel_token=None):
+        """Stream a completion from upstream, yielding content chunks."""
+        model = payload['model']
+        if cancel_token and cancel_token.is_cancelled:
+            return
         try:
             print(f"Sending streaming request to OpenRouter API with model: {model}")
-            response = requests.post(
+            response = self.session.post(
                 f"{self.base_url}/chat/completions",
-                headers=self.headers,
                 json=payload,
                 timeout=30,
                 stream=True
             )
             response.raise_for_status()
             
+            def abort():
+                abort_response(response)
+            
             full_response = ""
-            for line in response.iter_lines():
-                if line:
-                    line = line.decode('utf-8')
-                    if line.startswith('data: '):
-                        line = line[6:]  # Remove 'data: ' prefix
-                        if line.strip() == '[DONE]':
+            if cancel_token:
+                cancel_token.add_callback(abort)
+            try:
+                for line in response.iter_lines():
+                    if line:
+                        done, content = parse_stream_line(line.decode('utf-8'))
+                        if done:
                             break
-                        try:
-                            chunk_data = json.loads(line)
-                            if 'choices' in chunk_data and len(chunk_data['choices']) > 0:
-                                delta = chunk_data['choices'][0].get('delta', {})
-                                if 'content' in delta:
-                                    content = delta['content']
-                                    full_response += content
-                                    yield content
-                        except json.JSONDecodeError:
-                            continue
+                        if content:
+                            full_response += content
+                            yield content
+                
+                if cancel_token and cancel_token.is_cancelled:
+                    print("Streaming request cancelled")
+                    return
+                # Read the stream terminator so the connection goes back to the pool
+                response.raw.drain_conn()
+            finally:
+                if cancel_token:
+                    cancel_token.remove_callback(abort)
+                response.close()
             
+            self._cache_response(cache_key, full_response)
             return full_response
             
         except requests.exceptions.RequestException as e:
+            if cancel_token and cancel_token.is_cancelled:
+                # The aborted connection surfaces as a read error
+                print("Streaming request cancelled")
+                return
             print(f"Error calling OpenRouter API: {e}")
-            yield "I'm sorry, I'm having trouble connecting to the AI service."
+            yield CONNECTION_ERROR_MESSAGE
         except Exception as e:
+            if cancel_token and cancel_token.is_cancelled:
+                print("Streaming request cancelled")
+                return
             print(f"Unexpected error: {e}")
-            yield "I'm sorry, an unexpected error occurred."
+            yield UNEXPECTED_ERROR_MESSAGE
     
     def test_connection(self):
         """Test the connection to OpenRouter API."""
         try:
-            models = self.get_available_models()
-            if models:
+            # A conditional request; the full list is only downloaded when it changed
+            if self.model_catalog.refresh():
+                models = self.get_available_models()
                 print("✓ Successfully connected to OpenRouter API")
                 print(f"✓ Found {len(models.get('data', []))} available models")
                 return True
@@ -179,11 +291,25 @@ class OpenRouterAPI:
             print(f"✗ Connection test failed: {e}")
             return False
     
+    def get_transport_stats(self):
+        """Get connection reuse statistics for the pooled HTTP transport."""
+        return self.transport.get_stats()
+    
+    def get_single_flight_stats(self):
+        """Get request coalescing statistics, or None when disabled."""
+        return self.single_flight.get_stats() if self.single_flight else None
+    
+    def get_cache_stats(self):
+        """Get response cache statistics, or None when caching is disabled."""
+        return self.response_cache.get_stats() if self.response_cache else None
+    
+    def close(self):
+        """Close pooled connections, the response cache and the catalog refresher."""
+        self.model_catalog.stop()
+        self.session.close()
+        if self.response_cache:
+            self.response_cache.close()
+    
     def get_model_info(self, model_name):
         """Get information about a specific model."""
-        models = self.get_available_models()
-        if models and 'data' in models:
-            for model in models['data']:
-                if model['id'] == model_name:
-                    return model
-        return None
\ No newline at end of file
+        return self.model_catalog.get_model(model_name)
\ No newline at end of file
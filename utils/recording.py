@@ -0,0 +1,201 @@
+import math
+import wave
+import numpy as np
+import speech_recognition as sr
+from config import Config
+
+# Bytes per sample of the int16 capture format
+SAMPLE_WIDTH = 2
+
+def downmix_to_mono(pcm, channels):
+    """Average interleaved int16 channels into mono int16 samples."""
+    samples = np.frombuffer(pcm, dtype=np.int16)
+    if channels == 1:
+        return samples
+    frames = samples[:len(samples) - len(samples) % channels].reshape(-1, channels)
+    return frames.mean(axis=1, dtype=np.float32).astype(np.int16)
+
+class Recording:
+    """
+    Capture pipeline of one recording: voice activity detection, noise floor
+    tracking, silence trimming and transcription of segments while recording.
+    
+    Audio is pushed in by whoever owns the source, the local microphone
+    thread or a browser's WebSocket, in pieces of any size.
+    """
+    
+    def __init__(self, capture, vad, noise_floor, transcriber=None, on_speech_onset=None):
+        """
+        Args:
+            capture (CaptureBuffer): Buffer the audio is written into
+            vad (VADEngine): Voice activity detector for the capture format
+            noise_floor (NoiseFloor): Noise floor the silence threshold follows
+            transcriber (StreamingTranscriber): Transcribes segments at pauses
+            on_speech_onset: Called once BARGE_IN_MIN_SPEECH seconds of speech have been captured
+        """
+        self.config = Config()
+        self.capture = capture
+        self.vad = vad
+        self.noise_floor = noise_floor
+        self.transcriber = transcriber
+        self.on_speech_onset = on_speech_onset
+        # VAD decision per captured chunk, used to trim silence
+        self.speech_flags = []
+        self.stop_reason = None
+        self.finished = False
+        
+        # Time is measured in chunks of audio rather than wall-clock time
+        self.chunk_bytes = self.config.AUDIO_CHUNK_SIZE * capture.frame_size
+        chunk_duration = self.config.AUDIO_CHUNK_SIZE / capture.sample_rate
+        self.max_silent_chunks = math.ceil(self.config.SILENCE_DURATION / chunk_duration)
+        self.max_chunks = math.ceil(self.config.MAX_RECORDING_DURATION / chunk_duration)
+        self.pause_chunks = math.ceil(self.config.STREAMING_SEGMENT_PAUSE / chunk_duration)
+        self.max_segment_chunks = math.ceil(self.config.STREAMING_SEGMENT_MAX_DURATION / chunk_duration)
+        self.onset_chunks = max(1, math.ceil(self.config.BARGE_IN_MIN_SPEECH / chunk_duration))
+        self.silent_chunks = 0
+        self.speech_chunks = 0
+        self.chunk_count = 0
+        
+        # Audio received since the last full chunk
+        self.pending = bytearray()
+        
+        # Current segment of the recording, for streaming transcription
+        self.segment_start = 0
+        self.segment_chunks = 0
+        self.segment_has_speech = False
+        
+        capture.reset()
+        vad.reset()
+        noise_floor.reset_run()
+        self._apply_noise_floor()
+    
+    def _apply_noise_floor(self):
+        self.vad.set_threshold(self.noise_floor.get_silence_threshold())
+    
+    def feed(self, data):
+        """
+        Add captured audio.
+        
+        Returns:
+            bool: False once the recording has ended on silence or its maximum duration
+        """
+        if self.stop_reason:
+            return False
+        
+        if not self.pending and len(data) == self.chunk_bytes:
+            return self._process_chunk(data)
+        
+        self.pending += data
+        offset = 0
+        while len(self.pending) - offset >= self.chunk_bytes:
+            if not self._process_chunk(self.pending[offset:offset + self.chunk_bytes]):
+                break
+            offset += self.chunk_bytes
+        del self.pending[:offset]
+        return not self.stop_reason
+    
+    def _process_chunk(self, data):
+        """Capture one chunk and update the voice activity state. Returns False when the recording ends."""
+        chunk = self.capture.write(data)
+        if chunk is None:
+            print("Maximum recording duration reached.")
+            self.stop_reason = 'max_duration'
+            return False
+        self.chunk_count += 1
+        self.segment_chunks += 1
+        
+        # Check for silence
+        is_speech = self.vad.is_speech(chunk)
+        self.speech_flags.append(is_speech)
+        self.noise_floor.observe(self.vad.last_rms, is_speech)
+        self._apply_noise_floor()
+        if is_speech:
+            self.silent_chunks = 0
+            self.speech_chunks += 1
+            self.segment_has_speech = True
+            # Sustained speech rather than a click or cough
+            if self.on_speech_onset and self.speech_chunks == self.onset_chunks:
+                on_speech_onset, self.on_speech_onset = self.on_speech_onset, None
+                on_speech_onset()
+        else:
+            self.silent_chunks += 1
+            self.speech_chunks = 0
+            if self.silent_chunks > self.max_silent_chunks:
+                print("Silence detected, stopping recording...")
+                self.stop_reason = 'silence'
+                return False
+        
+        # Hand the segment so far to the transcriber at a pause
+        if self.transcriber and self.segment_has_speech and (
+            self.silent_chunks == self.pause_chunks or self.segment_chunks >= self.max_segment_chunks
+        ):
+            segment_end = len(self.capture)
+            self.transcriber.submit(self.get_audio_data(self.segment_start, segment_end))
+            self.segment_start = segment_end
+            self.segment_chunks = 0
+            self.segment_has_speech = False
+        
+        # Check max duration
+        if self.chunk_count >= self.max_chunks:
+            print("Maximum recording duration reached.")
+            self.stop_reason = 'max_duration'
+            return False
+        return True
+    
+    def finish(self):
+        """Transcribe the last segment and persist the noise floor. Safe to call more than once."""
+        if self.finished:
+            return
+        self.finished = True
+        if self.transcriber:
+            if self.segment_has_speech:
+                self.transcriber.submit(self.get_audio_data(self.segment_start))
+            self.transcriber.close()
+        self.noise_floor.maybe_save()
+    
+    def get_partial_transcript(self):
+        """Get the transcript of the recording so far."""
+        return self.transcriber.get_partial() if self.transcriber else ''
+    
+    def trim_silence(self, start=0, end=None):
+        """
+        Narrow a byte range of the capture to its speech, plus TRIM_PADDING on each side.
+        
+        Uses the VAD decisions made during capture. Ranges without any detected
+        speech are left untouched so the recognizer still gets to decide.
+        
+        Returns:
+            tuple: (start, end) byte offsets
+        """
+        end = len(self.capture) if end is None else min(end, len(self.capture))
+        if not self.config.TRIM_SILENCE:
+            return start, end
+        
+        chunk_bytes = self.chunk_bytes
+        flags = self.speech_flags[start // chunk_bytes:-(-end // chunk_bytes)]
+        if True not in flags:
+            return start, end
+        
+        first_speech = flags.index(True)
+        last_speech = len(flags) - 1 - flags[::-1].index(True)
+        base = start // chunk_bytes * chunk_bytes
+        padding = int(self.config.TRIM_PADDING * self.capture.sample_rate) * self.capture.frame_size
+        
+        trimmed_start = max(start, base + first_speech * chunk_bytes - padding)
+        trimmed_end = min(end, base + (last_speech + 1) * chunk_bytes + padding)
+        return trimmed_start, trimmed_end
+    
+    def get_audio_data(self, start=0, end=None):
+        """Build recognizer input straight from the capture buffer."""
+        start, end = self.trim_silence(start, end)
+        # The bytes are snapshotted because the buffer is reused by the next recording
+        samples = downmix_to_mono(self.capture.get_view(start, end), self.capture.channels)
+        return sr.AudioData(samples.tobytes(), self.capture.sample_rate, SAMPLE_WIDTH)
+    
+    def save_to_file(self, path):
+        """Write the trimmed recording to a WAV file."""
+        with wave.open(path, 'wb') as wf:
+            wf.setnchannels(self.capture.channels)
+            wf.setsampwidth(self.capture.sample_width)
+            wf.setframerate(self.capture.sample_rate)
+            wf.writeframes(self.capture.get_view(*self.trim_silence()))
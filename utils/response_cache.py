@@ -0,0 +1,147 @@
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from config import Config
+
+# Payload fields that change the completion; everything else (e.g. "stream") is ignored
+SAMPLING_PARAMETERS = ('max_tokens', 'temperature', 'top_p', 'frequency_penalty', 'presence_penalty')
+
+def make_cache_key(payload):
+    """Build a cache key from the normalized model, messages and sampling parameters."""
+    normalized = {
+        'model': payload['model'].strip().lower(),
+        'messages': [
+            [message['role'], ' '.join(message['content'].split())]
+            for message in payload['messages']
+        ],
+        'params': [payload.get(name) for name in SAMPLING_PARAMETERS]
+    }
+    encoded = json.dumps(normalized, separators=(',', ':'), ensure_ascii=False)
+    return hashlib.sha256(encoded.encode('utf-8')).hexdigest()
+
+class ResponseCache:
+    """In-memory LRU/TTL cache of AI responses with optional SQLite persistence."""
+    
+    def __init__(self, max_entries=None, ttl=None, db_path=None):
+        self.config = Config()
+        self.max_entries = max_entries or self.config.RESPONSE_CACHE_MAX_ENTRIES
+        self.ttl = ttl or self.config.RESPONSE_CACHE_TTL
+        self.db_path = db_path if db_path is not None else self.config.RESPONSE_CACHE_PATH
+        
+        # key -> (response, created timestamp), least recently used first
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.db = None
+        self.writes = 0
+        
+        if self.db_path:
+            self._open_db()
+    
+    def _open_db(self):
+        """Open (or create) the on-disk cache."""
+        try:
+            self.db = sqlite3.connect(self.db_path, check_same_thread=False)
+            self.db.execute(
+                "CREATE TABLE IF NOT EXISTS responses ("
+                "key TEXT PRIMARY KEY, response TEXT NOT NULL, created REAL NOT NULL)"
+            )
+            # Drop entries that expired while the process was down
+            self._purge_expired()
+        except sqlite3.Error as e:
+            print(f"Error opening response cache database: {e}")
+            self.db = None
+    
+    def get(self, key):
+        """Get a cached response, or None on a miss."""
+        now = time.time()
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None:
+                if now - entry[1] <= self.ttl:
+                    self.entries.move_to_end(key)
+                    self.hits += 1
+                    return entry[0]
+                del self.entries[key]
+            
+            entry = self._load(key)
+            if entry is not None and now - entry[1] <= self.ttl:
+                self._remember(key, entry)
+                self.hits += 1
+                return entry[0]
+            
+            self.misses += 1
+            return None
+    
+    def set(self, key, response):
+        """Store a response."""
+        entry = (response, time.time())
+        with self.lock:
+            self._remember(key, entry)
+            if self.db:
+                try:
+                    self.db.execute(
+                        "INSERT OR REPLACE INTO responses (key, response, created) VALUES (?, ?, ?)",
+                        (key, entry[0], entry[1])
+                    )
+                    self.writes += 1
+                    if self.writes % 100 == 0:
+                        self._purge_expired()
+                    self.db.commit()
+                except sqlite3.Error as e:
+                    print(f"Error writing response cache: {e}")
+    
+    def _remember(self, key, entry):
+        """Insert into the in-memory LRU. Caller holds the lock."""
+        self.entries[key] = entry
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+    
+    def _purge_expired(self):
+        """Delete expired entries from disk. Caller holds the lock (or is the constructor)."""
+        self.db.execute("DELETE FROM responses WHERE created < ?", (time.time() - self.ttl,))
+        self.db.commit()
+    
+    def _load(self, key):
+        """Read an entry from disk. Caller holds the lock."""
+        if not self.db:
+            return None
+        try:
+            return self.db.execute(
+                "SELECT response, created FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+        except sqlite3.Error as e:
+            print(f"Error reading response cache: {e}")
+            return None
+    
+    def clear(self):
+        """Remove all cached responses."""
+        with self.lock:
+            self.entries.clear()
+            if self.db:
+                self.db.execute("DELETE FROM responses")
+                self.db.commit()
+    
+    def get_stats(self):
+        """Get hit/miss statistics."""
+        with self.lock:
+            lookups = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+                'entries': len(self.entries),
+                'persistent': self.db is not None
+            }
+    
+    def close(self):
+        """Close the on-disk cache."""
+        with self.lock:
+            if self.db:
+                self.db.close()
+                self.db = None
@@ -0,0 +1,151 @@
+import re
+from config import Config
+
+SENTENCE_TERMINATORS = '.!?'
+CLAUSE_MARKS = ',;:'
+# Characters that may follow a terminator within the same sentence, e.g. '?!' or '."'
+TRAILING_PUNCTUATION = SENTENCE_TERMINATORS + '"\')]}”’'
+
+# Characters where a chunk may end; the text in between is skipped without a Python loop
+BOUNDARY_PATTERN = re.compile('[\\n' + re.escape(SENTENCE_TERMINATORS + CLAUSE_MARKS) + ']')
+
+# Words whose trailing period doesn't end a sentence (compared lowercase, without the final '.')
+ABBREVIATIONS = {
+    'mr', 'mrs', 'ms', 'dr', 'prof', 'sr', 'jr', 'st', 'vs', 'e.g', 'i.e', 'cf', 'al',
+    'approx', 'dept', 'fig', 'inc', 'ltd', 'co', 'corp', 'vol', 'u.s', 'a.m', 'p.m'
+}
+
+class SentenceSegmenter:
+    """
+    Splits streamed text into speakable chunks as it arrives.
+    
+    Text is scanned incrementally, so the cost is linear in the length of
+    the response. Periods after abbreviations, initials and
+    list numbers don't end a sentence, and decimals like "3.5" never do. The
+    first chunk is emitted early, at a clause boundary if need be, to get
+    speech started; later chunks group sentences into larger pieces.
+    """
+    
+    def __init__(self, first_min_chars=None, first_max_chars=None, min_chars=None, max_chars=None):
+        config = Config()
+        self.first_min_chars = first_min_chars or config.TTS_FIRST_CHUNK_MIN_CHARS
+        self.first_max_chars = first_max_chars or config.TTS_FIRST_CHUNK_MAX_CHARS
+        self.min_chars = min_chars or config.TTS_CHUNK_MIN_CHARS
+        self.max_chars = max_chars or config.TTS_CHUNK_MAX_CHARS
+        
+        self.buffer = ''
+        self.scan_pos = 0
+        self.last_boundary = -1
+        self.first = True
+    
+    def _is_abbreviation(self, index):
+        """Check whether the period at index belongs to an abbreviation, initial or list number."""
+        start = index
+        while start > 0 and not self.buffer[start - 1].isspace():
+            start -= 1
+        word = self.buffer[start:index].lstrip('(["\'')
+        
+        if word.lower() in ABBREVIATIONS:
+            return True
+        # Initials such as "J. K. Rowling"
+        if len(word) == 1 and word.isalpha() and word.isupper():
+            return True
+        # List numbers such as "1." at the start of a line
+        if word.isdigit() and (start == 0 or self.buffer[start - 1] == '\n'):
+            return True
+        return False
+    
+    def _cut(self, end):
+        """Remove and return the chunk ending at end."""
+        chunk = self.buffer[:end].strip()
+        self.buffer = self.buffer[end:].lstrip()
+        self.last_boundary = -1
+        if chunk:
+            self.first = False
+        return chunk
+    
+    def feed(self, text):
+        """
+        Add streamed text.
+        
+        Returns:
+            list: Chunks that are complete and ready to be spoken
+        """
+        self.buffer += text
+        chunks = []
+        i = self.scan_pos
+        
+        while True:
+            limit = self.first_max_chars if self.first else self.max_chars
+            match = BOUNDARY_PATTERN.search(self.buffer, i)
+            position = match.start() if match else len(self.buffer)
+            
+            if position > limit:
+                # Too long to keep waiting; cut at the last boundary or at least a space
+                cut = self.last_boundary
+                if cut <= 0:
+                    cut = self.buffer.rfind(' ', 0, limit + 1)
+                if cut <= 0:
+                    cut = self.buffer.find(' ', limit, position)
+                if cut > 0:
+                    chunks.append(self._cut(cut))
+                    i = 0
+                    continue
+            
+            if match is None:
+                i = len(self.buffer)
+                break
+            
+            i = position
+            char = match.group()
+            end = None
+            clause = False
+            
+            if char == '\n':
+                end = i + 1
+            else:
+                j = i + 1
+                while j < len(self.buffer) and self.buffer[j] in TRAILING_PUNCTUATION:
+                    j += 1
+                if j == len(self.buffer):
+                    # Whether this ends anything depends on text that hasn't arrived yet
+                    break
+                if self.buffer[j].isspace():
+                    clause = char in CLAUSE_MARKS
+                    if clause or char != '.' or not self._is_abbreviation(i):
+                        end = j
+                i = j - 1
+            
+            if end is not None:
+                # The buffer starts at a chunk boundary, so end approximates the chunk length
+                if clause:
+                    # Only the first chunk is cut at a clause, to start speaking sooner
+                    ready = self.first and end >= self.first_min_chars
+                else:
+                    ready = self.first or end >= self.min_chars or char == '\n'
+                if ready:
+                    chunk = self._cut(end)
+                    if chunk:
+                        chunks.append(chunk)
+                    i = 0
+                    continue
+                self.last_boundary = end
+            
+            i += 1
+        
+        self.scan_pos = i
+        return chunks
+    
+    def flush(self):
+        """
+        Return whatever text is left once the stream has ended.
+        
+        Returns:
+            list: The remaining chunk, if any
+        """
+        chunk = self.buffer.strip()
+        self.buffer = ''
+        self.scan_pos = 0
+        self.last_boundary = -1
+        self.first = True
+        return [chunk] if chunk else []
@@ -0,0 +1,180 @@
+import threading
+from .cancellation import CancellationToken
+
+class _Call:
+    """A blocking call shared by every caller with the same key."""
+    
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+class _StreamCall:
+    """A streaming call whose chunks are buffered for every subscriber."""
+    
+    def __init__(self):
+        self.chunks = []
+        self.finished = False
+        self.error = None
+        self.subscribers = 0
+        self.condition = threading.Condition()
+        # Aborts the upstream request once every subscriber has gone away
+        self.cancel_token = CancellationToken()
+
+class SingleFlight:
+    """Coalesces concurrent identical requests into one upstream call."""
+    
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.calls = {}
+        self.streams = {}
+        self.leaders = 0
+        self.followers = 0
+    
+    def do(self, key, fn):
+        """
+        Run fn() once for all concurrent callers with the same key.
+        
+        Args:
+            key: Identity of the request
+            fn: Callable producing the result
+        
+        Returns:
+            The result of the single in-flight call
+        """
+        with self.lock:
+            call = self.calls.get(key)
+            if call is None:
+                call = _Call()
+                self.calls[key] = call
+                self.leaders += 1
+                is_leader = True
+            else:
+                self.followers += 1
+                is_leader = False
+        
+        if not is_leader:
+            call.done.wait()
+            if call.error:
+                raise call.error
+            return call.result
+        
+        try:
+            call.result = fn()
+            return call.result
+        except Exception as e:
+            call.error = e
+            raise
+        finally:
+            with self.lock:
+                del self.calls[key]
+            call.done.set()
+    
+    def stream(self, key, make_generator, cancel_token=None):
+        """
+        Subscribe to a single upstream stream for all concurrent callers with the same key.
+        
+        The upstream generator runs on its own thread. Late subscribers first get
+        the chunks already received, then the live tail. The upstream request is
+        cancelled once every subscriber has gone away.
+        
+        Args:
+            key: Identity of the request
+            make_generator: Callable taking the upstream CancellationToken and
+                returning the upstream chunk generator
+            cancel_token (CancellationToken): Ends this subscription early
+        
+        Returns:
+            generator: Chunks of the shared stream
+        """
+        with self.lock:
+            call = self.streams.get(key)
+            if call is None:
+                call = _StreamCall()
+                self.streams[key] = call
+                self.leaders += 1
+                threading.Thread(
+                    target=self._pump, args=(key, call, make_generator), daemon=True
+                ).start()
+            else:
+                self.followers += 1
+            call.subscribers += 1
+        
+        return self._subscribe(key, call, cancel_token)
+    
+    def _pump(self, key, call, make_generator):
+        """Drive the upstream generator and publish its chunks."""
+        generator = None
+        try:
+            generator = make_generator(call.cancel_token)
+            for chunk in generator:
+                with self.lock:
+                    if call.subscribers == 0:
+                        # Nobody is listening any more; stop consuming upstream.
+                        # Unregister now so new callers start a fresh stream.
+                        if self.streams.get(key) is call:
+                            del self.streams[key]
+                        break
+                with call.condition:
+                    call.chunks.append(chunk)
+                    call.condition.notify_all()
+        except Exception as e:
+            call.error = e
+        finally:
+            with self.lock:
+                if self.streams.get(key) is call:
+                    del self.streams[key]
+            if generator is not None:
+                generator.close()
+            with call.condition:
+                call.finished = True
+                call.condition.notify_all()
+    
+    def _subscribe(self, key, call, cancel_token=None):
+        """Yield the buffered and live chunks of a stream."""
+        def wake():
+            with call.condition:
+                call.condition.notify_all()
+        
+        if cancel_token:
+            cancel_token.add_callback(wake)
+        index = 0
+        try:
+            while True:
+                with call.condition:
+                    while index >= len(call.chunks) and not call.finished:
+                        if cancel_token and cancel_token.is_cancelled:
+                            return
+                        call.condition.wait()
+                    chunks = call.chunks[index:]
+                    finished = call.finished
+                
+                if chunks:
+                    index += len(chunks)
+                    yield from chunks
+                elif finished:
+                    if call.error:
+                        raise call.error
+                    return
+                if cancel_token and cancel_token.is_cancelled:
+                    return
+        finally:
+            if cancel_token:
+                cancel_token.remove_callback(wake)
+            with self.lock:
+                call.subscribers -= 1
+                abandoned = call.subscribers == 0 and not call.finished
+                if abandoned and self.streams.get(key) is call:
+                    # New callers start a fresh stream instead of joining an aborted one
+                    del self.streams[key]
+            if abandoned:
+                call.cancel_token.cancel('abandoned')
+    
+    def get_stats(self):
+        """Get coalescing statistics."""
+        with self.lock:
+            return {
+                'leaders': self.leaders,
+                'followers': self.followers,
+                'in_flight': len(self.calls) + len(self.streams)
+            }
@@ -0,0 +1,105 @@
+import threading
+from concurrent.futures import wait
+
+# Marks a segment whose transcription hasn't come back yet
+PENDING = object()
+
+class StreamingTranscriber:
+    """Transcribes the segments of a live recording in the background and merges the results."""
+    
+    def __init__(self, recognize, executor):
+        """
+        Args:
+            recognize: Callable taking sr.AudioData and returning text or None
+            executor: Executor the segments are transcribed on
+        """
+        self.recognize = recognize
+        self.executor = executor
+        self.segments = []
+        self.futures = []
+        self.closed = False
+        self.version = 0
+        self.condition = threading.Condition()
+    
+    def submit(self, audio):
+        """Queue a segment of the recording for transcription."""
+        with self.condition:
+            index = len(self.segments)
+            self.segments.append(PENDING)
+        self.futures.append(self.executor.submit(self._transcribe, index, audio))
+    
+    def _transcribe(self, index, audio):
+        """Transcribe one segment and publish the updated transcript."""
+        try:
+            text = self.recognize(audio)
+        except Exception as e:
+            print(f"Error transcribing segment {index}: {e}")
+            text = None
+        
+        with self.condition:
+            self.segments[index] = text or ''
+            self.version += 1
+            self.condition.notify_all()
+    
+    def close(self):
+        """Mark the recording as finished; no more segments will be submitted."""
+        with self.condition:
+            self.closed = True
+            self.version += 1
+            self.condition.notify_all()
+    
+    def _merge(self):
+        """Join the transcribed segments, stopping at the first pending one."""
+        texts = []
+        for text in self.segments:
+            if text is PENDING:
+                break
+            if text:
+                texts.append(text)
+        return ' '.join(texts)
+    
+    def is_finished(self):
+        """Check whether the recording is closed and every segment is transcribed."""
+        with self.condition:
+            return self.closed and PENDING not in self.segments
+    
+    def get_partial(self):
+        """Get the transcript of the segments transcribed so far."""
+        with self.condition:
+            return self._merge()
+    
+    def finish(self, timeout=None):
+        """
+        Wait for the outstanding segments and return the merged transcript.
+        
+        Args:
+            timeout (float): Seconds to wait for pending segments
+        
+        Returns:
+            str: Final transcript, or None if nothing was understood
+        """
+        self.close()
+        wait(list(self.futures), timeout)
+        return self.get_partial() or None
+    
+    def updates(self):
+        """
+        Yield the partial transcript each time it changes.
+        
+        Returns once the recording is closed and every segment is transcribed.
+        """
+        version = -1
+        last_text = ''
+        while True:
+            with self.condition:
+                while self.version == version:
+                    self.condition.wait()
+                version = self.version
+                text = self._merge()
+                finished = self.closed and PENDING not in self.segments
+            
+            if text != last_text:
+                last_text = text
+                yield text
+            if finished:
+                return
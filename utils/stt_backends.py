@@ -0,0 +1,281 @@
+import importlib.util
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+import speech_recognition as sr
+from config import Config
+
+# Latency samples required before the hedge delay follows the observed percentile
+MIN_LATENCY_SAMPLES = 5
+
+class STTBackend(ABC):
+    """Base class for speech-to-text backends."""
+    
+    name = None
+    # Rate audio is resampled to before recognition; None keeps the capture rate
+    sample_rate = None
+    
+    @abstractmethod
+    def recognize(self, audio):
+        """
+        Transcribe audio.
+        
+        Args:
+            audio (sr.AudioData): Audio to transcribe
+        
+        Returns:
+            str: Transcribed text
+        
+        Raises:
+            sr.UnknownValueError: If the audio contains no intelligible speech
+            sr.RequestError: If the backend can't be reached or failed
+        """
+
+class GoogleBackend(STTBackend):
+    """Google Web Speech API through speech_recognition."""
+    
+    name = 'google'
+    
+    def __init__(self, recognizer):
+        self.recognizer = recognizer
+    
+    def recognize(self, audio):
+        return self.recognizer.recognize_google(audio)
+
+class SphinxBackend(STTBackend):
+    """Offline CMU Sphinx recognition through speech_recognition."""
+    
+    name = 'sphinx'
+    
+    def __init__(self, recognizer):
+        if importlib.util.find_spec('pocketsphinx') is None:
+            raise ImportError("pocketsphinx is not installed")
+        self.recognizer = recognizer
+    
+    def recognize(self, audio):
+        return self.recognizer.recognize_sphinx(audio)
+
+class CallableBackend(STTBackend):
+    """Wraps a plain function as a backend, e.g. a local stand-in recognizer."""
+    
+    def __init__(self, name, recognize):
+        self.name = name
+        self.function = recognize
+    
+    def recognize(self, audio):
+        return self.function(audio)
+
+# Backend factories by name; each takes the shared sr.Recognizer
+BACKENDS = {
+    'google': GoogleBackend,
+    'sphinx': SphinxBackend
+}
+
+def register_backend(name, factory):
+    """Register a backend factory taking an sr.Recognizer."""
+    BACKENDS[name] = factory
+
+def create_backends(recognizer, names=None):
+    """
+    Create the backends listed in STT_BACKENDS, in priority order.
+    
+    Backends that are unknown or unavailable are skipped with a warning.
+    """
+    if names is None:
+        names = [name.strip() for name in Config.STT_BACKENDS.split(',') if name.strip()]
+    
+    backends = []
+    for name in names:
+        factory = BACKENDS.get(name)
+        if factory is None:
+            print(f"Warning: Unknown STT backend '{name}'. Skipping.")
+            continue
+        try:
+            backend = factory(recognizer)
+        except ImportError as e:
+            print(f"Warning: STT backend '{name}' not available: {e}")
+            continue
+        backend.sample_rate = Config.STT_SAMPLE_RATES.get(name, Config.STT_SAMPLE_RATE) or None
+        backends.append(backend)
+    return backends
+
+class LatencyStats:
+    """Rolling latency window and outcome counters of one backend."""
+    
+    def __init__(self, window):
+        self.latencies = deque(maxlen=window)
+        self.requests = 0
+        self.wins = 0
+        self.errors = 0
+        self.lock = threading.Lock()
+    
+    def record(self, latency, error=False):
+        with self.lock:
+            self.requests += 1
+            if error:
+                self.errors += 1
+            else:
+                self.latencies.append(latency)
+    
+    def record_win(self):
+        with self.lock:
+            self.wins += 1
+    
+    def percentile(self, percent):
+        """Get a latency percentile in seconds, or None with too few samples."""
+        with self.lock:
+            if len(self.latencies) < MIN_LATENCY_SAMPLES:
+                return None
+            ordered = sorted(self.latencies)
+        index = min(len(ordered) - 1, int(len(ordered) * percent / 100))
+        return ordered[index]
+    
+    def get_stats(self):
+        p50 = self.percentile(50)
+        p95 = self.percentile(95)
+        with self.lock:
+            return {
+                'requests': self.requests,
+                'wins': self.wins,
+                'errors': self.errors,
+                'p50_ms': round(p50 * 1000) if p50 is not None else None,
+                'p95_ms': round(p95 * 1000) if p95 is not None else None
+            }
+
+class HedgedRecognizer:
+    """
+    Runs STT backends in priority order, hedging slow ones.
+    
+    If a backend hasn't answered within its STT_HEDGE_PERCENTILE latency, the
+    next backend starts in parallel and the first one to return text wins. A
+    backend that fails starts the next one right away.
+    """
+    
+    def __init__(self, backends, hedge_percentile=None, initial_delay=None, min_delay=None, timeout=None,
+                 prepare_audio=None):
+        """
+        Args:
+            backends (list): STTBackend instances in priority order
+            prepare_audio: Optional callable taking sr.AudioData and a target
+                sample rate, used to convert audio to each backend's rate
+        """
+        self.config = Config()
+        self.backends = backends
+        self.prepare_audio = prepare_audio
+        self.hedge_percentile = hedge_percentile or self.config.STT_HEDGE_PERCENTILE
+        self.initial_delay = initial_delay if initial_delay is not None else self.config.STT_HEDGE_INITIAL_DELAY
+        self.min_delay = min_delay if min_delay is not None else self.config.STT_HEDGE_MIN_DELAY
+        self.timeout = timeout or self.config.STT_TIMEOUT
+        
+        self.stats = {backend.name: LatencyStats(self.config.STT_LATENCY_WINDOW) for backend in backends}
+        self.executor = ThreadPoolExecutor(
+            max_workers=max(1, len(backends)) * self.config.STREAMING_STT_WORKERS,
+            thread_name_prefix='stt-backend'
+        )
+    
+    def get_hedge_delay(self, backend):
+        """Get how long to wait for a backend before starting the next one."""
+        delay = self.stats[backend.name].percentile(self.hedge_percentile)
+        if delay is None:
+            delay = self.initial_delay
+        return max(delay, self.min_delay)
+    
+    def _run(self, backend, audio):
+        """Run one backend, recording its latency."""
+        start = time.perf_counter()
+        try:
+            text = backend.recognize(audio)
+        except sr.UnknownValueError:
+            # A definitive answer: there is no intelligible speech
+            self.stats[backend.name].record(time.perf_counter() - start)
+            return None
+        except Exception:
+            self.stats[backend.name].record(time.perf_counter() - start, error=True)
+            raise
+        self.stats[backend.name].record(time.perf_counter() - start)
+        return text
+    
+    def _launch(self, pending, index, audio, prepared):
+        """Start a backend in the background and return the index of the next one."""
+        backend = self.backends[index]
+        rate = backend.sample_rate
+        if self.prepare_audio and rate and rate != audio.sample_rate:
+            # Backends sharing a rate share the converted audio
+            if rate not in prepared:
+                prepared[rate] = self.prepare_audio(audio, rate)
+            audio = prepared[rate]
+        pending[self.executor.submit(self._run, backend, audio)] = (backend, time.monotonic())
+        return index + 1
+    
+    def recognize(self, audio):
+        """
+        Transcribe audio with the first backend to produce text.
+        
+        Returns:
+            str: Transcribed text, or None if no backend understood the audio
+        """
+        if not self.backends:
+            print("No STT backends available")
+            return None
+        
+        deadline = time.monotonic() + self.timeout
+        pending = {}
+        prepared = {}
+        next_index = 0
+        
+        while True:
+            if next_index < len(self.backends) and not pending:
+                # Nothing is running; start the next backend right away
+                next_index = self._launch(pending, next_index, audio, prepared)
+                continue
+            if not pending:
+                return None
+            
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                print("Speech recognition timed out")
+                return None
+            
+            # Wake up when the latest backend is due to be hedged
+            wait_time = remaining
+            can_hedge = next_index < len(self.backends)
+            if can_hedge:
+                last_started = max(started for _, started in pending.values())
+                hedge_at = last_started + self.get_hedge_delay(self.backends[next_index - 1])
+                wait_time = min(remaining, max(0, hedge_at - time.monotonic()))
+            
+            done, _ = wait(pending, timeout=wait_time, return_when=FIRST_COMPLETED)
+            if not done:
+                if can_hedge:
+                    print(f"STT backend '{self.backends[next_index - 1].name}' is slow, "
+                          f"hedging with '{self.backends[next_index].name}'")
+                    next_index = self._launch(pending, next_index, audio, prepared)
+                continue
+            
+            for future in done:
+                backend, _ = pending.pop(future)
+                try:
+                    text = future.result()
+                except Exception as e:
+                    # The next backend starts right away once nothing else is running
+                    print(f"Error with speech recognition backend '{backend.name}': {e}")
+                    continue
+                
+                if text:
+                    self.stats[backend.name].record_win()
+                    print(f"Transcribed text ({backend.name}): {text}")
+                    return text
+                
+                # No intelligible speech; only keep waiting on backends already running
+                next_index = len(self.backends)
+                print("Could not understand audio")
+    
+    def get_stats(self):
+        """Get per-backend latency and outcome statistics."""
+        return {name: stats.get_stats() for name, stats in self.stats.items()}
+    
+    def close(self):
+        """Stop the backend worker threads."""
+        self.executor.shutdown(wait=False)
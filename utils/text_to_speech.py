@@ -1,8 +1,50 @@
+try:
+    import pyaudio
+    PYAUDIO_AVAILABLE = True
+except ImportError:
+    PYAUDIO_AVAILABLE = False
+
 import pyttsx3
 import threading
 import queue
+import io
+import os
+import tempfile
 import time
+import wave
+from collections import namedtuple
 from config import Config
+from .tts_cache import TTSCache, make_tts_key
+from .sentence_segmenter import SentenceSegmenter
+
+# Frames written to the output stream at a time
+PLAYBACK_CHUNK_FRAMES = 1024
+
+# Synthesized speech ready for playback
+SpeechAudio = namedtuple('SpeechAudio', ['sample_width', 'channels', 'rate', 'frames'])
+
+# Engine properties speech is rendered with; sessions can each have their own
+VoiceSettings = namedtuple('VoiceSettings', ['voice', 'rate', 'volume'])
+
+def encode_wav(audio):
+    """Encode synthesized speech as a WAV file in memory."""
+    buffer = io.BytesIO()
+    with wave.open(buffer, 'wb') as wf:
+        wf.setsampwidth(audio.sample_width)
+        wf.setnchannels(audio.channels)
+        wf.setframerate(audio.rate)
+        wf.writeframes(audio.frames)
+    return buffer.getvalue()
+
+class _Utterance:
+    """A queued text moving through the synthesis and playback stages."""
+    
+    def __init__(self, text, generation, cancel_token=None):
+        self.text = text
+        self.generation = generation
+        self.cancel_token = cancel_token
+        self.audio = None
+        self.done = threading.Event()
 
 class TextToSpeech:
     """Handles text-to-speech conversion and audio playback."""
@@ -15,7 +57,26 @@ class TextToSpeech:
         self.speech_thread = None
         self.should_stop = False
         
+        # Synthesized sentences waiting to be played; bounded so synthesis
+        # stays only a few sentences ahead of playback
+        self.playback_queue = queue.Queue(maxsize=self.config.TTS_PREFETCH_SENTENCES)
+        self.playback_thread = None
+        self.current_utterance = None
+        self.output_stream = None
+        self.output_format = None
+        
+        # Bumped by stop_speaking so sentences already in the pipeline are dropped
+        self.generation = 0
+        self.pending = 0
+        self.pending_lock = threading.Lock()
+        
+        # pyttsx3 engines aren't thread-safe; prewarming renders from another thread
+        self.engine_lock = threading.Lock()
+        self.audio = None
+        self.cache = None
+        
         self._initialize_engine()
+        self._initialize_output()
         self._start_speech_thread()
     
     def _initialize_engine(self):
@@ -49,21 +110,230 @@ class TextToSpeech:
             print(f"✗ Error initializing TTS engine: {e}")
             self.engine = None
     
+    def _initialize_output(self):
+        """Set up audio output for synthesized speech and the cache of it."""
+        if not self.engine:
+            return
+        
+        # Speech rendered for clients is cached too, so this doesn't need a sound device
+        if self.config.TTS_CACHE_ENABLED:
+            try:
+                self.cache = TTSCache()
+            except Exception as e:
+                print(f"Error initializing TTS cache: {e}")
+        
+        if not PYAUDIO_AVAILABLE:
+            print("⚠ PyAudio not available - speaking directly through the TTS engine")
+            return
+        
+        try:
+            self.audio = pyaudio.PyAudio()
+        except Exception as e:
+            print(f"Error initializing audio output: {e}")
+    
+    def get_voice_settings(self):
+        """Get the engine's current voice settings, used when none are given."""
+        if not self.engine:
+            return VoiceSettings(None, self.config.TTS_RATE, self.config.TTS_VOLUME)
+        with self.engine_lock:
+            return VoiceSettings(
+                self.engine.getProperty('voice'),
+                self.engine.getProperty('rate'),
+                self.engine.getProperty('volume')
+            )
+    
+    def make_voice_settings(self, voice=None, rate=None, volume=None):
+        """
+        Build voice settings from optional overrides of the engine's current ones.
+        
+        Raises:
+            ValueError: If the voice doesn't exist or rate/volume aren't numbers
+        """
+        settings = self.get_voice_settings()
+        if voice is not None and voice != settings.voice:
+            if voice not in [voice_id for voice_id, _ in self.get_voices()]:
+                raise ValueError(f"Unknown voice: {voice}")
+            settings = settings._replace(voice=voice)
+        if rate is not None:
+            settings = settings._replace(rate=max(50, min(400, int(rate))))
+        if volume is not None:
+            settings = settings._replace(volume=max(0.0, min(1.0, float(volume))))
+        return settings
+    
+    def _cache_key(self, text, settings=None):
+        """Build the cache key of text with the given or current voice settings."""
+        settings = settings or self.get_voice_settings()
+        return make_tts_key(text, settings.voice, settings.rate, settings.volume)
+    
+    def _render_to_file(self, text, path, settings=None):
+        """Render text to a WAV file with the engine, checking that it is playable."""
+        with self.engine_lock:
+            if settings:
+                # The engine is shared, so its own settings are put back afterwards
+                previous = VoiceSettings(
+                    self.engine.getProperty('voice'),
+                    self.engine.getProperty('rate'),
+                    self.engine.getProperty('volume')
+                )
+                self._apply_voice_settings(settings)
+            try:
+                self.engine.save_to_file(text, path)
+                self.engine.runAndWait()
+            finally:
+                if settings:
+                    self._apply_voice_settings(previous)
+        
+        with wave.open(path, 'rb') as wf:
+            if not wf.getnframes():
+                raise ValueError("engine produced no audio")
+    
+    def _apply_voice_settings(self, settings):
+        """Set the engine properties. Caller holds the engine lock."""
+        if settings.voice:
+            self.engine.setProperty('voice', settings.voice)
+        self.engine.setProperty('rate', settings.rate)
+        self.engine.setProperty('volume', settings.volume)
+    
+    def _render(self, text, settings=None):
+        """
+        Get a cached WAV file of the spoken text, synthesizing it on a miss.
+        
+        Returns:
+            str: Path of the cached WAV file, or None if rendering failed
+        """
+        key = self._cache_key(text, settings)
+        path = self.cache.get(key)
+        if path:
+            return path
+        
+        temp_path = self.cache.new_temp_path(key)
+        try:
+            self._render_to_file(text, temp_path, settings)
+            return self.cache.put(key, temp_path)
+        except Exception as e:
+            print(f"Error rendering speech: {e}")
+            self.cache.discard(temp_path)
+            return None
+    
+    def _read_wav(self, path):
+        """Load a WAV file into memory for playback."""
+        with wave.open(path, 'rb') as wf:
+            return SpeechAudio(wf.getsampwidth(), wf.getnchannels(), wf.getframerate(),
+                               wf.readframes(wf.getnframes()))
+    
+    def _synthesize(self, text, settings=None):
+        """
+        Synthesize text to PCM in memory.
+        
+        Cache hits don't invoke the engine; without a cache the text is
+        rendered through a temporary file.
+        
+        Returns:
+            SpeechAudio: The synthesized speech, or None if it failed
+        """
+        try:
+            if self.cache:
+                path = self._render(text, settings)
+                return self._read_wav(path) if path else None
+            
+            fd, path = tempfile.mkstemp(suffix='.wav')
+            os.close(fd)
+            try:
+                self._render_to_file(text, path, settings)
+                return self._read_wav(path)
+            finally:
+                os.unlink(path)
+        except Exception as e:
+            print(f"Error synthesizing speech: {e}")
+            return None
+    
+    def _is_live(self, utterance):
+        """Check that an utterance was neither stopped nor cancelled with its turn."""
+        if utterance.generation != self.generation:
+            return False
+        return not (utterance.cancel_token and utterance.cancel_token.is_cancelled)
+    
+    def _interrupt(self):
+        """Cut off the sentence being spoken if its turn was cancelled."""
+        utterance = self.current_utterance
+        if utterance and not self._is_live(utterance) and not utterance.audio and self.engine:
+            # Playback of synthesized audio notices on its own within one chunk
+            self.engine.stop()
+    
+    def _play(self, utterance):
+        """Play synthesized speech on the shared output stream."""
+        audio = utterance.audio
+        output_format = (audio.sample_width, audio.channels, audio.rate)
+        if self.output_stream is None or self.output_format != output_format:
+            self._close_output_stream()
+            self.output_stream = self.audio.open(
+                format=self.audio.get_format_from_width(audio.sample_width),
+                channels=audio.channels,
+                rate=audio.rate,
+                output=True
+            )
+            self.output_format = output_format
+        
+        # Stop mid-sentence if stop_speaking is called
+        chunk_bytes = PLAYBACK_CHUNK_FRAMES * audio.sample_width * audio.channels
+        for start in range(0, len(audio.frames), chunk_bytes):
+            if not self._is_live(utterance):
+                break
+            self.output_stream.write(audio.frames[start:start + chunk_bytes])
+    
+    def _close_output_stream(self):
+        """Close the output stream, e.g. when speech goes idle."""
+        if self.output_stream is not None:
+            try:
+                self.output_stream.stop_stream()
+                self.output_stream.close()
+            except Exception as e:
+                print(f"Error closing audio output: {e}")
+            self.output_stream = None
+            self.output_format = None
+    
+    def prewarm(self, phrases):
+        """
+        Render phrases into the cache in the background so their first use is a hit.
+        
+        Args:
+            phrases (list): Texts that are spoken often, e.g. fallback messages
+        """
+        if not self.cache:
+            return
+        
+        def worker():
+            rendered = sum(1 for phrase in phrases if phrase.strip() and self._render(phrase.strip()))
+            print(f"✓ Pre-warmed {rendered} TTS phrases")
+        
+        threading.Thread(target=worker, daemon=True).start()
+    
     def _start_speech_thread(self):
-        """Start the background thread for handling speech queue."""
+        """Start the background threads of the synthesis and playback stages."""
         self.speech_thread = threading.Thread(target=self._speech_worker, daemon=True)
         self.speech_thread.start()
+        self.playback_thread = threading.Thread(target=self._playback_worker, daemon=True)
+        self.playback_thread.start()
+    
+    def _finish(self, utterance):
+        """Mark an utterance as spoken (or dropped)."""
+        with self.pending_lock:
+            self.pending -= 1
+        utterance.done.set()
     
     def _speech_worker(self):
-        """Background worker thread for processing speech queue."""
+        """Synthesis stage: renders queued sentences ahead of playback."""
         while not self.should_stop:
             try:
                 # Get text from queue with timeout
-                text = self.speech_queue.get(timeout=1)
-                if text is None:  # Signal to stop
+                utterance = self.speech_queue.get(timeout=1)
+                if utterance is None:  # Signal to stop
+                    self.playback_queue.put(None)
                     break
                 
-                self._speak_text(text)
+                if self._is_live(utterance) and self.audio:
+                    utterance.audio = self._synthesize(utterance.text)
+                self.playback_queue.put(utterance)
                 self.speech_queue.task_done()
                 
             except queue.Empty:
@@ -71,86 +341,164 @@ class TextToSpeech:
             except Exception as e:
                 print(f"Error in speech worker: {e}")
     
-    def _speak_text(self, text):
-        """Internal method to speak text."""
-        if not self.engine or not text.strip():
+    def _playback_worker(self):
+        """Playback stage: plays synthesized sentences back to back."""
+        while True:
+            try:
+                utterance = self.playback_queue.get(timeout=1)
+            except queue.Empty:
+                # Release the audio device while idle
+                self._close_output_stream()
+                if self.should_stop:
+                    break
+                continue
+            if utterance is None:  # Signal to stop
+                break
+            
+            try:
+                if self._is_live(utterance):
+                    self._speak_text(utterance)
+            except Exception as e:
+                print(f"Error in playback worker: {e}")
+            finally:
+                self._finish(utterance)
+        
+        self._close_output_stream()
+    
+    def _speak_text(self, utterance):
+        """Internal method to speak a synthesized (or, failing that, raw) sentence."""
+        if not self.engine:
             return
         
         try:
             self.is_speaking = True
-            print(f"🔊 Speaking: {text[:50]}...")
+            self.current_utterance = utterance
+            print(f"🔊 Speaking: {utterance.text[:50]}...")
             
-            self.engine.say(text)
-            self.engine.runAndWait()
+            if utterance.audio:
+                self._play(utterance)
+            else:
+                with self.engine_lock:
+                    self.engine.say(utterance.text)
+                    self.engine.runAndWait()
             
         except Exception as e:
             print(f"Error during speech: {e}")
         finally:
+            self.current_utterance = None
             self.is_speaking = False
     
-    def speak(self, text, blocking=False):
+    def speak(self, text, blocking=False, cancel_token=None):
         """
         Convert text to speech.
         
         Args:
             text (str): Text to speak
             blocking (bool): If True, wait for speech to complete
+            cancel_token (CancellationToken): Token of the turn; cancelling it drops the speech
         """
         if not text or not text.strip():
             return
+        if cancel_token:
+            if cancel_token.is_cancelled:
+                return
+            cancel_token.add_callback(self._interrupt)
+        
+        with self.pending_lock:
+            self.pending += 1
+            utterance = _Utterance(text.strip(), self.generation, cancel_token)
         
+        # Add to queue for background processing
+        self.speech_queue.put(utterance)
         if blocking:
-            self._speak_text(text)
-        else:
-            # Add to queue for background processing
-            self.speech_queue.put(text)
+            utterance.done.wait()
     
-    def speak_streaming(self, text_generator):
+    def speak_streaming(self, text_generator, cancel_token=None):
         """
         Speak text as it's generated from a generator.
         
         Args:
             text_generator: Generator that yields text chunks
+            cancel_token (CancellationToken): Token of the turn; cancelling it stops the speech
         """
-        accumulated_text = ""
-        sentence_endings = ['.', '!', '?', '\n']
+        segmenter = SentenceSegmenter()
         
         try:
             for chunk in text_generator:
-                accumulated_text += chunk
-                
-                # Check if we have a complete sentence
-                for ending in sentence_endings:
-                    if ending in accumulated_text:
-                        sentences = accumulated_text.split(ending)
-                        # Speak all complete sentences except the last part
-                        for sentence in sentences[:-1]:
-                            if sentence.strip():
-                                self.speak(sentence.strip() + ending)
-                        # Keep the remaining text
-                        accumulated_text = sentences[-1]
-                        break
+                if cancel_token and cancel_token.is_cancelled:
+                    return
+                # Speak each chunk as soon as it is complete
+                for sentence in segmenter.feed(chunk):
+                    self.speak(sentence, cancel_token=cancel_token)
             
             # Speak any remaining text
-            if accumulated_text.strip():
-                self.speak(accumulated_text.strip())
+            for sentence in segmenter.flush():
+                self.speak(sentence, cancel_token=cancel_token)
                 
         except Exception as e:
             print(f"Error in streaming speech: {e}")
     
+    def synthesize(self, text, settings=None):
+        """
+        Synthesize text without playing it, e.g. to send it to a client.
+        
+        Args:
+            text (str): Text to synthesize
+            settings (VoiceSettings): Voice to render with instead of the engine's own
+        
+        Returns:
+            SpeechAudio: The synthesized speech, or None if it failed
+        """
+        if not self.engine or not text or not text.strip():
+            return None
+        return self._synthesize(text.strip(), settings)
+    
+    def stream_speech(self, text_generator, settings=None, cancel_token=None):
+        """
+        Synthesize streamed text sentence by sentence without playing it.
+        
+        Args:
+            text_generator: Generator that yields text chunks
+            settings (VoiceSettings): Voice to render with instead of the engine's own
+            cancel_token (CancellationToken): Token of the turn; cancelling it stops synthesis
+        
+        Yields:
+            tuple: (sentence, SpeechAudio) as each sentence is synthesized
+        """
+        segmenter = SentenceSegmenter()
+        
+        def synthesize_all(sentences):
+            for sentence in sentences:
+                if cancel_token and cancel_token.is_cancelled:
+                    return
+                audio = self.synthesize(sentence, settings)
+                if audio:
+                    yield sentence, audio
+        
+        for chunk in text_generator:
+            if cancel_token and cancel_token.is_cancelled:
+                return
+            yield from synthesize_all(segmenter.feed(chunk))
+        yield from synthesize_all(segmenter.flush())
+    
     def stop_speaking(self):
         """Stop current speech and clear the queue."""
         try:
+            # Sentences already being synthesized or played are dropped
+            with self.pending_lock:
+                self.generation += 1
             if self.engine and self.is_speaking:
                 self.engine.stop()
             
-            # Clear the speech queue
-            while not self.speech_queue.empty():
-                try:
-                    self.speech_queue.get_nowait()
-                    self.speech_queue.task_done()
-                except queue.Empty:
-                    break
+            # Clear the speech and playback queues
+            for pending_queue in (self.speech_queue, self.playback_queue):
+                while True:
+                    try:
+                        utterance = pending_queue.get_nowait()
+                    except queue.Empty:
+                        break
+                    if utterance is not None:
+                        self._finish(utterance)
             
             self.is_speaking = False
             print("🔇 Speech stopped")
@@ -196,9 +544,13 @@ class TextToSpeech:
             except Exception as e:
                 print(f"Error setting voice: {e}")
     
+    def get_cache_stats(self):
+        """Get synthesized speech cache statistics."""
+        return self.cache.get_stats() if self.cache else None
+    
     def is_busy(self):
         """Check if TTS is currently speaking."""
-        return self.is_speaking or not self.speech_queue.empty()
+        return self.is_speaking or self.pending > 0
     
     def wait_until_done(self, timeout=None):
         """Wait until all speech is completed."""
@@ -217,17 +569,21 @@ class TextToSpeech:
     
     def cleanup(self):
         """Clean up TTS resources."""
+        # Stop any ongoing speech
+        self.stop_speaking()
+        
         self.should_stop = True
         
-        # Signal speech thread to stop
+        # Signal the synthesis and playback threads to stop
         self.speech_queue.put(None)
         
-        # Wait for thread to finish
-        if self.speech_thread and self.speech_thread.is_alive():
-            self.speech_thread.join(timeout=2)
+        # Wait for threads to finish
+        for thread in (self.speech_thread, self.playback_thread):
+            if thread and thread.is_alive():
+                thread.join(timeout=2)
         
-        # Stop any ongoing speech
-        self.stop_speaking()
+        if self.audio:
+            self.audio.terminate()
         
         print("TTS cleanup completed.")
     
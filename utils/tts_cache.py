@@ -0,0 +1,125 @@
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+from config import Config
+
+# File name prefix of renders that haven't been moved into the cache yet
+TEMP_PREFIX = '.render-'
+
+def make_tts_key(text, voice, rate, volume):
+    """Build a cache key from the text and the voice settings it is rendered with."""
+    normalized = [' '.join(text.split()), voice, rate, round(float(volume), 3)]
+    encoded = json.dumps(normalized, separators=(',', ':'), ensure_ascii=False)
+    return hashlib.sha256(encoded.encode('utf-8')).hexdigest()
+
+class TTSCache:
+    """On-disk LRU cache of synthesized speech as WAV files, bounded in total size."""
+    
+    def __init__(self, directory=None, max_bytes=None):
+        self.config = Config()
+        self.directory = directory or self.config.TTS_CACHE_DIR
+        self.max_bytes = max_bytes or self.config.TTS_CACHE_MAX_BYTES
+        
+        # key -> file size, least recently used first
+        self.entries = OrderedDict()
+        self.total_bytes = 0
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        
+        os.makedirs(self.directory, exist_ok=True)
+        self._load_index()
+    
+    def _path(self, key):
+        return os.path.join(self.directory, f"{key}.wav")
+    
+    def _load_index(self):
+        """Rebuild the LRU order from the files left by previous runs."""
+        files = []
+        for entry in os.scandir(self.directory):
+            if entry.name.startswith(TEMP_PREFIX):
+                # Half-written render from a crashed run
+                self._remove(entry.path)
+            elif entry.name.endswith('.wav') and entry.is_file():
+                stat = entry.stat()
+                files.append((stat.st_mtime, entry.name[:-4], stat.st_size))
+        
+        for _, key, size in sorted(files):
+            self.entries[key] = size
+            self.total_bytes += size
+        self._evict()
+    
+    def _remove(self, path):
+        try:
+            os.unlink(path)
+        except FileNotFoundError:
+            pass
+        except OSError as e:
+            print(f"Error deleting cached speech {path}: {e}")
+    
+    def _evict(self):
+        """Drop least recently used files until the cache fits in max_bytes."""
+        # The newest entry always stays, even if it alone exceeds the limit
+        while len(self.entries) > 1 and self.total_bytes > self.max_bytes:
+            key, size = self.entries.popitem(last=False)
+            self.total_bytes -= size
+            self._remove(self._path(key))
+    
+    def get(self, key):
+        """Get the WAV file path of cached speech, or None on a miss."""
+        with self.lock:
+            if key not in self.entries:
+                self.misses += 1
+                return None
+            self.entries.move_to_end(key)
+            self.hits += 1
+        
+        path = self._path(key)
+        try:
+            # Recency survives restarts through the modification time
+            os.utime(path)
+        except FileNotFoundError:
+            with self.lock:
+                self.total_bytes -= self.entries.pop(key, 0)
+            return None
+        return path
+    
+    def new_temp_path(self, key):
+        """Get a temporary path to render speech into before calling put()."""
+        # Keeps the .wav extension, which some engines use to pick the output format
+        return os.path.join(self.directory, f"{TEMP_PREFIX}{key}-{threading.get_ident()}.wav")
+    
+    def put(self, key, temp_path):
+        """
+        Move a rendered WAV file into the cache.
+        
+        Returns:
+            str: Path of the cached file
+        """
+        path = self._path(key)
+        size = os.path.getsize(temp_path)
+        os.replace(temp_path, path)
+        
+        with self.lock:
+            self.total_bytes += size - self.entries.pop(key, 0)
+            self.entries[key] = size
+            self._evict()
+        return path
+    
+    def discard(self, temp_path):
+        """Delete a temporary render that won't be cached."""
+        self._remove(temp_path)
+    
+    def get_stats(self):
+        """Get hit/miss statistics."""
+        with self.lock:
+            lookups = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+                'entries': len(self.entries),
+                'bytes': self.total_bytes
+            }
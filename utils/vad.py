@@ -0,0 +1,125 @@
+try:
+    import webrtcvad
+    WEBRTCVAD_AVAILABLE = True
+except ImportError:
+    WEBRTCVAD_AVAILABLE = False
+
+from abc import ABC, abstractmethod
+import numpy as np
+from config import Config
+
+def pcm_to_mono_float(pcm, channels=1):
+    """Convert interleaved int16 PCM (bytes or buffer) to mono float32 samples."""
+    samples = np.frombuffer(pcm, dtype=np.int16).astype(np.float32)
+    if channels > 1:
+        samples = samples[:len(samples) - len(samples) % channels].reshape(-1, channels).mean(axis=1)
+    return samples
+
+class VADEngine(ABC):
+    """Base class for voice activity detectors working on int16 PCM chunks."""
+    
+    def __init__(self, sample_rate, channels=1):
+        self.sample_rate = sample_rate
+        self.channels = channels
+        self.last_rms = 0.0
+    
+    @abstractmethod
+    def is_speech(self, pcm):
+        """Check whether a chunk of PCM audio contains speech."""
+    
+    def reset(self):
+        """Reset any state carried between chunks."""
+        pass
+    
+    def set_threshold(self, threshold):
+        """Update the RMS speech threshold; ignored by detectors that don't use one."""
+        pass
+
+class EnergyVAD(VADEngine):
+    """Detects speech by comparing the chunk RMS against a threshold."""
+    
+    def __init__(self, sample_rate, channels=1, threshold=None):
+        super().__init__(sample_rate, channels)
+        self.threshold = threshold if threshold is not None else Config.SILENCE_THRESHOLD
+    
+    def is_speech(self, pcm):
+        """Check whether a chunk of PCM audio is louder than the threshold."""
+        samples = pcm_to_mono_float(pcm, self.channels)
+        if not len(samples):
+            return False
+        # float32 accumulation; squaring int16 directly overflows
+        self.last_rms = float(np.sqrt(np.dot(samples, samples) / len(samples)))
+        return self.last_rms >= self.threshold
+    
+    def set_threshold(self, threshold):
+        self.threshold = threshold
+
+class WebRTCVAD(VADEngine):
+    """Detects speech with the WebRTC voice activity detector."""
+    
+    SUPPORTED_RATES = (8000, 16000, 32000, 48000)
+    FRAME_DURATION_MS = 30
+    
+    def __init__(self, sample_rate, channels=1, aggressiveness=None):
+        super().__init__(sample_rate, channels)
+        if not WEBRTCVAD_AVAILABLE:
+            raise ImportError("webrtcvad is not installed")
+        
+        self.vad = webrtcvad.Vad(aggressiveness if aggressiveness is not None else Config.VAD_AGGRESSIVENESS)
+        
+        # WebRTC only accepts a few rates; others are resampled to 16 kHz
+        self.vad_rate = sample_rate if sample_rate in self.SUPPORTED_RATES else 16000
+        self.frame_length = self.vad_rate * self.FRAME_DURATION_MS // 1000
+        self.pending = np.zeros(0, dtype=np.int16)
+    
+    def _resample(self, samples):
+        """Linearly resample mono samples to the VAD rate."""
+        if self.vad_rate == self.sample_rate:
+            return samples
+        duration = len(samples) / self.sample_rate
+        target_positions = np.arange(int(duration * self.vad_rate)) * (self.sample_rate / self.vad_rate)
+        return np.interp(target_positions, np.arange(len(samples)), samples)
+    
+    def is_speech(self, pcm):
+        """Check whether any complete WebRTC frame in the chunk contains speech."""
+        samples = pcm_to_mono_float(pcm, self.channels)
+        if len(samples):
+            self.last_rms = float(np.sqrt(np.dot(samples, samples) / len(samples)))
+        
+        resampled = np.clip(self._resample(samples), -32768, 32767).astype(np.int16)
+        samples = np.concatenate((self.pending, resampled))
+        
+        frame_count = len(samples) // self.frame_length
+        frames = samples[:frame_count * self.frame_length].reshape(frame_count, self.frame_length)
+        speech = False
+        for frame in frames:
+            if self.vad.is_speech(frame.tobytes(), self.vad_rate):
+                speech = True
+                break
+        
+        # Carry the partial frame over to the next chunk
+        self.pending = samples[frame_count * self.frame_length:]
+        return speech
+    
+    def reset(self):
+        """Drop the partial frame carried between chunks."""
+        self.pending = np.zeros(0, dtype=np.int16)
+
+def create_vad(sample_rate=None, channels=None, engine=None):
+    """
+    Create the voice activity detector selected by VAD_ENGINE.
+    
+    Falls back to the energy detector when webrtcvad is not available.
+    """
+    sample_rate = sample_rate or Config.AUDIO_SAMPLE_RATE
+    channels = channels or Config.AUDIO_CHANNELS
+    engine = (engine or Config.VAD_ENGINE).lower()
+    
+    if engine == 'webrtc':
+        if WEBRTCVAD_AVAILABLE:
+            return WebRTCVAD(sample_rate, channels)
+        print("Warning: webrtcvad not available. Falling back to energy VAD.")
+    elif engine != 'energy':
+        print(f"Warning: Unknown VAD engine '{engine}'. Using energy VAD.")
+    
+    return EnergyVAD(sample_rate, channels)